@@ -17,6 +17,19 @@ class bank(design.design):
     hierarchical_decoder, precharge, column_mux, write driver and sense amplifiers.
     """
 
+    # Moved by offset_all_coordinates
+    coordinate_attributes = ["bitcell_array_position", "precharge_array_position",
+                             "column_mux_array_position", "sens_amp_array_position",
+                             "write_driver_array_position", "ms_flop_data_in_offset",
+                             "tri_gate_array_offset", "decoder_position",
+                             "wordline_driver_position", "msf_address_offset",
+                             "col_decoder_position", "bank_select_position",
+                             "bank_select_inv_position", "bank_select_or_position",
+                             "module_offset", "left_vdd_position", "right_vdd_position",
+                             "left_gnd_position", "address_positions", "data_positions",
+                             "clk_position", "clk_bar_position", "tri_en_position",
+                             "tri_en_bar_position", "w_en_position", "s_en_position"]
+
     def __init__(self, word_size, num_words, words_per_row, num_banks=1, name=""):
 
         mod_list = ["tri_gate", "bitcell", "decoder", "ms_flop_array", "wordline_driver",
@@ -173,30 +186,36 @@ class bank(design.design):
         self.data_positions = []
 
     def create_modules(self):
-        """ Create all the modules using the class loader """
-        self.bitcell_array = self.mod_bitcell_array(name="bitcell_array", 
-                                              cols=self.num_cols,
-                                              rows=self.num_rows)
+        """ Create all the modules using the class loader. The arrays are
+        made by the module factory so that they are kept between runs. """
+        self.bitcell_array = design.factory.get(self.mod_bitcell_array,
+                                                name="bitcell_array",
+                                                cols=self.num_cols,
+                                                rows=self.num_rows)
         self.add_mod(self.bitcell_array)
 
-        self.precharge_array = self.mod_precharge_array(name="precharge_array", 
-                                                        columns=self.num_cols,
-                                                        ptx_width=drc["minwidth_tx"])
+        self.precharge_array = design.factory.get(self.mod_precharge_array,
+                                                  name="precharge_array",
+                                                  columns=self.num_cols,
+                                                  ptx_width=drc["minwidth_tx"])
         self.add_mod(self.precharge_array)
 
         if(self.col_addr_size > 0):
-            self.column_mux_array = self.mod_column_mux_array(rows=self.num_rows,
-                                                              columns=self.num_cols, 
-                                                              word_size=self.word_size)
+            self.column_mux_array = design.factory.get(self.mod_column_mux_array,
+                                                       rows=self.num_rows,
+                                                       columns=self.num_cols,
+                                                       word_size=self.word_size)
             self.add_mod(self.column_mux_array)
 
 
-        self.sens_amp_array = self.mod_sense_amp_array(word_size=self.word_size, 
-                                                       words_per_row=self.words_per_row)
+        self.sens_amp_array = design.factory.get(self.mod_sense_amp_array,
+                                                 word_size=self.word_size,
+                                                 words_per_row=self.words_per_row)
         self.add_mod(self.sens_amp_array)
 
-        self.write_driver_array = self.mod_write_driver_array(columns=self.num_cols,
-                                                              word_size=self.word_size)
+        self.write_driver_array = design.factory.get(self.mod_write_driver_array,
+                                                     columns=self.num_cols,
+                                                     word_size=self.word_size)
         self.add_mod(self.write_driver_array)
 
         self.decoder = self.mod_decoder(nand2_nmos_width=2*drc["minwidth_tx"],
@@ -204,18 +223,21 @@ class bank(design.design):
                                         rows=self.num_rows)
         self.add_mod(self.decoder)
 
-        self.msf_address = self.mod_ms_flop_array(name="msf_address", 
-                                                  columns=self.row_addr_size+self.col_addr_size, 
-                                                  word_size=self.row_addr_size+self.col_addr_size)
+        self.msf_address = design.factory.get(self.mod_ms_flop_array,
+                                              name="msf_address",
+                                              columns=self.row_addr_size+self.col_addr_size,
+                                              word_size=self.row_addr_size+self.col_addr_size)
         self.add_mod(self.msf_address)
         
-        self.msf_data_in = self.mod_ms_flop_array(name="msf_data_in", 
-                                                  columns=self.num_cols, 
-                                                  word_size=self.word_size)
+        self.msf_data_in = design.factory.get(self.mod_ms_flop_array,
+                                              name="msf_data_in",
+                                              columns=self.num_cols,
+                                              word_size=self.word_size)
         self.add_mod(self.msf_data_in)
         
-        self.tri_gate_array = self.mod_tri_gate_array(columns=self.num_cols, 
-                                                      word_size=self.word_size)
+        self.tri_gate_array = design.factory.get(self.mod_tri_gate_array,
+                                                 columns=self.num_cols,
+                                                 word_size=self.word_size)
         self.add_mod(self.tri_gate_array)
 
         self.wordline_driver = self.mod_wordline_driver(name="wordline_driver", 
@@ -223,27 +245,27 @@ class bank(design.design):
         #self.wordline_driver.logic_effort_sizing(self.num_cols)
         self.add_mod(self.wordline_driver)
 
-        self.inv = pinv(nmos_width=drc["minwidth_tx"], 
-                        beta=parameter["pinv_beta"], 
-                        height=self.bitcell_height)
+        self.inv = design.factory.get(pinv, nmos_width=drc["minwidth_tx"], 
+                                            beta=parameter["pinv_beta"], 
+                                            height=self.bitcell_height)
         self.add_mod(self.inv)
         
     # 4x Inverter
-        self.inv4x = pinv(nmos_width=4*drc["minwidth_tx"], 
-                          beta=parameter["pinv_beta"], 
-                          height=self.bitcell_height)
+        self.inv4x = design.factory.get(pinv, nmos_width=4*drc["minwidth_tx"], 
+                                              beta=parameter["pinv_beta"], 
+                                              height=self.bitcell_height)
         self.add_mod(self.inv4x)
 
-        self.NAND2 = nand_2(nmos_width=2*drc["minwidth_tx"], 
-                            height=self.bitcell_height)
+        self.NAND2 = design.factory.get(nand_2, nmos_width=2*drc["minwidth_tx"], 
+                                                height=self.bitcell_height)
         self.add_mod(self.NAND2)
 
-        self.NOR2 = nor_2(nmos_width=drc["minwidth_tx"], 
-                          height=self.bitcell_height)
+        self.NOR2 = design.factory.get(nor_2, nmos_width=drc["minwidth_tx"], 
+                                              height=self.bitcell_height)
         self.add_mod(self.NOR2)
 
         # These aren't for instantiating, but we use them to get the dimensions
-        self.m1m2_via = contact(layer_stack=("metal1", "via1", "metal2"))
+        self.m1m2_via = design.factory.get(contact, layer_stack=("metal1", "via1", "metal2"))
 
         # Vertical metal rail gap definition
         self.metal2_extend_contact = (self.m1m2_via.second_layer_height 
@@ -1235,74 +1257,75 @@ class bank(design.design):
 
         # RIGHT HAND SIDE VDD RAIL CONNECTIONS
         # Connecting Bitcell-array VDDs
-        for i,offset in enumerate(self.bitcell_array.vdd_positions):
-            if (i % 2 == 0):
-                self.add_rect(layer="metal1", 
-                              offset=offset - vector(0, 0.5 * drc["minwidth_metal1"]), 
-                              width=self.right_vdd_x_offset - offset.x, 
-                              height=drc["minwidth_metal1"])
+        vdd_positions = self.bitcell_array.vdd_positions[::2]
+        self.add_rects(layer="metal1", 
+                       offsets=[offset - vector(0, 0.5 * drc["minwidth_metal1"])
+                                    for offset in vdd_positions], 
+                       width=[self.right_vdd_x_offset - offset.x for offset in vdd_positions], 
+                       height=drc["minwidth_metal1"])
 
         # Connecting Pre-charge VDD
-        for offset in self.precharge_array.vdd_positions:
-            self.add_rect(layer="metal1", 
-                          offset=self.precharge_array_position + offset, 
-                          width=(self.right_vdd_x_offset - offset.x
-                                     - self.precharge_array_position.x), 
-                          height=drc["minwidth_metal1"])
+        vdd_positions = self.precharge_array.vdd_positions
+        self.add_rects(layer="metal1", 
+                       offsets=[self.precharge_array_position + offset for offset in vdd_positions], 
+                       width=[self.right_vdd_x_offset - offset.x - self.precharge_array_position.x
+                                  for offset in vdd_positions], 
+                       height=drc["minwidth_metal1"])
 
         # Connecting Sense Amp VDD
-        for offset in self.sens_amp_array.vdd_positions:
-            self.add_rect(layer="metal1", 
-                          offset=self.sens_amp_array_position + offset, 
-                          width=(self.right_vdd_x_offset - offset.x
-                                    - self.sens_amp_array_position.x), 
-                          height=drc["minwidth_metal1"])
+        vdd_positions = self.sens_amp_array.vdd_positions
+        self.add_rects(layer="metal1", 
+                       offsets=[self.sens_amp_array_position + offset for offset in vdd_positions], 
+                       width=[self.right_vdd_x_offset - offset.x - self.sens_amp_array_position.x
+                                  for offset in vdd_positions], 
+                       height=drc["minwidth_metal1"])
 
         # Connecting Write Driver VDD
-        for offset in self.write_driver_array.vdd_positions:
-            self.add_rect(layer="metal1", 
-                          offset=self.write_driver_array_position + offset, 
-                          width=(self.right_vdd_x_offset - offset.x
-                                    - self.write_driver_array_position.x), 
-                          height=drc["minwidth_metal1"])
+        vdd_positions = self.write_driver_array.vdd_positions
+        self.add_rects(layer="metal1", 
+                       offsets=[self.write_driver_array_position + offset for offset in vdd_positions], 
+                       width=[self.right_vdd_x_offset - offset.x - self.write_driver_array_position.x
+                                  for offset in vdd_positions], 
+                       height=drc["minwidth_metal1"])
 
         # Connecting msf_data_in VDD
-        for offset in self.msf_data_in.vdd_positions:
-            self.add_rect(layer="metal1", 
-                          offset=(self.ms_flop_data_in_offset + offset 
-                                  -vector(0, 0.5 * drc["minwidth_metal1"])), 
-                          width=self.right_vdd_x_offset \
-                              - (self.ms_flop_data_in_offset.x + offset.x), 
-                          height=drc["minwidth_metal1"])
+        vdd_positions = self.msf_data_in.vdd_positions
+        self.add_rects(layer="metal1", 
+                       offsets=[self.ms_flop_data_in_offset + offset 
+                                    - vector(0, 0.5 * drc["minwidth_metal1"])
+                                    for offset in vdd_positions], 
+                       width=[self.right_vdd_x_offset
+                                  - (self.ms_flop_data_in_offset.x + offset.x)
+                                  for offset in vdd_positions], 
+                       height=drc["minwidth_metal1"])
 
         # Connecting tri_gate VDD
-        for offset in self.tri_gate_array.vdd_positions:
-            self.add_rect(layer="metal1", 
-                          offset=(self.tri_gate_array_offset + offset.scale(1,-1) 
-                                      - vector(0, 0.5 * drc["minwidth_metal1"])), 
-                          width=(self.right_vdd_x_offset - offset.x
-                                     - self.tri_gate_array_offset.x), 
-                          height=drc["minwidth_metal1"])
+        vdd_positions = self.tri_gate_array.vdd_positions
+        self.add_rects(layer="metal1", 
+                       offsets=[self.tri_gate_array_offset + offset.scale(1,-1) 
+                                    - vector(0, 0.5 * drc["minwidth_metal1"])
+                                    for offset in vdd_positions], 
+                       width=[self.right_vdd_x_offset - offset.x - self.tri_gate_array_offset.x
+                                  for offset in vdd_positions], 
+                       height=drc["minwidth_metal1"])
 
         # LEFT HAND SIDE VDD RAIL CONNECTIONS
 
         # Connecting decoder VDD
-        for i, offset in enumerate(self.decoder.vdd_positions):
-            decoder_vdd_offset = self.decoder_position + offset
-            if(i % 2 == 0):
-                self.add_rect(layer="metal1",  
-                              offset=decoder_vdd_offset,  
-                              width=self.left_vdd_x_offset - decoder_vdd_offset.x, 
-                              height=drc["minwidth_metal1"])
+        decoder_vdd_offsets = [self.decoder_position + offset
+                                   for offset in self.decoder.vdd_positions[::2]]
+        self.add_rects(layer="metal1",  
+                       offsets=decoder_vdd_offsets,  
+                       width=[self.left_vdd_x_offset - offset.x for offset in decoder_vdd_offsets], 
+                       height=drc["minwidth_metal1"])
 
         # Connecting pre-decoder vdds
-        for offset in self.decoder.pre_decoder_vdd_positions:
-            preedecoder_vdd_offset = self.decoder_position + offset
-            self.add_rect(layer="metal1",  
-                          offset=[self.left_vdd_x_offset, 
-                                  preedecoder_vdd_offset.y],  
-                          width=preedecoder_vdd_offset.x - self.left_vdd_x_offset, 
-                          height=drc["minwidth_metal1"])
+        predecoder_vdd_offsets = [self.decoder_position + offset
+                                      for offset in self.decoder.pre_decoder_vdd_positions]
+        self.add_rects(layer="metal1",  
+                       offsets=[[self.left_vdd_x_offset, offset.y] for offset in predecoder_vdd_offsets],  
+                       width=[offset.x - self.left_vdd_x_offset for offset in predecoder_vdd_offsets], 
+                       height=drc["minwidth_metal1"])
 
         # Connecting column_decoder vdd [Its the 2:4 decoder]
         if(self.col_addr_size == 2):
@@ -1355,14 +1378,12 @@ class bank(design.design):
                       width=self.bitcell_array.width - self.left_gnd_x_offset, 
                       height=drc["minwidth_metal1"])
 
+        self.add_rects(layer="metal2", 
+                       offsets=[[offset.x - 0.5*drc["minwidth_metal2"], self.bitcell_array.height]
+                                    for offset in self.bitcell_array.gnd_positions], 
+                       width=drc["minwidth_metal2"], 
+                       height=yoffset + drc["minwidth_metal1"] - self.bitcell_array.height)
         for offset in self.bitcell_array.gnd_positions:
-            #print self.bitcell_array.gnd_positions
-            self.add_rect(layer="metal2", 
-                          offset=[offset.x - 0.5*drc["minwidth_metal2"], 
-                                  self.bitcell_array.height], 
-                          width=drc["minwidth_metal2"], 
-                          height= yoffset + drc["minwidth_metal1"] \
-                              - self.bitcell_array.height)
             self.add_via(layers=("metal1", "via1", "metal2"),
                           offset=[offset.x + drc["minwidth_metal2"], yoffset], 
                           mirror="R90")
@@ -1380,8 +1401,8 @@ class bank(design.design):
         # Connections of Tri_gate GND to the left hand GND rail
 
         # This is only used to compute teh sizes below
-        gnd_contact = contact(layer_stack=("metal1", "via1", "metal2"), 
-                              dimensions=(2, 1))
+        gnd_contact = design.factory.get(contact, layer_stack=("metal1", "via1", "metal2"), 
+                                                  dimensions=(2, 1))
 
         x_off = (self.left_gnd_x_offset + self.power_rail_width 
                                 - gnd_contact.width)
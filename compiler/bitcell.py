@@ -20,6 +20,7 @@ class bitcell(design.design):
 
         self.width = bitcell.chars["width"]
         self.height = bitcell.chars["height"]
+        self.add_library_pins(bitcell.chars, bitcell.pins)
 
     def delay(self, slew, load=0, swing = 0.5):
         # delay of bit cell is not like a driver(from WL)
@@ -1,8 +1,10 @@
+import numpy as np
 import debug
 import design
 from tech import drc, spice
 from vector import vector
 from globals import OPTS
+from bitcell_row import bitcell_row
 
 
 
@@ -11,18 +13,43 @@ class bitcell_array(design.design):
     Creates a rows x cols array of memory cells. Assumes bit-lines
     and word line is connected by abutment.
     Connects the word lines and bit lines.
+    When hierarchical, the array places a row module of cols cells once
+    for each row, and with block_rows it places blocks of that many rows
+    instead, so that the netlist and GDS have O(rows + cols) instances.
+    The pins are the same either way.
     """
 
-    def __init__(self, name, cols, rows):
+    # Made by the module factory and kept in the disk cache between runs
+    persistent = True
+
+    def __init__(self, name, cols, rows, hierarchical=None, block_rows=None, cell=None):
         design.design.__init__(self, name)
         debug.info(1, "Creating {0} {1} x {2}".format(self.name, rows, cols))
 
 
         self.column_size = cols
         self.row_size = rows
+        if hierarchical == None:
+            hierarchical = OPTS.hierarchical_bitcell_array
+        if block_rows == None:
+            block_rows = OPTS.bitcell_array_block_rows
+        self.hierarchical = hierarchical and not OPTS.trim_noncritical
+        # a block is a smaller array of whole rows, so the blocks are
+        # placed unmirrored when they have an even number of rows
+        self.block_rows = 0
+        if self.hierarchical and 0 < block_rows < rows:
+            debug.check(block_rows % 2 == 0 and rows % block_rows == 0,
+                        "block_rows {0} must be even and divide the {1} rows.".format(block_rows, rows))
+            self.block_rows = block_rows
 
-        c = reload(__import__(OPTS.config.bitcell))
-        self.mod_bitcell = getattr(c, OPTS.config.bitcell)
+        # the blocks and rows of a hierarchical array are given its cell,
+        # so that they all place the same bitcell module and class
+        if cell == None:
+            c = reload(__import__(OPTS.config.bitcell))
+            self.mod_bitcell = getattr(c, OPTS.config.bitcell)
+        else:
+            self.mod_bitcell = cell.__class__
+        self.cell = cell
         self.bitcell_chars = self.mod_bitcell.chars
 
         self.add_pins()
@@ -55,46 +82,115 @@ class bitcell_array(design.design):
         self.width = self.column_size * self.cell.width
 
     def create_cell(self):
-        self.cell = self.mod_bitcell()
+        if self.cell == None:
+            self.cell = self.mod_bitcell()
         self.add_mod(self.cell)
+        if self.block_rows:
+            self.block = bitcell_array(name="{0}_block".format(self.name),
+                                       cols=self.column_size,
+                                       rows=self.block_rows,
+                                       hierarchical=True,
+                                       block_rows=0,
+                                       cell=self.cell)
+            self.add_mod(self.block)
+        elif self.hierarchical:
+            self.row = bitcell_row(name="{0}_row".format(self.name),
+                                   cols=self.column_size,
+                                   cell=self.cell)
+            self.add_mod(self.row)
 
     def add_cells(self):
-        xoffset = 0.0
-        for col in range(self.column_size):
-            yoffset = 0.0
-            for row in range(self.row_size):
-                name = "bit_r{0}_c{1}".format(row, col)
-
+        if OPTS.trim_noncritical == True:
+            # only the last row is kept
+            row = self.row_size - 1
+            xoffset = 0.0
+            for col in range(self.column_size):
                 if row % 2:
-                    tempy = yoffset + self.cell.height
+                    tempy = (row + 1) * self.cell.height
                     dir_key = "MX"
                 else:
-                    tempy = yoffset
+                    tempy = row * self.cell.height
                     dir_key = "R0"
+                self.add_inst(name="bit_r{0}_c{1}".format(row, col),
+                              mod=self.cell,
+                              offset=[xoffset, tempy],
+                              mirror=dir_key)
+                self.connect_inst(["bl[{0}]".format(col),
+                                   "br[{0}]".format(col),
+                                   "wl[{0}]".format(row),
+                                   "vdd",
+                                   "gnd"])
+                xoffset += self.cell.width
+            return
+        if self.block_rows:
+            self.add_blocks()
+            return
+        if self.hierarchical:
+            self.add_rows()
+            return
 
-                if OPTS.trim_noncritical == True:
-                    if row == self.row_size - 1:
-                        self.add_inst(name=name,
-                                      mod=self.cell,
-                                      offset=[xoffset, tempy],
-                                      mirror=dir_key)
-                        self.connect_inst(["bl[{0}]".format(col),
-                                           "br[{0}]".format(col),
-                                           "wl[{0}]".format(row),
-                                           "vdd",
-                                           "gnd"])
-                else:
-                    self.add_inst(name=name,
-                                  mod=self.cell,
-                                  offset=[xoffset, tempy],
-                                  mirror=dir_key)
-                    self.connect_inst(["bl[{0}]".format(col),
-                                       "br[{0}]".format(col),
-                                       "wl[{0}]".format(row),
-                                       "vdd",
-                                       "gnd"])
-                yoffset += self.cell.height
-            xoffset += self.cell.width
+        # the cells are written as GDS array references with every
+        # other row mirrored so that the rows share power rails
+        self.add_inst_array(name="bit",
+                            mod=self.cell,
+                            offset=[0, 0],
+                            columns=self.column_size,
+                            rows=self.row_size,
+                            pitch=[self.cell.width, self.cell.height],
+                            mirror_rows=True)
+        # the nets of the cells are made once for each column and row
+        # and the cells are connected to them by ID, column by column
+        bl = self.add_nets(["bl[{0}]".format(col) for col in range(self.column_size)])
+        br = self.add_nets(["br[{0}]".format(col) for col in range(self.column_size)])
+        wl = self.add_nets(["wl[{0}]".format(row) for row in range(self.row_size)])
+        nets = np.empty((self.column_size, self.row_size, 5), dtype=np.int32)
+        nets[:, :, 0] = np.array(bl)[:, np.newaxis]
+        nets[:, :, 1] = np.array(br)[:, np.newaxis]
+        nets[:, :, 2] = np.array(wl)[np.newaxis, :]
+        nets[:, :, 3] = self.add_net("vdd")
+        nets[:, :, 4] = self.add_net("gnd")
+        self.connect_inst_array_nets(nets.ravel().tolist())
+
+    def add_rows(self):
+        """ Place the row module once for each row, mirroring every
+        other row as the flat array does """
+        self.add_inst_array(name="row",
+                            mod=self.row,
+                            offset=[0, 0],
+                            columns=1,
+                            rows=self.row_size,
+                            pitch=[self.width, self.cell.height],
+                            mirror_rows=True)
+        self.connect_tiles(1)
+
+    def add_blocks(self):
+        """ Place the blocks of rows. They have an even number of rows,
+        so they all start with an unmirrored row. """
+        self.add_inst_array(name="block",
+                            mod=self.block,
+                            offset=[0, 0],
+                            columns=1,
+                            rows=self.row_size / self.block_rows,
+                            pitch=[self.width, self.block.height])
+        self.connect_tiles(self.block_rows)
+
+    def connect_tiles(self, tile_rows):
+        """ Connect each tile of tile_rows rows to all the bit lines and
+        to its word lines, in the pin order of the row module and of
+        the bitcell array """
+        bitlines = []
+        for col in range(self.column_size):
+            bitlines.append("bl[{0}]".format(col))
+            bitlines.append("br[{0}]".format(col))
+        bitlines = self.add_nets(bitlines)
+        wl = self.add_nets(["wl[{0}]".format(row) for row in range(self.row_size)])
+        tiles = self.row_size / tile_rows
+        nets = np.empty((tiles, len(bitlines) + tile_rows + 2), dtype=np.int32)
+        nets[:, :len(bitlines)] = np.array(bitlines)[np.newaxis, :]
+        nets[:, len(bitlines):-2] = np.array(wl).reshape(tiles, tile_rows)
+        nets[:, -2] = self.add_net("vdd")
+        nets[:, -1] = self.add_net("gnd")
+        self.connect_inst_array_nets(nets.ravel().tolist())
 
     def add_labels(self):
         offset = vector(0.0, 0.0)
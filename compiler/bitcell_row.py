@@ -0,0 +1,60 @@
+import debug
+import design
+from vector import vector
+
+
+class bitcell_row(design.design):
+    """
+    Creates one row of cols memory cells sharing a word line. It is
+    the tile of a hierarchical bitcell array, which places it once for
+    each row instead of placing every cell.
+    """
+
+    def __init__(self, name, cols, cell):
+        design.design.__init__(self, name)
+        debug.info(1, "Creating {0} 1 x {1}".format(self.name, cols))
+
+        self.column_size = cols
+
+        # the cell of the array, so that the bitcell module is not reloaded
+        self.cell = cell
+        self.bitcell_chars = cell.chars
+
+        self.add_pins()
+        self.create_layout()
+        self.add_labels()
+        self.DRC_LVS()
+
+    def add_pins(self):
+        for col in range(self.column_size):
+            self.add_pin("bl[{0}]".format(col))
+            self.add_pin("br[{0}]".format(col))
+        self.add_pin("wl")
+        self.add_pin("vdd")
+        self.add_pin("gnd")
+
+    def create_layout(self):
+        self.add_mod(self.cell)
+        self.height = self.cell.height
+        self.width = self.column_size * self.cell.width
+        self.add_cells()
+        self.offset_all_coordinates()
+
+    def add_cells(self):
+        self.add_cell_array(name="bit",
+                            mod=self.cell,
+                            count=self.column_size,
+                            pitch=[self.cell.width, 0],
+                            conns=["bl[{0}]", "br[{0}]", "wl", "vdd", "gnd"],
+                            labels=[("bl[{0}]", "metal2", vector(self.bitcell_chars["BL"][0], 0)),
+                                    ("br[{0}]", "metal2", vector(self.bitcell_chars["BR"][0], 0)),
+                                    ("gnd", "metal2", vector(self.bitcell_chars["gnd"][0], 0))],
+                            aref=True)
+
+    def add_labels(self):
+        self.add_label(text="vdd",
+                       layer="metal1",
+                       offset=vector(0, self.bitcell_chars["vdd"][1]))
+        self.add_label(text="wl",
+                       layer="metal1",
+                       offset=vector(0, self.bitcell_chars["WL"][1]))
@@ -10,6 +10,11 @@ class contact(design.design):
     This class has enclosure on multiple sides of the contact whereas a via may
     have extension on two or four sides.
     """
+
+    # Moved by offset_all_coordinates
+    coordinate_attributes = ["offset", "via_layer_position", "first_layer_position",
+                             "second_layer_position"]
+
     def __init__(self, layer_stack, dimensions=[1,1]):
         name = "{0}_{1}_{2}_{3}x{4}".format(layer_stack[0],
                                             layer_stack[1],
@@ -34,9 +39,9 @@ class contact(design.design):
         self.offset_all_coordinates()
 
     def offset_all_coordinates(self):
-        coordinate = self.find_lowest_coords()
-        self.offset_attributes(coordinate)
-        self.translate(coordinate)
+        design.design.offset_all_coordinates(self)
+        # the size is measured from the moved objs and insts
+        self.apply_origin()
 
         self.height = max(obj.offset.y + obj.height for obj in self.objs)
         self.width = max(obj.offset.x + obj.width for obj in self.objs)
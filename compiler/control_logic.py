@@ -42,21 +42,21 @@ class control_logic(design.design):
         self.mod_ms_flop = getattr(c, OPTS.config.ms_flop)
         self.ms_flop = self.mod_ms_flop("ms_flop")
         self.add_mod(self.ms_flop)
-        self.inv = pinv(nmos_width=drc["minwidth_tx"],
-                        beta=parameter["pinv_beta"])
+        self.inv = design.factory.get(pinv, nmos_width=drc["minwidth_tx"],
+                                            beta=parameter["pinv_beta"])
 
         self.add_mod(self.inv)
-        self.nand2 = nand_2(nmos_width=2 * drc["minwidth_tx"])
+        self.nand2 = design.factory.get(nand_2, nmos_width=2 * drc["minwidth_tx"])
         self.add_mod(self.nand2)
-        self.NAND3 = nand_3(nmos_width=3 * drc["minwidth_tx"])
+        self.NAND3 = design.factory.get(nand_3, nmos_width=3 * drc["minwidth_tx"])
         self.add_mod(self.NAND3)
 
         # Special gates: 4x Inverter
-        self.inv4 = pinv(nmos_width=4 * drc["minwidth_tx"],
-                         beta=parameter["pinv_beta"])
+        self.inv4 = design.factory.get(pinv, nmos_width=4 * drc["minwidth_tx"],
+                                             beta=parameter["pinv_beta"])
         self.add_mod(self.inv4)
 
-        self.nor2 = nor_2(nmos_width=drc["minwidth_tx"])
+        self.nor2 = design.factory.get(nor_2, nmos_width=drc["minwidth_tx"])
         self.add_mod(self.nor2)
 
         self.msf_control = ms_flop_array(name="msf_control",
@@ -99,7 +99,7 @@ class control_logic(design.design):
     def setup_layout_offsets(self):
         """ Setup layout offsets, determine the size of the busses etc """
         # This isn't for instantiating, but we use it to get the dimensions
-        m1m2_via = contact(layer_stack=("metal1", "via1", "metal2"))
+        m1m2_via = design.factory.get(contact, layer_stack=("metal1", "via1", "metal2"))
 
         # Vertical metal rail gap definition
         self.metal2_extend_contact = (m1m2_via.second_layer_height - m1m2_via.contact_width) / 2
@@ -10,9 +10,9 @@ import sys
 # n = custom setting
 
 def check(check,str):
-    (frame, filename, line_number, function_name, lines,
-     index) = inspect.getouterframes(inspect.currentframe())[1]
     if not check:
+        (frame, filename, line_number, function_name, lines,
+         index) = inspect.getouterframes(inspect.currentframe())[1]
         print("ERROR: file {0}: line {1}: {2}".format(os.path.basename(filename),line_number,str))
         sys.exit(-1)
 
@@ -29,6 +29,10 @@ def warning(str):
     print("WARNING: file {0}: line {1}: {2}".format(os.path.basename(filename),line_number,str))
 
 
+def enabled(lev):
+    """ Check if info messages at a level are printed, to skip building messages that are not """
+    return globals.get_opts().debug_level >= lev
+
 def info(lev, str):
     OPTS = globals.get_opts()
     if (OPTS.debug_level >= lev):
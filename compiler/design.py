@@ -4,17 +4,32 @@ import globals
 import calibre
 import debug
 import os
+import module_factory
+import numpy as np
+from vector import vector
 
 OPTS = globals.get_opts()
 
+# Contacts, transistors and gates with the same parameters share one module
+factory = module_factory.module_factory()
+
 
 class design(hierarchy_spice.spice, hierarchy_layout.layout):
     """
     Design Class for all modules to inherit the base features.
     Class consisting of a set of modules and instances of these modules
     """
-    name_map = []
-    
+    name_map = set()
+    # Classes whose modules may be made again under the same name: library
+    # cells read from the same files, and modules whose name is made from
+    # their parameters when they are made directly rather than by the factory.
+    shared_classes = set(['ms_flop.ms_flop', 'bitcell.bitcell', 'contact.contact',
+                          'ptx.ptx', 'sram.sram',
+                          'hierarchical_predecode2x4.hierarchical_predecode2x4',
+                          'hierarchical_predecode3x8.hierarchical_predecode3x8'])
+    # Modules of a persistent class made by the factory are kept in the
+    # disk cache between runs
+    persistent = False
 
     def __init__(self, name):
         self.gds_file = OPTS.openram_tech + "gds_lib/" + name + ".gds"
@@ -26,28 +41,88 @@ class design(hierarchy_spice.spice, hierarchy_layout.layout):
         
         # Check if the name already exists, if so, give an error
         # because each reference must be a unique name.
-        ok_list = ['ms_flop.ms_flop', 'bitcell.bitcell', 'contact.contact',
-                   'ptx.ptx', 'sram.sram',
-                   'hierarchical_predecode2x4.hierarchical_predecode2x4',
-                   'hierarchical_predecode3x8.hierarchical_predecode3x8']
         if name not in design.name_map:
-            design.name_map.append(name)
-        elif str(self.__class__) in ok_list:
+            design.name_map.add(name)
+        elif str(self.__class__) in design.shared_classes:
             pass
         else:
             debug.error("Duplicate layout reference name {0} of class {1}. GDS2 requires names be unique.".format(name,self.__class__),-1)
         
+    def __setstate__(self, state):
+        """ A module loaded from the disk cache takes its name like a new one """
+        self.__dict__.update(state)
+        design.name_map.add(self.name)
+
     def get_layout_pins(self,inst):
-        """ Return a map of pin locations of the instance offset """
-        # find the instance
-        for i in self.insts:
-            if i.name == inst.name:
-                break
+        """ Return a map of the pin shapes of an instance, placed like the instance """
+        if self.inst_map.get(inst.name) is not inst:
+            debug.error("Couldn't find instance {0}".format(inst.name),-1)
+        self.apply_origin()
+        return dict((name, inst.get_pins(name)) for name in inst.mod.pin_map)
+
+    def add_cell_array(self, name, mod, count, pitch, conns, offset=[0,0], mirrors=["R0"],
+                       indices=None, labels=[], aref=False):
+        """Adds count instances of a mod, each a pitch vector further than
+        the last, and connects them. The mirrors are repeated over the
+        instances, and a mirrored instance is moved by the mod size so
+        that it covers the same area as an unmirrored one.
+        The nets and label texts are templates formatted with the indices
+        of each instance: one sequence per field, [range(count)] by
+        default. A label is a (text, layer, position in the mod) tuple.
+        The instances are named name.format(index), or with aref they are
+        one instance array called name; this needs a row of unmirrored
+        instances or a column with every other one mirrored about x.
+        Returns the offsets of the instances and, for each label, the
+        list of its placed positions."""
+        pitch = vector(pitch)
+        if indices == None:
+            indices = [range(count)]
+        fields = zip(*indices)
+        debug.check(len(fields) == count, "{0} indices for {1} instances".format(len(fields), count))
+
+        # the nets of each pin are made at once, the same net for every
+        # instance when the template has no fields
+        nets = np.empty((count, len(conns)), dtype=np.int32)
+        for (pin, template) in enumerate(conns):
+            if "{" in template:
+                nets[:, pin] = self.add_nets([template.format(*field) for field in fields])
+            else:
+                nets[:, pin] = self.add_net(template)
+
+        # the offsets and the direction of the mod's x and y in each mirror
+        scales = {"R0": (1, 1), "MY": (-1, 1), "MX": (1, -1), "XY": (-1, -1)}
+        steps = np.arange(count)
+        x = offset[0] + steps * pitch.x
+        y = offset[1] + steps * pitch.y
+        instance_mirrors = [mirrors[i % len(mirrors)] for i in range(count)]
+        directions = np.array([scales[mirror] for mirror in instance_mirrors])
+        x = x + (directions[:, 0] < 0) * mod.width
+        y = y + (directions[:, 1] < 0) * mod.height
+        offsets = map(vector, x.tolist(), y.tolist())
+
+        if aref:
+            if mirrors == ["R0"] and pitch.y == 0:
+                self.add_inst_array(name=name, mod=mod, offset=offset, columns=count, pitch=pitch)
+            elif mirrors in (["R0"], ["R0", "MX"]) and pitch.x == 0:
+                self.add_inst_array(name=name, mod=mod, offset=offset, rows=count, pitch=pitch,
+                                    mirror_rows=(len(mirrors) == 2))
+            else:
+                debug.error("Cannot write {0} with mirrors {1} and pitch {2} as an instance array.".format(name,
+                                                                                                          mirrors,
+                                                                                                          pitch), -1)
+            self.connect_inst_array_nets(nets.ravel().tolist())
         else:
-            debug.error("Couldn't find instance {0}".format(inst_name),-1)
-        inst_map = inst.mod.pin_map
-        return inst_map
-        
+            for (i, inst_offset, mirror) in zip(range(count), offsets, instance_mirrors):
+                self.add_inst(name=name.format(i), mod=mod, offset=inst_offset, mirror=mirror)
+                self.connect_inst_nets(nets[i].tolist())
+
+        label_positions = [[] for label in labels]
+        for (field, inst_offset, direction) in zip(fields, offsets, directions.tolist()):
+            for ((text, layer, position), positions) in zip(labels, label_positions):
+                label_offset = inst_offset + vector(position).scale(direction[0], direction[1])
+                self.add_label(text=text.format(*field), layer=layer, offset=label_offset)
+                positions.append(label_offset)
+        return (offsets, label_positions)
 
     def DRC_LVS(self):
         """Checks both DRC and LVS for a module"""
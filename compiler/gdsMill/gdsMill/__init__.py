@@ -10,4 +10,7 @@ from pdfLayout import *
 from vlsiLayout import *
 from gdsStreamer import *
 from gdsPrimitives import *
+from shapeIndex import *
+from gdsIndex import *
+from gdsDigest import *
 
@@ -0,0 +1,192 @@
+import math
+import numpy
+from gdsPrimitives import *
+
+class AreaFill:
+    """
+    Class to fill an area of a layout with square blocks on one layer. The shapes
+    already on the layer are flattened once and rasterized onto NumPy grids: one cell
+    per fill block site to find the sites that keep their spacing from every shape,
+    and a finer grid to measure the density of each window. The blocks are placed as
+    array references to a single fill structure.
+    """
+    def __init__(self, layout, layer, purpose=None):
+        self.layout = layout
+        self.layer = layer
+        self.purpose = purpose
+        self.rectangles = self.flattenedRectangles()
+
+    def flattenedRectangles(self):
+        """Return the [left,bottom,right,top] of every boundary and path on the layer in DB units"""
+        rectangles = []
+        def addRectangles(structureName, transformPath):
+            entry = self.layout.xyTreeEntry(structureName,transformPath)
+            for (shapeLayer,rectangle) in self.layout.getShapesInStructure(entry):
+                if shapeLayer == self.layer:
+                    rectangles.append(rectangle)
+            (origin,uVector,vVector) = entry[1:4]
+            for path in self.layout.structures[structureName].paths:
+                if path.drawingLayer == self.layer:
+                    rectangle = self.layout.transformRectangle(pathRectangle(path),uVector,vVector)
+                    rectangles.append([rectangle[0]+origin[0],rectangle[1]+origin[1],
+                                       rectangle[2]+origin[0],rectangle[3]+origin[1]])
+        self.layout.traverseTheHierarchy(delegateFunction = addRectangles)
+        return numpy.array(rectangles,dtype=numpy.float64).reshape(-1,4)
+
+    def blockedSites(self, origin, pitch, blockSize, spacing, columns, rows):
+        """
+        Return a rows x columns grid that is True where a block at origin+(column,row)*pitch
+        would be closer than the spacing to a shape (touching at the spacing is allowed).
+        """
+        shapes = self.rectangles
+        #the range of sites each shape blocks, end exclusive
+        columnStart = numpy.floor((shapes[:,0]-origin[0]-blockSize-spacing)/pitch)+1
+        columnEnd = numpy.ceil((shapes[:,2]-origin[0]+spacing)/pitch)
+        rowStart = numpy.floor((shapes[:,1]-origin[1]-blockSize-spacing)/pitch)+1
+        rowEnd = numpy.ceil((shapes[:,3]-origin[1]+spacing)/pitch)
+        return rasterize(columnStart,columnEnd,rowStart,rowEnd,columns,rows)
+
+    def coverage(self, origin, resolution, columns, rows):
+        """
+        Return a rows x columns grid of resolution sized cells that is True where
+        the center of the cell is inside a shape.
+        """
+        shapes = self.rectangles
+        columnStart = numpy.ceil((shapes[:,0]-origin[0])/resolution-0.5)
+        columnEnd = numpy.ceil((shapes[:,2]-origin[0])/resolution-0.5)
+        rowStart = numpy.ceil((shapes[:,1]-origin[1])/resolution-0.5)
+        rowEnd = numpy.ceil((shapes[:,3]-origin[1])/resolution-0.5)
+        return rasterize(columnStart,columnEnd,rowStart,rowEnd,columns,rows)
+
+    def windowDensity(self, origin, width, height, windowSize, resolution):
+        """
+        Return the density of the shapes in each windowSize square window of an area,
+        as a (window rows) x (window columns) array, and the number of raster cells in each window.
+        """
+        columns = int(math.ceil(float(width)/resolution))
+        rows = int(math.ceil(float(height)/resolution))
+        (windowColumns,windowRows) = windowCounts(width,height,windowSize)
+        covered = self.coverage(origin,resolution,columns,rows)
+        #the window of each raster cell, by the cell center
+        cellWindowColumn = numpy.minimum(((numpy.arange(columns)+0.5)*resolution//windowSize).astype(int),windowColumns-1)
+        cellWindowRow = numpy.minimum(((numpy.arange(rows)+0.5)*resolution//windowSize).astype(int),windowRows-1)
+        cellWindow = (cellWindowRow[:,numpy.newaxis]*windowColumns+cellWindowColumn[numpy.newaxis,:]).ravel()
+        cells = numpy.bincount(cellWindow,minlength=windowRows*windowColumns)
+        coveredCells = numpy.bincount(cellWindow,weights=covered.ravel(),minlength=windowRows*windowColumns)
+        density = coveredCells/numpy.maximum(cells,1)
+        return (density.reshape(windowRows,windowColumns),cells.reshape(windowRows,windowColumns))
+
+    def selectSites(self, freeSites, origin, pitch, blockSize, width, height,
+                    targetDensity=None, windowSize=None, resolution=None):
+        """
+        Choose the free sites to fill. Without a target density every free site is filled.
+        Otherwise each window gets enough blocks to reach the target density (or all of its
+        free sites), spread evenly over the free sites in the window.
+        """
+        if targetDensity == None:
+            return freeSites
+        if windowSize == None:
+            windowSize = max(width,height)
+        (density,cells) = self.windowDensity(origin,width,height,windowSize,resolution)
+        (windowRows,windowColumns) = density.shape
+        #the number of blocks each window needs
+        missingArea = numpy.maximum(targetDensity-density,0)*cells*resolution*resolution
+        needed = numpy.ceil(missingArea/(blockSize*blockSize)-1e-9).astype(int).ravel()
+        #the window of each site, by the block center
+        (rows,columns) = freeSites.shape
+        siteWindowColumn = numpy.minimum(((numpy.arange(columns)*pitch+0.5*blockSize)//windowSize).astype(int),windowColumns-1)
+        siteWindowRow = numpy.minimum(((numpy.arange(rows)*pitch+0.5*blockSize)//windowSize).astype(int),windowRows-1)
+        siteWindow = (siteWindowRow[:,numpy.newaxis]*windowColumns+siteWindowColumn[numpy.newaxis,:]).ravel()
+        free = numpy.flatnonzero(freeSites.ravel())
+        freeWindow = siteWindow[free]
+        #rank the free sites in each window in raster order
+        order = numpy.argsort(freeWindow,kind="mergesort")
+        available = numpy.bincount(freeWindow,minlength=windowRows*windowColumns)
+        firstInWindow = numpy.concatenate(([0],numpy.cumsum(available)[:-1]))
+        rank = numpy.empty(len(free),dtype=int)
+        rank[order] = numpy.arange(len(free))-firstInWindow[freeWindow[order]]
+        #keep needed of the available sites, evenly spaced
+        count = numpy.maximum(available[freeWindow],1)
+        need = numpy.minimum(needed[freeWindow],available[freeWindow])
+        keep = ((rank+1)*need)//count > (rank*need)//count
+        selected = numpy.zeros(rows*columns,dtype=bool)
+        selected[free[keep]] = True
+        return selected.reshape(rows,columns)
+
+    def fillStructure(self, blockSize):
+        """Return the name of the structure with one fill block, adding it to the layout if it is new"""
+        name = "fill_{0}_{1}".format(self.layer,int(blockSize))
+        if name not in self.layout.structures:
+            root = self.layout.structures[self.layout.rootStructureName]
+            structure = GdsStructure(self.layout.columnar)
+            structure.name = name
+            structure.createDate = root.createDate
+            structure.modDate = root.modDate
+            block = GdsBoundary()
+            block.drawingLayer = self.layer
+            block.purposeLayer = self.purpose
+            block.dataType = 0
+            block.coordinates = [(0,0),(blockSize,0),(blockSize,blockSize),(0,blockSize),(0,0)]
+            structure.boundaries.append(block)
+            self.layout.structures[name] = structure
+        return name
+
+    def placeBlocks(self, selected, origin, pitch, blockSize):
+        """
+        Add the selected sites to the root structure as array references to the fill structure:
+        one for the whole area if it is all selected, otherwise one per run of sites in a row.
+        """
+        (rows,columns) = selected.shape
+        if not selected.any():
+            return 0
+        name = self.fillStructure(blockSize)
+        if selected.all():
+            runs = [(0,0,columns,rows)]
+        else:
+            edges = numpy.diff(numpy.pad(selected.astype(numpy.int8),((0,0),(1,1)),"constant"),axis=1)
+            (startRows,startColumns) = numpy.nonzero(edges == 1)
+            (endRows,endColumns) = numpy.nonzero(edges == -1)
+            runs = zip(startColumns,startRows,endColumns-startColumns,[1]*len(startRows))
+        root = self.layout.structures[self.layout.rootStructureName]
+        for (column,row,runColumns,runRows) in runs:
+            x = origin[0]+int(column)*pitch
+            y = origin[1]+int(row)*pitch
+            aref = GdsAref()
+            aref.aName = name
+            aref.columns = int(runColumns)
+            aref.rows = int(runRows)
+            aref.coordinates = [(x,y),(x+int(runColumns)*pitch,y),(x,y+int(runRows)*pitch)]
+            root.arefs.append(aref)
+        if self.layer not in self.layout.layerNumbersInUse:
+            self.layout.layerNumbersInUse.append(self.layer)
+        self.layout.invalidateGeometryCaches()
+        return int(selected.sum())
+
+def pathRectangle(path):
+    """Return the [left,bottom,right,top] around a path and its width"""
+    halfWidth = path.pathWidth/2.0
+    xs = [coordinate[0] for coordinate in path.coordinates]
+    ys = [coordinate[1] for coordinate in path.coordinates]
+    return [min(xs)-halfWidth,min(ys)-halfWidth,max(xs)+halfWidth,max(ys)+halfWidth]
+
+def windowCounts(width, height, windowSize):
+    """Return the number of window columns and rows that cover an area"""
+    return (max(int(math.ceil(float(width)/windowSize-1e-9)),1),max(int(math.ceil(float(height)/windowSize-1e-9)),1))
+
+def rasterize(columnStart, columnEnd, rowStart, rowEnd, columns, rows):
+    """
+    Return a rows x columns grid that is True inside any of the [start,end) column and row
+    ranges, marking the corners of each range in a difference array and summing it up.
+    """
+    columnStart = numpy.clip(columnStart,0,columns).astype(int)
+    columnEnd = numpy.clip(columnEnd,0,columns).astype(int)
+    rowStart = numpy.clip(rowStart,0,rows).astype(int)
+    rowEnd = numpy.clip(rowEnd,0,rows).astype(int)
+    inside = (columnStart < columnEnd) & (rowStart < rowEnd)
+    (columnStart,columnEnd,rowStart,rowEnd) = (columnStart[inside],columnEnd[inside],rowStart[inside],rowEnd[inside])
+    difference = numpy.zeros((rows+1,columns+1),dtype=numpy.int32)
+    numpy.add.at(difference,(rowStart,columnStart),1)
+    numpy.add.at(difference,(rowStart,columnEnd),-1)
+    numpy.add.at(difference,(rowEnd,columnStart),-1)
+    numpy.add.at(difference,(rowEnd,columnEnd),1)
+    return difference.cumsum(axis=0).cumsum(axis=1)[:rows,:columns] > 0
@@ -1,6 +1,37 @@
 #!/usr/bin/env python
 import struct
+import array
+import sys
 from gdsPrimitives import *
+from gdsIndex import *
+
+#the XY decoder reads native ints, so we need to swap on little endian machines
+swapXY = (sys.byteorder == "little")
+
+def decodeFlatXY(data,start,end):
+    """Decode a block of big endian 4 byte XY data into a flat x0,y0,x1,y1,... int array"""
+    xy = array.array("i")
+    xy.fromstring(data[start:end])
+    if swapXY:
+        xy.byteswap()
+    return xy
+
+def decodeXY(data,start,end):
+    """Decode a block of big endian 4 byte XY data into a list of (x,y) tuples in one pass"""
+    xy = decodeFlatXY(data,start,end)
+    return zip(xy[0::2],xy[1::2])
+
+def matchesFilter(valueFilter,value):
+    """A filter is None to match everything, a function of the value, or a collection of values"""
+    if valueFilter == None:
+        return True
+    if callable(valueFilter):
+        return valueFilter(value)
+    return value in valueFilter
+
+#the element types and the classes they are decoded into
+elementClasses = {0x0800:GdsBoundary, 0x0900:GdsPath, 0x0A00:GdsSref, 0x0B00:GdsAref,
+                  0x0C00:GdsText, 0x1500:GdsNode, 0x2E02:GdsBox}
 
 class Gds2reader:
     """Class to read in a file in GDSII format and populate a layout class with it"""
@@ -8,10 +39,15 @@ class Gds2reader:
     global offset
     offset=0
 
-    def __init__(self,layoutObject,debugToTerminal = 0):
+    def __init__(self,layoutObject,debugToTerminal = 0,buffered = True):
         self.fileHandle = None
         self.layoutObject = layoutObject
         self.debugToTerminal=debugToTerminal
+        #read the whole file in one call and walk it with offsets instead of
+        #doing two small reads per record (the debug dump always uses the old reader)
+        self.buffered = buffered and not debugToTerminal
+        self.fileData = None
+        self.fileOffset = 0
 	
           #do we dump debug data to the screen
     
@@ -74,6 +110,12 @@ class Gds2reader:
     
     def readNextRecord(self):
 	global offset
+        if self.fileData != None:
+            #buffered mode, just slice the record out of the file data
+            recordLength = struct.unpack_from(">H",self.fileData,self.fileOffset)[0]
+            record = self.fileData[self.fileOffset+2:self.fileOffset+recordLength]
+            self.fileOffset += recordLength
+            return record
         recordLengthAscii = self.fileHandle.read(2) #first 2 bytes tell us the length of the record
         recordLength = struct.unpack(">h",recordLengthAscii)  #gives us a tuple with a short int inside
         offlist = list(recordLength)  #change tuple to a list
@@ -165,7 +207,7 @@ class Gds2reader:
                     print "Mask: "+mask
             elif(idBits==('\x03','\x05')):  #this is also wrong b/c python doesn't natively have an 8 byte float
                 userUnits=self.ieeeDoubleFromIbmData(record[2]+record[3]+record[4]+record[5]+record[6]+record[7]+record[8]+record[9])
-                dbUnits=self.ieeeDoubleFromIbmData
+                dbUnits=self.ieeeDoubleFromIbmData(record[10:18])
                 self.layoutObject.info["units"] = (userUnits,dbUnits)
 	
                 #print "userUnits %s"%((record[2]+record[3]+record[4]+record[5]+record[6]+record[7]+record[8]+record[9])).encode("hex")
@@ -341,10 +383,16 @@ class Gds2reader:
                 if(self.debugToTerminal==1):
                     print "\t\tPLEX: "+str(plex)
             elif(idBits==('\x12','\x06')):  #Reference Name
-                aName = record[2::]
-                thisAref.aName=aName
+                aName = self.stripNonASCII(record[2::])
+                thisAref.aName=aName.rstrip()
                 if(self.debugToTerminal==1):
                     print "\t\tReference Name:"+aName
+            elif(idBits==('\x13','\x02')):  #Columns and Rows
+                (columns,rows) = struct.unpack(">hh",record[2:6])
+                thisAref.columns=columns
+                thisAref.rows=rows
+                if(self.debugToTerminal==1):
+                    print "\t\tColumns: "+str(columns)+" Rows: "+str(rows)
             elif(idBits==('\x1A','\x01')):  #Transformation
                 transFlags = struct.unpack(">H",record[2]+record[3])[0]
                 mirrorFlag = bool(transFlags&0x8000)   ##these flags are a bit sketchy
@@ -366,16 +414,13 @@ class Gds2reader:
                 if(self.debugToTerminal==1):
                     print "\t\t\tRotate Angle (CCW):"+str(rotateAngle)
             elif(idBits==('\x10','\x03')):  #XY Data Points
-                index=2
-                topLeftX=struct.unpack(">i",record[index]+record[index+1]+record[index+2]+record[index+3])[0]
-                topLeftY=struct.unpack(">i",record[index+4]+record[index+5]+record[index+6]+record[index+7])[0]
-                rightMostX=struct.unpack(">i",record[index+8]+record[index+9]+record[index+10]+record[index+11])[0]
-                bottomMostY=struct.unpack(">i",record[index+12]+record[index+13]+record[index+14]+record[index+15])[0]
-                thisAref.coordinates=[(topLeftX,topLeftY),(rightMostX,topLeftY),(topLeftX,bottomMostY)]
-                if(self.debugToTerminal==1):
-                    print "\t\t\tTop Left Point: "+str(topLeftX)+","+str(topLeftY)
-                    print "\t\t\t\tArray Width: "+str(rightMostX-topLeftX)
-                    print "\t\t\t\tArray Height: "+str(topLeftY-bottomMostY)
+                #the reference point, then the points displaced by all the columns and by all the rows
+                (originX,originY,columnX,columnY,rowX,rowY)=struct.unpack(">6i",record[2:26])
+                thisAref.coordinates=[(originX,originY),(columnX,columnY),(rowX,rowY)]
+                if(self.debugToTerminal==1):
+                    print "\t\t\tReference Point: "+str(originX)+","+str(originY)
+                    print "\t\t\t\tColumn Displacement: "+str(columnX)+","+str(columnY)
+                    print "\t\t\t\tRow Displacement: "+str(rowX)+","+str(rowY)
             elif(idBits==('\x11','\x00')):  #End Of Element
                 break;
         return thisAref
@@ -568,7 +613,7 @@ class Gds2reader:
         return thisBox
     
     def readNextStructure(self):
-        thisStructure = GdsStructure()        
+        thisStructure = GdsStructure(self.layoutObject.columnar)
         record = self.readNextRecord()
         idBits = (record[0],record[1])
         if(idBits==('\x05','\x02') and len(record)==26):
@@ -639,182 +684,454 @@ class Gds2reader:
         else:
             print "There was an error parsing the GDS header.  Aborting..."
             
-    def loadFromFile(self, fileName):
-        self.fileHandle = open(fileName,"rb")
-        self.readGds2()
-        self.fileHandle.close()
-        self.layoutObject.initialize()
-
-##############################################
+    def readStructuresBuffered(self,structureCount=None):
+        """
+        Walk all of the structures in the buffered file data with struct offsets.
+        This fills the same GdsStructure and element objects as readNextStructure,
+        but decodes each record in place instead of going through readNextRecord.
+        If a structure count is given, stop after reading that many structures.
+        For a columnar layout, the boundaries, paths and texts are decoded into one
+        reused element each and go straight into the arrays of the structure.
+        """
+        data = self.fileData
+        unpackFrom = struct.unpack_from
+        layerNumbersInUse = self.layoutObject.layerNumbersInUse
+        layersSeen = set(layerNumbersInUse)
+        elementLists = {0x0800:"boundaries", 0x0900:"paths", 0x0A00:"srefs", 0x0B00:"arefs",
+                        0x0C00:"texts", 0x1500:"nodes", 0x2E02:"boxes"}
+        columnar = self.layoutObject.columnar
+        columnElements = {0x0800:GdsBoundary(), 0x0900:GdsPath(), 0x0C00:GdsText()}
+        columnDefaults = dict((recordType,dict(element.__dict__)) for (recordType,element) in columnElements.items())
+        thisStructure = None
+        thisElement = None
+        elementType = None
+        offset = self.fileOffset
+        end = len(data)
+        while offset+4 <= end:
+            (recordLength,recordType) = unpackFrom(">HH",data,offset)
+            if recordLength < 4:
+                break
+            start = offset+4
+            offset += recordLength
+            if thisElement != None:
+                if recordType==0x1100:  #End Of Element
+                    getattr(thisStructure,elementLists[elementType]).append(thisElement)
+                    thisElement = None
+                elif recordType==0x1003:  #XY Data Points
+                    if elementType==0x0A00:
+                        thisElement.coordinates=unpackFrom(">ii",data,start)
+                    elif elementType==0x0B00:
+                        (originX,originY,columnX,columnY,rowX,rowY)=unpackFrom(">6i",data,start)
+                        thisElement.coordinates=[(originX,originY),(columnX,columnY),(rowX,rowY)]
+                    elif elementType==0x0C00:
+                        thisElement.coordinates=[unpackFrom(">ii",data,start)]
+                    elif columnar:
+                        thisElement.coordinates=decodeFlatXY(data,start,offset)
+                    else:
+                        thisElement.coordinates=decodeXY(data,start,offset)
+                elif recordType==0x0D02:  #Layer
+                    if elementType not in (0x0A00,0x0B00):
+                        drawingLayer = unpackFrom(">h",data,start)[0]
+                        thisElement.drawingLayer=drawingLayer
+                        if drawingLayer not in layersSeen:
+                            layersSeen.add(drawingLayer)
+                            layerNumbersInUse.append(drawingLayer)
+                elif recordType==0x1602:  #Purpose
+                    if elementType in (0x0800,0x0900,0x0C00,0x2E02):
+                        thisElement.purposeLayer=unpackFrom(">h",data,start)[0]
+                elif recordType==0x0E02:  #DataType
+                    if elementType==0x0800:
+                        thisElement.dataType=unpackFrom(">h",data,start)[0]
+                elif recordType==0x2601:  #ELFLAGS
+                    if elementType==0x2E02:
+                        thisElement.elementFlags=unpackFrom(">h",data,start)
+                    else:
+                        thisElement.elementFlags=unpackFrom(">h",data,start)[0]
+                elif recordType==0x2F03:  #PLEX
+                    thisElement.plex=unpackFrom(">i",data,start)[0]
+                elif recordType==0x1A01:  #Transformation
+                    if elementType in (0x0A00,0x0B00,0x0C00):
+                        transFlags = unpackFrom(">H",data,start)[0]
+                        thisElement.transFlags=(bool(transFlags&0x8000),bool(transFlags&0x0002),bool(transFlags&0x0004))
+                elif recordType==0x1B05:  #Magnify
+                    if elementType in (0x0A00,0x0B00,0x0C00):
+                        thisElement.magFactor=self.ieeeDoubleFromIbmData(data[start:start+8])
+                elif recordType==0x1C05:  #Rotate Angle
+                    if elementType in (0x0A00,0x0B00,0x0C00):
+                        thisElement.rotateAngle=self.ieeeDoubleFromIbmData(data[start:start+8])
+                elif recordType==0x1206:  #Reference Name
+                    if elementType==0x0A00:
+                        thisElement.sName=self.stripNonASCII(data[start:offset]).rstrip()
+                    elif elementType==0x0B00:
+                        thisElement.aName=self.stripNonASCII(data[start:offset]).rstrip()
+                elif recordType==0x1302:  #Columns and Rows
+                    if elementType==0x0B00:
+                        (thisElement.columns,thisElement.rows)=unpackFrom(">hh",data,start)
+                elif recordType==0x1906:  #Text String
+                    if elementType==0x0C00:
+                        thisElement.textString=data[start:offset]
+                elif recordType==0x2102:  #Path type
+                    if elementType in (0x0900,0x0C00):
+                        thisElement.pathType=unpackFrom(">h",data,start)[0]
+                elif recordType==0x0F03:  #Path width
+                    if elementType in (0x0900,0x0C00):
+                        thisElement.pathWidth=unpackFrom(">i",data,start)[0]
+                elif recordType==0x2A02:  #Node Type
+                    if elementType==0x1500:
+                        thisElement.nodeType=unpackFrom(">h",data,start)[0]
+                elif recordType==0x2D00:  #Box
+                    if elementType==0x2E02:
+                        thisElement.boxValue=unpackFrom(">h",data,start)[0]
+            elif thisStructure != None:
+                if recordType in elementClasses:
+                    elementType = recordType
+                    if columnar and recordType in columnElements:
+                        thisElement = columnElements[recordType]
+                        thisElement.__dict__.clear()
+                        thisElement.__dict__.update(columnDefaults[recordType])
+                    else:
+                        thisElement = elementClasses[recordType]()
+                elif recordType==0x0606:
+                    thisStructure.name = self.stripNonASCII(data[start:offset])
+                elif recordType==0x0700:  #we've reached the end of the structure
+                    self.layoutObject.structures[thisStructure.name]=thisStructure
+                    thisStructure = None
+                    if structureCount != None:
+                        structureCount -= 1
+                        if structureCount == 0:
+                            break
+            elif recordType==0x0502 and recordLength==28:
+                thisStructure = GdsStructure(columnar)
+                dates = unpackFrom(">12h",data,start)
+                thisStructure.createDate=dates[0:6]
+                thisStructure.modDate=dates[6:12]
+            else:
+                #anything else outside of a structure is the end of the library
+                break
+        else:
+            print "There was an error reading the structure list."
+        self.fileOffset = offset
 
-    def findStruct(self,fileName,findStructName):
-	#print"find struct"
-        self.fileHandle = open(fileName,"rb")
-	self.debugToTerminal=0
+    def readGds2Buffered(self):
         if(self.readHeader()):  #did the header read ok?
-            record = self.findStruct_readNextStruct(findStructName)
-            while(record == 1):
-                record = self.findStruct_readNextStruct(findStructName)
-            #now we have fallen out of the while, which means we are out of structures
-            #so test for end of library
+            self.readStructuresBuffered()
         else:
             print "There was an error parsing the GDS header.  Aborting..."
-	self.fileHandle.close()
-	#print "End the search of",findStructName
-        #self.layoutObject.initialize()
-	return record
 
-    def findStruct_readNextStruct(self,findStructName):
-	self.debugToTerminal=0
-        thisStructure = GdsStructure()        
-        record = self.readNextRecord()
-        idBits = (record[0],record[1])
-        if(idBits==('\x05','\x02') and len(record)==26):
-            createYear = struct.unpack(">h",record[2]+record[3])[0]            
-            createMonth = struct.unpack(">h",record[4]+record[5])[0]
-            createDay = struct.unpack(">h",record[6]+record[7])[0]
-            createHour = struct.unpack(">h",record[8]+record[9])[0]
-            createMinute = struct.unpack(">h",record[10]+record[11])[0]
-            createSecond = struct.unpack(">h",record[12]+record[13])[0]
-            modYear = struct.unpack(">h",record[14]+record[15])[0]
-            modMonth = struct.unpack(">h",record[16]+record[17])[0]
-            modDay = struct.unpack(">h",record[18]+record[19])[0]
-            modHour = struct.unpack(">h",record[20]+record[21])[0]
-            modMinute = struct.unpack(">h",record[22]+record[23])[0]
-            modSecond = struct.unpack(">h",record[24]+record[25])[0]
-            thisStructure.createDate=(createYear,createMonth,createDay,createHour,createMinute,createSecond)
-            thisStructure.modDate=(modYear,modMonth,modDay,modHour,modMinute,modSecond)
+    def indexStructuresBuffered(self,index):
+        """
+        Walk the structures in the buffered file data once and record where each one
+        starts and ends, without building any elements. The referenced structure names,
+        text labels and layers are kept so the hierarchy can be found without reading
+        the structures themselves.
+        """
+        data = self.fileData
+        unpackFrom = struct.unpack_from
+        layersSeen = set(index.layers)
+        index.headerEnd = self.fileOffset
+        structureStart = None
+        structureName = None
+        references = None
+        labels = None
+        inElement = False
+        offset = self.fileOffset
+        end = len(data)
+        while offset+4 <= end:
+            (recordLength,recordType) = unpackFrom(">HH",data,offset)
+            if recordLength < 4:
+                break
+            start = offset+4
+            offset += recordLength
+            if inElement:
+                if recordType==0x1100:  #End Of Element
+                    inElement = False
+                elif recordType==0x1206:  #Reference Name
+                    referenceName = self.stripNonASCII(data[start:offset]).rstrip()
+                    if referenceName not in references:
+                        references.append(referenceName)
+                elif recordType==0x0D02:  #Layer
+                    drawingLayer = unpackFrom(">h",data,start)[0]
+                    if drawingLayer not in layersSeen:
+                        layersSeen.add(drawingLayer)
+                        index.layers.append(drawingLayer)
+                elif recordType==0x1906:  #Text String
+                    labels.append(data[start:offset])
+            elif structureStart != None:
+                if recordType in (0x0800,0x0900,0x0A00,0x0B00,0x0C00,0x1500,0x2E02):
+                    inElement = True
+                elif recordType==0x0606:
+                    structureName = self.stripNonASCII(data[start:offset])
+                elif recordType==0x0700:  #we've reached the end of the structure
+                    if structureName not in index.offsets:
+                        index.names.append(structureName)
+                    index.offsets[structureName] = (structureStart,offset)
+                    index.references[structureName] = references
+                    index.labels[structureName] = labels
+                    structureStart = None
+            elif recordType==0x0502 and recordLength==28:
+                structureStart = offset-recordLength
+                structureName = ""
+                references = []
+                labels = []
+            else:
+                #anything else outside of a structure is the end of the library
+                break
         else:
-            #means we have hit the last structure, so return the record
-            #to whoever called us to do something with it
-            return record
-	wantedStruct=0
-        while 1:
-            record = self.readNextRecord()
-            idBits = (record[0],record[1])
-            if idBits==('\x07','\x00'): break; #we've reached the end of the structure
-            elif(idBits==('\x06','\x06')):
-                structName = self.stripNonASCII(record[2::]) #(record[2:1] + record[1::]).rstrip()
-#		print ''.[x for x in structName if ord(x) < 128]
-#	        stripped = (c for c in structName if 0 < ord(c) < 127)
-#	        structName = "".join(stripped)
-#                print self.stripNonASCII(structName) ##FIXME: trimming by Tom g.  ##could be an issue here with string trimming!
-                thisStructure.name = structName
-		if(findStructName==thisStructure.name):
-			wantedStruct=1
-                if(self.debugToTerminal==1):
-                    print "\tStructure Name: "+structName
-            elif(idBits==('\x08','\x00')):
-                thisStructure.boundaries+=[self.readBoundary()]
-            elif(idBits==('\x09','\x00')):
-                thisStructure.paths+=[self.readPath()]
-            elif(idBits==('\x0A','\x00')):
-                thisStructure.srefs+=[self.readSref()]
-            elif(idBits==('\x0B','\x00')):
-                thisStructure.arefs+=[self.readAref()]
-            elif(idBits==('\x0C','\x00')):
-                thisStructure.texts+=[self.readText()]
-            elif(idBits==('\x15','\x00')):
-                thisStructure.nodes+=[self.readNode()]
-            elif(idBits==('\x2E','\x02')):
-                thisStructure.boxes+=[self.readBox()]
-        if(self.debugToTerminal==1):        
-            print "\tEnd of Structure."
-        self.layoutObject.structures[structName]=thisStructure #add this structure to the layout object
-	if(wantedStruct == 0):
-		return 1
-	else:
-		#print "\tDone with collectting bound. Return"
-		return [0,thisStructure.boundaries]
+            print "There was an error reading the structure list."
+        self.fileOffset = offset
+        return index
 
-    def findLabel(self,fileName,findLabelName):
-	#print"find Label"
-        self.fileHandle = open(fileName,"rb")
-	self.debugToTerminal=0
+    def indexFile(self,fileName,persistIndex=False):
+        """
+        Read the header of a GDS file and return the index of its structures.
+        With persistIndex, the index is saved next to the file and reused until
+        the file changes, so only the header has to be read.
+        """
+        index = None
+        if persistIndex:
+            index = loadStructureIndex(fileName)
+        fileHandle = open(fileName,"rb")
+        if index != None:
+            self.fileData = fileHandle.read(index.headerEnd)
+        else:
+            self.fileData = fileHandle.read()
+        fileHandle.close()
+        self.fileOffset = 0
         if(self.readHeader()):  #did the header read ok?
-            record = self.findLabel_readNextStruct(findLabelName)
-            while(record == 1):
-                record = self.findLabel_readNextStruct(findLabelName)
-            #now we have fallen out of the while, which means we are out of structures
-            #so test for end of library
+            if index == None:
+                index = self.indexStructuresBuffered(GdsStructureIndex(fileName))
+                if persistIndex:
+                    index.save()
         else:
             print "There was an error parsing the GDS header.  Aborting..."
-	self.fileHandle.close()
-	#print "End the search of",findStructName
-        #self.layoutObject.initialize()
-	return record
+            index = GdsStructureIndex(fileName)
+        self.fileData = None
+        return index
 
-    def findLabel_readNextStruct(self,findLabelName):
-	self.debugToTerminal=0
-        thisStructure = GdsStructure()        
-        record = self.readNextRecord()
-        idBits = (record[0],record[1])
-        if(idBits==('\x05','\x02') and len(record)==26):
-            createYear = struct.unpack(">h",record[2]+record[3])[0]            
-            createMonth = struct.unpack(">h",record[4]+record[5])[0]
-            createDay = struct.unpack(">h",record[6]+record[7])[0]
-            createHour = struct.unpack(">h",record[8]+record[9])[0]
-            createMinute = struct.unpack(">h",record[10]+record[11])[0]
-            createSecond = struct.unpack(">h",record[12]+record[13])[0]
-            modYear = struct.unpack(">h",record[14]+record[15])[0]
-            modMonth = struct.unpack(">h",record[16]+record[17])[0]
-            modDay = struct.unpack(">h",record[18]+record[19])[0]
-            modHour = struct.unpack(">h",record[20]+record[21])[0]
-            modMinute = struct.unpack(">h",record[22]+record[23])[0]
-            modSecond = struct.unpack(">h",record[24]+record[25])[0]
-            thisStructure.createDate=(createYear,createMonth,createDay,createHour,createMinute,createSecond)
-            thisStructure.modDate=(modYear,modMonth,modDay,modHour,modMinute,modSecond)
+    def readIndexedStructure(self,index,structureName):
+        """
+        Read one structure of an indexed file into the layout. The structures already
+        read come from the indexed file, so a file that has changed is not re-indexed.
+        """
+        if not index.isCurrent():
+            raise IOError("%s changed after it was indexed, so structure %s can not be read. Load the file again."
+                          %(index.fileName,structureName))
+        (start,end) = index.offsets[structureName]
+        fileHandle = open(index.fileName,"rb")
+        fileHandle.seek(start)
+        self.fileData = fileHandle.read(end-start)
+        fileHandle.close()
+        self.fileOffset = 0
+        self.readStructuresBuffered(structureCount=1)
+        self.fileData = None
+
+    def loadFromFile(self, fileName, lazy=True, persistIndex=False):
+        """
+        Read a GDS file into the layout. The buffered reader indexes the structures
+        and only reads each structure when it is first used, unless lazy is False.
+        """
+        if self.buffered and lazy:
+            index = self.indexFile(fileName,persistIndex)
+            for layerNumber in index.layers:
+                if layerNumber not in self.layoutObject.layerNumbersInUse:
+                    self.layoutObject.layerNumbersInUse.append(layerNumber)
+            self.layoutObject.structures = LazyStructures(self,index,self.layoutObject.structures)
+        elif self.buffered:
+            fileHandle = open(fileName,"rb")
+            self.fileData = fileHandle.read()
+            fileHandle.close()
+            self.fileOffset = 0
+            self.readGds2Buffered()
+            self.fileData = None
         else:
-            #means we have hit the last structure, so return the record
-            #to whoever called us to do something with it
-            return record
-	wantedLabel=0
-	wantedtexts=[GdsText()]
+            self.fileHandle = open(fileName,"rb")
+            self.readGds2()
+            self.fileHandle.close()
+        self.layoutObject.initialize()
+
+##############################################
+
+    def iterRecords(self,fileName):
+        """
+        Generate the (recordType,data) of every record in a GDS file. The record type
+        includes the data type byte, so a boundary is 0x0800 and XY data is 0x1003.
+        The file is read one record at a time, so it is never held in memory.
+        """
+        fileHandle = open(fileName,"rb")
+        try:
+            for record in self.recordsFromHandle(fileHandle):
+                yield record
+        finally:
+            fileHandle.close()
+
+    def recordsFromHandle(self,fileHandle):
+        """Generate the (recordType,data) of the records from the current position of an open file"""
         while 1:
-            record = self.readNextRecord()
-            idBits = (record[0],record[1])
-            if idBits==('\x07','\x00'): break; #we've reached the end of the structure
-            elif(idBits==('\x06','\x06')):
-                structName = self.stripNonASCII(record[2::]) #(record[2:1] + record[1::]).rstrip()
-#		print ''.[x for x in structName if ord(x) < 128]
-#	        stripped = (c for c in structName if 0 < ord(c) < 127)
-#	        structName = "".join(stripped)
-#                print self.stripNonASCIIx(structName) ##FIXME: trimming by Tom g.  ##could be an issue here with string trimming!
-                thisStructure.name = structName
-                if(self.debugToTerminal==1):
-                    print "\tStructure Name: "+structName
-            elif(idBits==('\x08','\x00')):
-                thisStructure.boundaries+=[self.readBoundary()]
-            elif(idBits==('\x09','\x00')):
-                thisStructure.paths+=[self.readPath()]
-            elif(idBits==('\x0A','\x00')):
-                thisStructure.srefs+=[self.readSref()]
-            elif(idBits==('\x0B','\x00')):
-                thisStructure.arefs+=[self.readAref()]
-            elif(idBits==('\x0C','\x00')):
-		label=self.readText()
-		#Be careful: label.textString contains one space string in it. Delete that one before use it
-		if( findLabelName == label.textString[0:(len(label.textString)-1)] ):
-			wantedLabel=1
-			# BINWU: Cleanup
-			#print"Find the Label",findLabelName
-			wantedtexts+=[label]
-                thisStructure.texts+=[label]
-		if(self.debugToTerminal == 1):
-			print label.textString[0:(len(label.textString)-1)],findLabelName,( findLabelName == label.textString[0:(len(label.textString)-1)] )
-			# BINWU: Cleanup
-			#print thisStructure.name				
-			#print thisStructure.texts		
-            elif(idBits==('\x15','\x00')):
-                thisStructure.nodes+=[self.readNode()]
-            elif(idBits==('\x2E','\x02')):
-                thisStructure.boxes+=[self.readBox()]
-        if(self.debugToTerminal==1):        
-            print "\tEnd of Structure."
-        self.layoutObject.structures[structName]=thisStructure #add this structure to the layout object
-	if(wantedLabel == 0):
-		return 1
-	else:
-		#print "\tDone with collectting bound. Return"
-		return [0,wantedtexts]
+            header = fileHandle.read(4)
+            if len(header) < 4:
+                return
+            (recordLength,recordType) = struct.unpack(">HH",header)
+            if recordLength < 4:
+                #the zero padding at the end of a file
+                return
+            yield (recordType,fileHandle.read(recordLength-4))
+
+    def iterStructures(self,fileName,structureFilter=None,layerFilter=None):
+        """
+        Generate a (structure,elements) pair for each structure in a GDS file, where the
+        structure only has its name and dates and elements generates its decoded elements.
+        Like itertools.groupby, the elements of a structure have to be used before moving
+        on to the next structure. The filters are None, a function or a collection of the
+        structure names and drawing layers to keep; references have no layer and are always kept.
+        The header is read into the layout object, so a Gds2writer of the same layout object
+        can write the structures to a new file with writeStream. Only one element is in memory
+        at a time.
+        """
+        self.fileData = None
+        self.fileHandle = open(fileName,"rb")
+        try:
+            if not self.readHeader():
+                return
+            records = self.recordsFromHandle(self.fileHandle)
+            thisStructure = None
+            for (recordType,data) in records:
+                if recordType==0x0502 and len(data)==24:
+                    thisStructure = GdsStructure()
+                    dates = struct.unpack(">12h",data)
+                    thisStructure.createDate = dates[0:6]
+                    thisStructure.modDate = dates[6:12]
+                elif recordType==0x0606 and thisStructure != None:
+                    thisStructure.name = self.stripNonASCII(data)
+                    elements = self.iterStructureElements(records,layerFilter)
+                    if matchesFilter(structureFilter,thisStructure.name):
+                        yield (thisStructure,elements)
+                    #skip whatever was not used, up to the end of the structure
+                    for element in elements:
+                        pass
+                    thisStructure = None
+                elif recordType==0x0400:  #we've reached the end of the library
+                    return
+        finally:
+            self.fileHandle.close()
+            self.fileHandle = None
 
+    def iterElements(self,fileName,structureFilter=None,layerFilter=None):
+        """
+        Generate the (structure name,element) of every element in a GDS file, with the
+        same filters as iterStructures. Only one element is in memory at a time.
+        """
+        for (thisStructure,elements) in self.iterStructures(fileName,structureFilter,layerFilter):
+            for element in elements:
+                yield (thisStructure.name,element)
+
+    def iterStructureElements(self,records,layerFilter=None):
+        """Decode the elements from a record generator, up to the end of the structure"""
+        thisElement = None
+        elementType = None
+        for (recordType,data) in records:
+            if thisElement != None:
+                if recordType==0x1100:  #End Of Element
+                    if elementType in (0x0A00,0x0B00) or matchesFilter(layerFilter,thisElement.drawingLayer):
+                        yield thisElement
+                    thisElement = None
+                else:
+                    self.decodeElementRecord(thisElement,elementType,recordType,data)
+            elif recordType in elementClasses:
+                elementType = recordType
+                thisElement = elementClasses[recordType]()
+            elif recordType==0x0700:  #we've reached the end of the structure
+                return
+
+    def decodeElementRecord(self,thisElement,elementType,recordType,data):
+        """
+        Decode one record of an element. This is the same decoding that readStructuresBuffered
+        does inline, where a method call per record would slow down reading whole files.
+        """
+        if recordType==0x1003:  #XY Data Points
+            if elementType==0x0A00:
+                thisElement.coordinates=struct.unpack_from(">ii",data)
+            elif elementType==0x0B00:
+                (originX,originY,columnX,columnY,rowX,rowY)=struct.unpack_from(">6i",data)
+                thisElement.coordinates=[(originX,originY),(columnX,columnY),(rowX,rowY)]
+            elif elementType==0x0C00:
+                thisElement.coordinates=[struct.unpack_from(">ii",data)]
+            else:
+                thisElement.coordinates=decodeXY(data,0,len(data))
+        elif recordType==0x0D02:  #Layer
+            if elementType not in (0x0A00,0x0B00):
+                thisElement.drawingLayer=struct.unpack_from(">h",data)[0]
+        elif recordType==0x1602:  #Purpose
+            if elementType in (0x0800,0x0900,0x0C00,0x2E02):
+                thisElement.purposeLayer=struct.unpack_from(">h",data)[0]
+        elif recordType==0x0E02:  #DataType
+            if elementType==0x0800:
+                thisElement.dataType=struct.unpack_from(">h",data)[0]
+        elif recordType==0x2601:  #ELFLAGS
+            if elementType==0x2E02:
+                thisElement.elementFlags=struct.unpack_from(">h",data)
+            else:
+                thisElement.elementFlags=struct.unpack_from(">h",data)[0]
+        elif recordType==0x2F03:  #PLEX
+            thisElement.plex=struct.unpack_from(">i",data)[0]
+        elif recordType==0x1A01:  #Transformation
+            if elementType in (0x0A00,0x0B00,0x0C00):
+                transFlags = struct.unpack_from(">H",data)[0]
+                thisElement.transFlags=(bool(transFlags&0x8000),bool(transFlags&0x0002),bool(transFlags&0x0004))
+        elif recordType==0x1B05:  #Magnify
+            if elementType in (0x0A00,0x0B00,0x0C00):
+                thisElement.magFactor=self.ieeeDoubleFromIbmData(data[0:8])
+        elif recordType==0x1C05:  #Rotate Angle
+            if elementType in (0x0A00,0x0B00,0x0C00):
+                thisElement.rotateAngle=self.ieeeDoubleFromIbmData(data[0:8])
+        elif recordType==0x1206:  #Reference Name
+            if elementType==0x0A00:
+                thisElement.sName=self.stripNonASCII(data).rstrip()
+            elif elementType==0x0B00:
+                thisElement.aName=self.stripNonASCII(data).rstrip()
+        elif recordType==0x1302:  #Columns and Rows
+            if elementType==0x0B00:
+                (thisElement.columns,thisElement.rows)=struct.unpack_from(">hh",data)
+        elif recordType==0x1906:  #Text String
+            if elementType==0x0C00:
+                thisElement.textString=data
+        elif recordType==0x2102:  #Path type
+            if elementType in (0x0900,0x0C00):
+                thisElement.pathType=struct.unpack_from(">h",data)[0]
+        elif recordType==0x0F03:  #Path width
+            if elementType in (0x0900,0x0C00):
+                thisElement.pathWidth=struct.unpack_from(">i",data)[0]
+        elif recordType==0x2A02:  #Node Type
+            if elementType==0x1500:
+                thisElement.nodeType=struct.unpack_from(">h",data)[0]
+        elif recordType==0x2D00:  #Box
+            if elementType==0x2E02:
+                thisElement.boxValue=struct.unpack_from(">h",data)[0]
+
+    def findStruct(self,fileName,findStructName):
+        """
+        Read the named structure from a GDS file and return [0,boundaries],
+        or the end of library record if the file does not have it.
+        """
+        index = self.indexFile(fileName)
+        if findStructName not in index.offsets:
+            return "\x04\x00"
+        self.readIndexedStructure(index,findStructName)
+        return [0,self.layoutObject.structures[findStructName].boundaries]
+
+    def findLabel(self,fileName,findLabelName):
+        """
+        Find the first structure in a GDS file with the label and return [0,texts]
+        where texts are a blank text and then the matching labels,
+        or the end of library record if no structure has it.
+        """
+        index = self.indexFile(fileName)
+        for structureName in index.names:
+            #the label strings end with a padding character
+            if findLabelName in [label[0:(len(label)-1)] for label in index.labels[structureName]]:
+                self.readIndexedStructure(index,structureName)
+                wantedtexts=[GdsText()]
+                for label in self.layoutObject.structures[structureName].texts:
+                    if findLabelName == label.textString[0:(len(label.textString)-1)]:
+                        wantedtexts+=[label]
+                return [0,wantedtexts]
+        return "\x04\x00"
@@ -2,14 +2,34 @@
 import struct
 from gdsPrimitives import *
 
+#pre-packed records (length and record type) used by the buffered writer
+boundaryRecord = struct.pack(">hH",4,0x0800)
+pathRecord = struct.pack(">hH",4,0x0900)
+srefRecord = struct.pack(">hH",4,0x0A00)
+endElementRecord = struct.pack(">hH",4,0x1100)
+endStructureRecord = struct.pack(">hH",4,0x0700)
+#record templates with a single 2 or 4 byte value
+shortRecord = struct.Struct(">hHh")
+unsignedShortRecord = struct.Struct(">hHH")
+intRecord = struct.Struct(">hHi")
+dateRecord = struct.Struct(">hH12h")
+
 class Gds2writer:
     """Class to take a populated layout class and write it to a file in GDSII format"""
     ## Based on info from http://www.rulabinsky.com/cavd/text/chapc.html
     
-    def __init__(self,layoutObject):
+    def __init__(self,layoutObject,buffered = True):
         self.fileHandle = 0
         self.layoutObject = layoutObject
         self.debugToTerminal=0  #do we dump debug data to the screen
+        #stage the records in memory and write them out in large chunks
+        #instead of doing one write per record
+        self.buffered = buffered
+        self.buffer = None
+        self.flushSize = 1<<20
+        self.xyStructs = dict()  #XY record packers keyed by number of points
+        self.dateRecords = dict()  #packed structure headers keyed by date
+        self.ibmDoubles = dict()  #IBM doubles keyed by value
         
     def print64AsBinary(self,number):
         #debugging method for binary inspection
@@ -94,7 +114,152 @@ class Gds2writer:
     def writeRecord(self,record):
         recordLength = len(record)+2  #make sure to include this in the length
         recordLengthAscii=struct.pack(">h",recordLength)
-        self.fileHandle.write(recordLengthAscii+record)
+        if self.buffer != None:
+            self.buffer += recordLengthAscii
+            self.buffer += record
+        else:
+            self.fileHandle.write(recordLengthAscii+record)
+
+    def flushBuffer(self):
+        self.fileHandle.write(self.buffer)
+        del self.buffer[:]
+
+    def packDouble(self,ieeeDouble):
+        #the same few angles and magnifications show up over and over
+        if ieeeDouble not in self.ibmDoubles:
+            self.ibmDoubles[ieeeDouble] = self.ibmDataFromIeeeDouble(ieeeDouble)
+        return self.ibmDoubles[ieeeDouble]
+
+    def packXY(self,coordinates):
+        #pack a whole list of points with one call
+        numPoints = len(coordinates)
+        if numPoints not in self.xyStructs:
+            self.xyStructs[numPoints] = struct.Struct(">hH%di"%(2*numPoints))
+        points = [value for coordinate in coordinates for value in (coordinate[0],coordinate[1])]
+        return self.xyStructs[numPoints].pack(4+8*numPoints,0x1003,*points)
+
+    def packBoundary(self,thisBoundary):
+        #same records as writeBoundary, packed into one string
+        records = [boundaryRecord]
+        if(thisBoundary.elementFlags!=""):
+            records.append(shortRecord.pack(6,0x2601,thisBoundary.elementFlags))
+        if(thisBoundary.plex!=""):
+            records.append(intRecord.pack(8,0x2F03,thisBoundary.plex))
+        if(thisBoundary.drawingLayer!=""):
+            records.append(shortRecord.pack(6,0x0D02,thisBoundary.drawingLayer))
+        if(thisBoundary.purposeLayer):
+            records.append(shortRecord.pack(6,0x1602,thisBoundary.purposeLayer))
+        if(thisBoundary.dataType!=""):
+            records.append(shortRecord.pack(6,0x0E02,thisBoundary.dataType))
+        if(thisBoundary.coordinates!=""):
+            records.append(self.packXY(thisBoundary.coordinates))
+        records.append(endElementRecord)
+        return "".join(records)
+
+    def packPath(self,thisPath):
+        #same records as writePath, packed into one string
+        records = [pathRecord]
+        if(thisPath.elementFlags != ""):
+            records.append(shortRecord.pack(6,0x2601,thisPath.elementFlags))
+        if(thisPath.plex!=""):
+            records.append(intRecord.pack(8,0x2F03,thisPath.plex))
+        if(thisPath.drawingLayer):
+            records.append(shortRecord.pack(6,0x0D02,thisPath.drawingLayer))
+        if(thisPath.purposeLayer):
+            records.append(shortRecord.pack(6,0x1602,thisPath.purposeLayer))
+        if(thisPath.pathType):
+            records.append(shortRecord.pack(6,0x2102,thisPath.pathType))
+        if(thisPath.pathWidth):
+            records.append(intRecord.pack(8,0x0F03,thisPath.pathWidth))
+        if(thisPath.coordinates):
+            records.append(self.packXY(thisPath.coordinates))
+        records.append(endElementRecord)
+        return "".join(records)
+
+    def packBoundaryColumns(self,boundaries):
+        #same records as packBoundary, straight from the arrays of a columnar structure
+        records = []
+        layerRecords = []
+        for layer in boundaries.layers:
+            (drawingLayer,purposeLayer) = layer.layer
+            layerRecord = boundaryRecord
+            if(drawingLayer!=""):
+                layerRecord += shortRecord.pack(6,0x0D02,drawingLayer)
+            if(purposeLayer):
+                layerRecord += shortRecord.pack(6,0x1602,purposeLayer)
+            layerRecords.append(layerRecord)
+        for index in xrange(len(boundaries)):
+            if index in boundaries.extras:
+                records.append(self.packBoundary(boundaries[index]))
+                continue
+            slot = boundaries.slots[index]
+            layer = boundaries.layers[slot]
+            position = boundaries.positions[index]
+            xy = layer.packedXY(position)
+            records.append(layerRecords[slot])
+            records.append(shortRecord.pack(6,0x0E02,layer.fields["dataType"][position]))
+            records.append(struct.pack(">hH",4+len(xy),0x1003))
+            records.append(xy)
+            records.append(endElementRecord)
+        return "".join(records)
+
+    def packPathColumns(self,paths):
+        #same records as packPath, straight from the arrays of a columnar structure
+        records = []
+        for index in xrange(len(paths)):
+            if index in paths.extras:
+                records.append(self.packPath(paths[index]))
+                continue
+            layer = paths.layers[paths.slots[index]]
+            position = paths.positions[index]
+            (drawingLayer,purposeLayer) = layer.layer
+            pathType = layer.fields["pathType"][position]
+            pathWidth = layer.fields["pathWidth"][position]
+            xy = layer.packedXY(position)
+            records.append(pathRecord)
+            if(drawingLayer):
+                records.append(shortRecord.pack(6,0x0D02,drawingLayer))
+            if(purposeLayer):
+                records.append(shortRecord.pack(6,0x1602,purposeLayer))
+            if(pathType):
+                records.append(shortRecord.pack(6,0x2102,pathType))
+            if(pathWidth):
+                records.append(intRecord.pack(8,0x0F03,pathWidth))
+            if(xy):
+                records.append(struct.pack(">hH",4+len(xy),0x1003))
+                records.append(xy)
+            records.append(endElementRecord)
+        return "".join(records)
+
+    def packSref(self,thisSref):
+        #same records as writeSref, packed into one string
+        records = [srefRecord]
+        if(thisSref.elementFlags != ""):
+            records.append(shortRecord.pack(6,0x2601,thisSref.elementFlags))
+        if(thisSref.plex!=""):
+            records.append(intRecord.pack(8,0x2F03,thisSref.plex))
+        if(thisSref.sName!=""):
+            records.append(struct.pack(">hH",4+len(thisSref.sName),0x1206)+thisSref.sName)
+        if(thisSref.transFlags!=""):
+            mirrorFlag = int(thisSref.transFlags[0])<<15
+            rotateFlag = int(thisSref.transFlags[1])<<1
+            magnifyFlag = int(thisSref.transFlags[2])<<3
+            records.append(unsignedShortRecord.pack(6,0x1A01,mirrorFlag|rotateFlag|magnifyFlag))
+        if(thisSref.magFactor!=""):
+            records.append(struct.pack(">hH",12,0x1B05)+self.packDouble(thisSref.magFactor))
+        if(thisSref.rotateAngle!=""):
+            records.append(struct.pack(">hH",12,0x1C05)+self.packDouble(thisSref.rotateAngle))
+        if(thisSref.coordinates!=""):
+            records.append(self.packXY([thisSref.coordinates]))
+        records.append(endElementRecord)
+        return "".join(records)
+
+    def packStructureHeader(self,thisStructure):
+        #most structures share a handful of dates, so only pack each one once
+        dates = tuple(thisStructure.createDate[0:6])+tuple(thisStructure.modDate[0:6])
+        if dates not in self.dateRecords:
+            self.dateRecords[dates] = dateRecord.pack(28,0x0502,*dates)
+        return self.dateRecords[dates]
 
     def writeHeader(self):
         ##  Header
@@ -314,12 +479,15 @@ class Gds2writer:
         if(thisAref.aName):
             idBits='\x12\x06'
             aName = thisAref.aName
+            ##caveat: the name needs to be an EVEN number of characters
+            if(len(aName)%2 == 1):
+                aName = aName + '\x00'
             self.writeRecord(idBits+aName)
         if(thisAref.transFlags):
             idBits='\x1A\x01'
             mirrorFlag = int(thisAref.transFlags[0])<<15
             rotateFlag = int(thisAref.transFlags[1])<<1
-            magnifyFlag = int(thisAref.transFlags[0])<<3
+            magnifyFlag = int(thisAref.transFlags[2])<<3
             transFlags = struct.pack(">H",mirrorFlag|rotateFlag|magnifyFlag)
             self.writeRecord(idBits+transFlags)
         if(thisAref.magFactor):
@@ -330,6 +498,10 @@ class Gds2writer:
             idBits='\x1C\x05'            
             rotateAngle=self.ibmDataFromIeeeDouble(thisAref.rotateAngle)
             self.writeRecord(idBits+rotateAngle)
+        if(thisAref.columns!="" and thisAref.rows!=""):
+            idBits='\x13\x02'  #Columns and Rows
+            colRow = struct.pack(">hh",thisAref.columns,thisAref.rows)
+            self.writeRecord(idBits+colRow)
         if(thisAref.coordinates):
             idBits='\x10\x03' #XY Data Points
             coordinateRecord = idBits
@@ -483,6 +655,9 @@ class Gds2writer:
     def writeNextStructure(self,structureName):
         #first put in the structure head
         thisStructure = self.layoutObject.structures[structureName]
+        if self.buffer != None:
+            self.writeNextStructureBuffered(structureName,thisStructure)
+            return
         idBits='\x05\x02'
         createYear = struct.pack(">h",thisStructure.createDate[0])
         createMonth = struct.pack(">h",thisStructure.createDate[1])
@@ -525,6 +700,37 @@ class Gds2writer:
         idBits='\x07\x00'
         self.writeRecord(idBits)
     
+    def writeNextStructureBuffered(self,structureName,thisStructure):
+        staged = self.buffer
+        staged += self.packStructureHeader(thisStructure)
+        ##caveat: the name needs to be an EVEN number of characters
+        if(len(structureName)%2 == 1):
+            #pad with a zero
+            structureName = structureName + '\x00'
+        self.writeRecord('\x06\x06'+structureName)
+        if thisStructure.isColumnar():
+            staged += self.packBoundaryColumns(thisStructure.boundaries)
+            staged += self.packPathColumns(thisStructure.paths)
+        else:
+            for boundary in thisStructure.boundaries:
+                staged += self.packBoundary(boundary)
+            for path in thisStructure.paths:
+                staged += self.packPath(path)
+        for sref in thisStructure.srefs:
+            staged += self.packSref(sref)
+        #the rest are rare, so they go through the record writers
+        for aref in thisStructure.arefs:
+            self.writeAref(aref)
+        for text in thisStructure.texts:
+            self.writeText(text)
+        for node in thisStructure.nodes:
+            self.writeNode(node)
+        for box in thisStructure.boxes:
+            self.writeBox(box)
+        staged += endStructureRecord
+        if len(staged) >= self.flushSize:
+            self.flushBuffer()
+
     def writeGds2(self):
         self.writeHeader();  #first, put the header in
         #go through each structure in the layout and write it to the file
@@ -534,7 +740,70 @@ class Gds2writer:
         idBits='\x04\x00'
         self.writeRecord(idBits)
         
+    def writeStructureStart(self,thisStructure):
+        #the structure head and name, for structures written one element at a time
+        if self.buffer != None:
+            self.buffer += self.packStructureHeader(thisStructure)
+        else:
+            self.writeRecord(self.packStructureHeader(thisStructure)[2:])
+        structureName = thisStructure.name
+        ##caveat: the name needs to be an EVEN number of characters
+        if(len(structureName)%2 == 1):
+            #pad with a zero
+            structureName = structureName + '\x00'
+        self.writeRecord('\x06\x06'+structureName)
+
+    def writeElement(self,thisElement):
+        if self.buffer != None and isinstance(thisElement,GdsBoundary):
+            self.buffer += self.packBoundary(thisElement)
+        elif self.buffer != None and isinstance(thisElement,GdsPath):
+            self.buffer += self.packPath(thisElement)
+        elif self.buffer != None and isinstance(thisElement,GdsSref):
+            self.buffer += self.packSref(thisElement)
+        elif isinstance(thisElement,GdsBoundary):
+            self.writeBoundary(thisElement)
+        elif isinstance(thisElement,GdsPath):
+            self.writePath(thisElement)
+        elif isinstance(thisElement,GdsSref):
+            self.writeSref(thisElement)
+        elif isinstance(thisElement,GdsAref):
+            self.writeAref(thisElement)
+        elif isinstance(thisElement,GdsText):
+            self.writeText(thisElement)
+        elif isinstance(thisElement,GdsNode):
+            self.writeNode(thisElement)
+        elif isinstance(thisElement,GdsBox):
+            self.writeBox(thisElement)
+        if self.buffer != None and len(self.buffer) >= self.flushSize:
+            self.flushBuffer()
+
+    def writeStream(self,fileName,structures):
+        """
+        Write (structure,elements) pairs, such as the ones from Gds2reader.iterStructures,
+        to a file as they are generated, with the header from the layout object. The elements
+        are written in the order they come, so only one of them has to be in memory at a time.
+        """
+        self.fileHandle = open(fileName,"wb")
+        if self.buffered:
+            self.buffer = bytearray()
+        self.writeHeader()
+        for (thisStructure,elements) in structures:
+            self.writeStructureStart(thisStructure)
+            for thisElement in elements:
+                self.writeElement(thisElement)
+            self.writeRecord('\x07\x00')
+        self.writeRecord('\x04\x00')
+        if self.buffer != None:
+            self.flushBuffer()
+            self.buffer = None
+        self.fileHandle.close()
+
     def writeToFile(self,fileName):
         self.fileHandle = open(fileName,"wb")
+        if self.buffered:
+            self.buffer = bytearray()
         self.writeGds2()
+        if self.buffer != None:
+            self.flushBuffer()
+            self.buffer = None
         self.fileHandle.close()
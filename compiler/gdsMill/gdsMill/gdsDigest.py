@@ -0,0 +1,173 @@
+import hashlib
+
+def structureKeys(structure):
+    """
+    Return the canonical keys of the shapes in a structure and the (name,placement key)
+    of its references. The keys leave out the names, dates, element flags and the order
+    of the elements, so two structures with the same geometry have the same keys.
+    """
+    shapes = []
+    for boundary in structure.boundaries:
+        shapes.append(repr(("boundary",boundary.drawingLayer,boundary.purposeLayer,
+                            valueOrDefault(boundary.dataType,0),polygonKey(boundary.coordinates))))
+    for path in structure.paths:
+        points = pointsKey(path.coordinates)
+        shapes.append(repr(("path",path.drawingLayer,path.purposeLayer,valueOrDefault(path.pathType,0),
+                            numberKey(path.pathWidth),min(points,points[::-1]))))
+    for text in structure.texts:
+        shapes.append(repr(("text",text.drawingLayer,text.purposeLayer,text.textString.rstrip("\x00"),
+                            placementKey(text),valueOrDefault(text.pathType,0),numberKey(text.pathWidth),
+                            valueOrDefault(text.presentationFlags,0))))
+    for node in structure.nodes:
+        shapes.append(repr(("node",node.drawingLayer,valueOrDefault(node.nodeType,0),pointsKey(node.coordinates))))
+    for box in structure.boxes:
+        shapes.append(repr(("box",box.drawingLayer,box.purposeLayer,valueOrDefault(box.boxValue,0),
+                            polygonKey(box.coordinates))))
+    shapes.sort()
+    references = []
+    for sref in structure.srefs:
+        references.append((sref.sName,repr(("sref",placementKey(sref)))))
+    for aref in structure.arefs:
+        references.append((aref.aName,repr(("aref",placementKey(aref),aref.columns,aref.rows))))
+    return (shapes,references)
+
+def structureDigests(structure, childDigest):
+    """
+    Return the (digest,local digest) of a structure. The digest hashes the digests of the
+    referenced structures, from childDigest(name), so it changes when anything below the
+    structure changes. The local digest hashes the names of the referenced structures instead,
+    so it only changes when the structure's own shapes or references change.
+    """
+    (shapes,references) = structureKeys(structure)
+    digest = hashlib.sha1()
+    localDigest = hashlib.sha1()
+    for shape in shapes:
+        digest.update(shape+"\n")
+        localDigest.update(shape+"\n")
+    for key in sorted([childDigest(name)+placement for (name,placement) in references]):
+        digest.update(key+"\n")
+    for key in sorted([repr(name.rstrip("\x00"))+placement for (name,placement) in references]):
+        localDigest.update(key+"\n")
+    return (digest.hexdigest(),localDigest.hexdigest())
+
+def compareLayouts(firstLayout, secondLayout, firstName=None, secondName=None):
+    """
+    Compare the hierarchies of two layouts from their root structures (or the named ones)
+    and return the (name,difference) of each structure that differs, top down. The difference
+    is "changed" when the structure's own shapes or references differ, "references" when only
+    structures below it differ, and "removed" or "added" when only one of the layouts has it.
+    A subtree with the same digest in both layouts is not visited, so the time spent
+    comparing is proportional to the part of the hierarchy that changed.
+    """
+    if firstName == None:
+        firstName = firstLayout.rootStructureName
+    if secondName == None:
+        secondName = secondLayout.rootStructureName
+    differences = []
+    visited = set()
+    pending = [(firstName,secondName)]
+    while len(pending) > 0:
+        (first,second) = pending.pop(0)
+        if (first,second) in visited:
+            continue
+        visited.add((first,second))
+        if firstLayout.structureDigest(first) == secondLayout.structureDigest(second):
+            continue
+        if firstLayout.structureDigest(first,local=True) != secondLayout.structureDigest(second,local=True):
+            differences.append((first,"changed"))
+        else:
+            differences.append((first,"references"))
+        firstChildren = uniqueNames(firstLayout.referencedStructureNames(first))
+        secondChildren = uniqueNames(secondLayout.referencedStructureNames(second))
+        for name in firstChildren:
+            if name in secondChildren:
+                pending.append((name,name))
+            elif name not in secondLayout.structures and (name,None) not in visited:
+                visited.add((name,None))
+                differences.append((name,"removed"))
+        for name in secondChildren:
+            if name not in firstChildren and name not in firstLayout.structures and (None,name) not in visited:
+                visited.add((None,name))
+                differences.append((name,"added"))
+    return differences
+
+def uniqueNames(names):
+    """Return the names without repeats, in order"""
+    unique = []
+    for name in names:
+        if name not in unique:
+            unique.append(name)
+    return unique
+
+def valueOrDefault(value, default):
+    """Unset attributes are the empty string, which means the GDS default"""
+    if value == "" or value == None:
+        return default
+    return value
+
+def numberKey(value):
+    """Coordinates are integral database units, but added shapes may have them as floats"""
+    if value == "" or value == None:
+        return 0
+    return int(round(value))
+
+def pointsKey(coordinates):
+    if coordinates == "" or coordinates == None:
+        return ()
+    return tuple([(numberKey(x),numberKey(y)) for (x,y) in coordinates])
+
+def polygonKey(coordinates):
+    """
+    Return the points of a polygon from its smallest point, in the direction that
+    gives the smaller sequence, without the closing point or repeated points.
+    """
+    points = []
+    for point in pointsKey(coordinates):
+        if len(points) == 0 or points[-1] != point:
+            points.append(point)
+    if len(points) > 1 and points[0] == points[-1]:
+        del points[-1]
+    if len(points) == 0:
+        return ()
+    start = points.index(min(points))
+    forward = tuple(points[start:]+points[:start])
+    backward = (forward[0],)+forward[:0:-1]
+    return min(forward,backward)
+
+def placementKey(element):
+    """The transformation and position of a reference or text"""
+    transFlags = tuple([bool(flag) for flag in valueOrDefault(element.transFlags,(False,False,False))])
+    return (transFlags[0],float(valueOrDefault(element.magFactor,1)),float(valueOrDefault(element.rotateAngle,0)),
+            pointsKey(normalizedPoints(element.coordinates)))
+
+def normalizedPoints(coordinates):
+    """Srefs have a single (x,y) point rather than a list of points"""
+    if coordinates == "" or coordinates == None:
+        return []
+    if len(coordinates) == 2 and not isinstance(coordinates[0],(tuple,list)):
+        return [coordinates]
+    return coordinates
+
+def compareFiles(firstFileName, secondFileName, structureName=None):
+    """Compare two GDS files and return the differences, see compareLayouts"""
+    from gds2reader import Gds2reader
+    from vlsiLayout import VlsiLayout
+    layouts = []
+    for fileName in [firstFileName,secondFileName]:
+        layout = VlsiLayout()
+        Gds2reader(layout).loadFromFile(fileName)
+        layouts.append(layout)
+    return compareLayouts(layouts[0],layouts[1],structureName,structureName)
+
+if __name__ == "__main__":
+    #python gdsDigest.py first.gds second.gds [structure]
+    import sys
+    if len(sys.argv) not in (3,4):
+        print "usage: gdsDigest.py first.gds second.gds [structure]"
+        sys.exit(2)
+    differences = compareFiles(*sys.argv[1:])
+    for (name,difference) in differences:
+        print "%s %s"%(difference,name)
+    if len(differences) == 0:
+        print "same"
+    sys.exit(len(differences) > 0)
@@ -0,0 +1,153 @@
+import os
+import cPickle
+
+class GdsStructureIndex:
+    """
+    Class to represent an index of the structures in a GDS file: where each
+    structure starts and ends in the file, the structures it references, its
+    text labels and the layers used in the whole file.
+    """
+    version = 1
+
+    def __init__(self, fileName=None):
+        self.fileName = fileName
+        self.fileSize = None
+        self.fileModified = None
+        self.headerEnd = 0  #the structures start after the header
+        self.names = []  #structure names in file order
+        self.offsets = dict()  #name -> (start,end) byte offsets of the structure records
+        self.references = dict()  #name -> names of the referenced structures
+        self.labels = dict()  #name -> text strings in the structure
+        self.layers = []  #layers in the order they first appear in the file
+        if fileName != None:
+            fileStatus = os.stat(fileName)
+            self.fileSize = fileStatus.st_size
+            self.fileModified = fileStatus.st_mtime
+
+    def indexFileName(self):
+        """The index is persisted next to the GDS file"""
+        return self.fileName + ".index"
+
+    def save(self):
+        """Write the index next to the GDS file"""
+        fileHandle = open(self.indexFileName(),"wb")
+        cPickle.dump((self.version,self.__dict__),fileHandle,2)
+        fileHandle.close()
+
+    def isCurrent(self):
+        """Check that the GDS file has not changed since it was indexed"""
+        if not os.path.isfile(self.fileName):
+            return False
+        fileStatus = os.stat(self.fileName)
+        return (fileStatus.st_size == self.fileSize) and (fileStatus.st_mtime == self.fileModified)
+
+def loadStructureIndex(fileName):
+    """
+    Return the persisted index of a GDS file, or None if it has not been
+    saved or the GDS file has changed since.
+    """
+    index = GdsStructureIndex()
+    index.fileName = fileName
+    if not os.path.isfile(index.indexFileName()):
+        return None
+    try:
+        fileHandle = open(index.indexFileName(),"rb")
+        (version,attributes) = cPickle.load(fileHandle)
+        fileHandle.close()
+    except Exception:
+        return None
+    if version != GdsStructureIndex.version:
+        return None
+    index.__dict__.update(attributes)
+    index.fileName = fileName
+    if not index.isCurrent():
+        return None
+    return index
+
+class LazyStructures(dict):
+    """
+    Class to represent the structures of a layout read from an indexed GDS file.
+    Each structure is only read from the file the first time it is looked up,
+    but the dictionary otherwise behaves as if every structure was loaded.
+    """
+    def __init__(self, reader, index, structures=None):
+        dict.__init__(self)
+        self.reader = reader
+        self.index = index
+        #a dictionary of every name, so the names iterate in the same order as a loaded dictionary
+        self.allNames = dict()
+        self.unloaded = set()
+        if structures != None:
+            for name in structures:
+                self.allNames[name] = None
+                dict.__setitem__(self,name,structures[name])
+        for name in index.names:
+            self.allNames[name] = None
+            self.unloaded.add(name)
+
+    def isLoaded(self, name):
+        return name not in self.unloaded
+
+    def load(self, name):
+        """Read a structure from the file"""
+        self.reader.readIndexedStructure(self.index, name)
+        return dict.__getitem__(self,name)
+
+    def referencedNames(self, name):
+        """Return the names of the structures that a structure references"""
+        if name in self.unloaded:
+            return self.index.references[name]
+        structure = self[name]
+        return [sref.sName for sref in structure.srefs]+[aref.aName for aref in structure.arefs]
+
+    def __missing__(self, name):
+        if name in self.unloaded:
+            return self.load(name)
+        raise KeyError(name)
+
+    def __setitem__(self, name, structure):
+        self.unloaded.discard(name)
+        self.allNames[name] = None
+        dict.__setitem__(self,name,structure)
+
+    def __delitem__(self, name):
+        if name in self.unloaded:
+            self.unloaded.remove(name)
+        else:
+            dict.__delitem__(self,name)
+        del self.allNames[name]
+
+    def __contains__(self, name):
+        return name in self.allNames
+
+    def has_key(self, name):
+        return name in self.allNames
+
+    def __len__(self):
+        return len(self.allNames)
+
+    def __iter__(self):
+        return iter(self.allNames.keys())
+
+    def keys(self):
+        return self.allNames.keys()
+
+    def get(self, name, default=None):
+        if name in self.allNames:
+            return self[name]
+        return default
+
+    def values(self):
+        return [self[name] for name in self.allNames.keys()]
+
+    def items(self):
+        return [(name,self[name]) for name in self.allNames.keys()]
+
+    def itervalues(self):
+        return iter(self.values())
+
+    def iteritems(self):
+        return iter(self.items())
+
+    def iterkeys(self):
+        return iter(self.keys())
@@ -1,8 +1,10 @@
 import math
+import array
+import sys
 
 class GdsStructure:
     """Class represent a GDS Structure Object"""
-    def __init__(self):
+    def __init__(self, columnar=False):
         self.name=""
         self.createDate=()
         self.modDate=()
@@ -14,6 +16,29 @@ class GdsStructure:
         self.texts=[]
         self.nodes=[]
         self.boxes=[]
+        #in columnar mode the boundaries, paths and texts are stored in per-layer arrays
+        #instead of one object per element, but they still iterate as element objects
+        if columnar:
+            self.boundaries=GdsBoundaryColumns()
+            self.paths=GdsPathColumns()
+            self.texts=GdsTextColumns()
+
+    def isColumnar(self):
+        return isinstance(self.boundaries,GdsElementColumns)
+
+    def boundaryCorners(self):
+        """Iterate over the (layer,(x0,y0),(x2,y2)) of the first and third point of every boundary"""
+        if self.isColumnar():
+            return self.boundaries.corners()
+        return ((boundary.drawingLayer,boundary.coordinates[0],boundary.coordinates[2]) for boundary in self.boundaries)
+
+    def allSrefs(self):
+        """Iterate over the structure references, with each array reference expanded as it is reached"""
+        for sref in self.srefs:
+            yield sref
+        for aref in self.arefs:
+            for sref in aref.expandSrefs():
+                yield sref
 
 class GdsBoundary:
     """Class represent a GDS Boundary Object"""
@@ -132,8 +157,41 @@ class GdsAref:
         self.transFlags=(False,False,False)
         self.magFactor=""
         self.rotateAngle=""
+        self.columns=""
+        self.rows=""
         self.coordinates=""
 
+    def expandSrefs(self):
+        """Generate an equivalent structure reference for each element of the array"""
+        for column in range(self.columns):
+            for row in range(self.rows):
+                yield self.elementSref(column,row)
+
+    def cornerSrefs(self):
+        """Generate the structure references of the (up to four) corner elements of the array"""
+        for column in sorted(set([0,self.columns-1])):
+            for row in sorted(set([0,self.rows-1])):
+                yield self.elementSref(column,row)
+
+    def elementSref(self,column,row):
+        """Return an equivalent structure reference for one element of the array"""
+        #the coordinates are the reference point, then the points displaced by all the columns and by all the rows
+        (originX,originY) = self.coordinates[0]
+        columnX = self.coordinates[1][0]-originX
+        columnY = self.coordinates[1][1]-originY
+        rowX = self.coordinates[2][0]-originX
+        rowY = self.coordinates[2][1]-originY
+        thisSref = GdsSref()
+        thisSref.elementFlags = self.elementFlags
+        thisSref.plex = self.plex
+        thisSref.sName = self.aName
+        thisSref.transFlags = self.transFlags
+        thisSref.magFactor = self.magFactor
+        thisSref.rotateAngle = self.rotateAngle
+        thisSref.coordinates = (originX+(column*columnX)//self.columns+(row*rowX)//self.rows,
+                                originY+(column*columnY)//self.columns+(row*rowY)//self.rows)
+        return thisSref
+
 class GdsText:
     """Class represent a GDS text Object"""
     def __init__(self):
@@ -167,4 +225,217 @@ class GdsBox:
         self.drawingLayer=""
         self.purposeLayer = None
         self.boxValue=""
-        self.coordinates=""
\ No newline at end of file
+        self.coordinates=""
+#the XY arrays are kept in native byte order
+swapXY = (sys.byteorder == "little")
+#marks an attribute that the element class does not define
+undefined = object()
+
+def flattenXY(coordinates):
+    """
+    Return a list of points as a flat int32 array of x0,y0,x1,y1,..., or None
+    if they are not all integers. Integral floats are accepted since that is
+    what VlsiLayout.userUnits returns.
+    """
+    if isinstance(coordinates,array.array):
+        return coordinates
+    if isinstance(coordinates,basestring):
+        return None
+    try:
+        values = [value for coordinate in coordinates for value in (coordinate[0],coordinate[1])]
+    except (TypeError,IndexError):
+        return None
+    try:
+        return array.array("i",values)
+    except OverflowError:
+        return None
+    except TypeError:
+        pass
+    try:
+        integers = [int(value) for value in values]
+        if integers != values:
+            return None
+        return array.array("i",integers)
+    except (TypeError,ValueError,OverflowError):
+        return None
+
+class GdsLayerColumns:
+    """Class represent the points and metadata of the elements on one layer, stored in flat arrays"""
+    def __init__(self, layer, fields):
+        self.layer = layer  #(drawingLayer,purposeLayer)
+        self.xy = array.array("i")  #the points of every element, as x0,y0,x1,y1,...
+        self.starts = array.array("i",[0])  #the first point of each element, and one past the last point
+        #one array (or list for other values) per metadata field
+        self.fields = dict()
+        for (name,typeCode) in fields:
+            if typeCode:
+                self.fields[name] = array.array(typeCode)
+            else:
+                self.fields[name] = []
+
+    def __len__(self):
+        return len(self.starts)-1
+
+    def points(self, position):
+        """Return the points of an element as a list of (x,y) tuples"""
+        xy = self.xy[2*self.starts[position]:2*self.starts[position+1]]
+        return zip(xy[0::2],xy[1::2])
+
+    def packedXY(self, position):
+        """Return the points of an element as big endian XY record data"""
+        xy = self.xy[2*self.starts[position]:2*self.starts[position+1]]
+        if swapXY:
+            xy.byteswap()
+        return xy.tostring()
+
+class GdsElementColumns:
+    """
+    Class represent the elements of one type in a structure in columnar form:
+    int32 point arrays and small metadata arrays for each layer, plus the layer
+    and position of every element in the order they were added. It behaves
+    like the list of elements it replaces, except that the elements it returns
+    are copies, so changing them does not change the structure.
+    """
+    elementClass = None
+    fields = ()  #(name,array type code or None for a list) stored for every element
+
+    def __init__(self):
+        self.layers = []  #GdsLayerColumns in the order the layers were first used
+        self.layerSlots = dict()  #(drawingLayer,purposeLayer) -> index in self.layers
+        self.slots = array.array("H")  #the layer of every element
+        self.positions = array.array("i")  #and its position in the layer
+        self.extras = dict()  #element index -> attributes that do not fit in the arrays
+
+    def layerColumns(self, drawingLayer, purposeLayer=None):
+        """Return the arrays of a layer, creating them if the layer is new"""
+        key = (drawingLayer,purposeLayer)
+        slot = self.layerSlots.get(key)
+        if slot == None:
+            slot = len(self.layers)
+            self.layerSlots[key] = slot
+            self.layers.append(GdsLayerColumns(key,self.fields))
+        return self.layers[slot]
+
+    def append(self, element):
+        """Store an element in the arrays; the element itself is not kept"""
+        attributes = element.__dict__
+        drawingLayer = attributes.get("drawingLayer","")
+        purposeLayer = attributes.get("purposeLayer")
+        layer = self.layerColumns(drawingLayer,purposeLayer)
+        extras = dict()
+        xy = flattenXY(attributes.get("coordinates",""))
+        if xy == None:
+            extras["coordinates"] = attributes.get("coordinates","")
+        else:
+            layer.xy.extend(xy)
+        layer.starts.append(len(layer.xy)//2)
+        for (name,typeCode) in self.fields:
+            value = attributes.get(name,self.defaults[name])
+            column = layer.fields[name]
+            if not typeCode:
+                column.append(value)
+                continue
+            if isinstance(value,float) and value == int(value):
+                value = int(value)
+            try:
+                column.append(value)
+            except (TypeError,OverflowError):
+                column.append(0)
+                extras[name] = value
+        for name in attributes:
+            if name not in self.stored and attributes[name] != self.defaults.get(name,undefined):
+                extras[name] = attributes[name]
+        if extras:
+            self.extras[len(self.slots)] = extras
+        self.slots.append(self.layerSlots[layer.layer])
+        self.positions.append(len(layer)-1)
+
+    def extend(self, elements):
+        for element in elements:
+            self.append(element)
+
+    def extendPoints(self, drawingLayer, purposeLayer, xy, pointsPerElement, fieldValues=dict()):
+        """
+        Store many elements on one layer that have the same number of points and the same
+        metadata from a flat int32 array of their points, without making the element objects
+        """
+        layer = self.layerColumns(drawingLayer,purposeLayer)
+        count = len(xy)//(2*pointsPerElement)
+        first = len(layer)
+        start = len(layer.xy)//2
+        layer.xy.extend(xy)
+        layer.starts.extend(array.array("i",xrange(start+pointsPerElement,start+pointsPerElement*count+1,
+                                                   pointsPerElement)))
+        for (name,typeCode) in self.fields:
+            layer.fields[name].extend([fieldValues.get(name,self.defaults[name])]*count)
+        self.slots.extend(array.array("H",[self.layerSlots[layer.layer]])*count)
+        self.positions.extend(array.array("i",xrange(first,first+count)))
+
+    def __iadd__(self, elements):
+        self.extend(elements)
+        return self
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __getitem__(self, index):
+        if isinstance(index,slice):
+            return [self.element(i) for i in xrange(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError("element index out of range")
+        return self.element(index)
+
+    def __iter__(self):
+        for index in xrange(len(self.slots)):
+            yield self.element(index)
+
+    def element(self, index):
+        """Build the element object stored at an index"""
+        layer = self.layers[self.slots[index]]
+        position = self.positions[index]
+        element = self.elementClass()
+        (element.drawingLayer,element.purposeLayer) = layer.layer
+        element.coordinates = layer.points(position)
+        for (name,typeCode) in self.fields:
+            setattr(element,name,layer.fields[name][position])
+        if index in self.extras:
+            element.__dict__.update(self.extras[index])
+        return element
+
+    def corners(self):
+        """Iterate over the (layer,(x0,y0),(x2,y2)) of every element without building the elements"""
+        for index in xrange(len(self.slots)):
+            if index in self.extras and "coordinates" in self.extras[index]:
+                coordinates = self.extras[index]["coordinates"]
+                yield (self.layers[self.slots[index]].layer[0],coordinates[0],coordinates[2])
+                continue
+            layer = self.layers[self.slots[index]]
+            position = self.positions[index]
+            start = 2*layer.starts[position]
+            if start+6 > 2*layer.starts[position+1]:
+                raise IndexError("element has fewer than three points")
+            xy = layer.xy
+            yield (layer.layer[0],(xy[start],xy[start+1]),(xy[start+4],xy[start+5]))
+
+class GdsBoundaryColumns(GdsElementColumns):
+    """Class represent the boundaries of a structure in columnar form"""
+    elementClass = GdsBoundary
+    fields = (("dataType","h"),)
+    defaults = GdsBoundary().__dict__
+    stored = set(["drawingLayer","purposeLayer","coordinates","dataType"])
+
+class GdsPathColumns(GdsElementColumns):
+    """Class represent the paths of a structure in columnar form"""
+    elementClass = GdsPath
+    fields = (("pathType","h"),("pathWidth","i"))
+    defaults = GdsPath().__dict__
+    stored = set(["drawingLayer","purposeLayer","coordinates","pathType","pathWidth"])
+
+class GdsTextColumns(GdsElementColumns):
+    """Class represent the texts of a structure in columnar form"""
+    elementClass = GdsText
+    fields = (("textString",None),)
+    defaults = GdsText().__dict__
+    stored = set(["drawingLayer","purposeLayer","coordinates","textString"])
@@ -0,0 +1,220 @@
+import math
+import zlib
+import struct
+import base64
+import numpy
+from gdsPrimitives import *
+from areaFill import rasterize
+from vlsiLayout import referenceTransform, composeTransforms
+
+class LayoutPreview:
+    """
+    Class to render a quick bitmap preview of a layout with NumPy. Each layer is one bit
+    of a per-pixel mask, so overlapping layers can still be told apart. A structure is
+    rasterized once for each orientation it is placed in and the resulting tile is copied
+    to every instance. Shapes and instances that are smaller than a pixel are not drawn.
+    """
+    def __init__(self, layout, width=1024, structureName=None, layerColors=None):
+        self.layout = layout
+        if structureName == None:
+            structureName = layout.rootStructureName
+        self.structureName = structureName
+        self.layerColors = dict()  #layer -> "#RRGGBB", see layerColor for the layers without one
+        if layerColors != None:
+            self.layerColors.update(layerColors)
+        box = layout.structureBoundary(structureName)
+        if box == None or box[2] <= box[0]:
+            box = [0,0,1,1]
+        self.scale = float(width)/(box[2]-box[0])  #pixels per database unit
+        self.layerBits = dict()  #layer -> bit of the pixel masks, in the order the layers are found
+        self.tiles = dict()  #(structure name,(a,b,c,d)) -> (tile,(column,row) of its first pixel)
+        self.culledShapes = 0
+        self.culledInstances = 0
+        self.pixels = None
+
+    def render(self):
+        """Return the rows x columns array of layer bits of the structure, with the bottom row first"""
+        if self.pixels is None:
+            (tile,corner) = self.structureTile(self.structureName,(1,0,0,1))
+            if tile is None:
+                tile = numpy.zeros((1,1),dtype=numpy.uint64)
+            self.pixels = tile
+        return self.pixels
+
+    def structureTile(self, structureName, orientation):
+        """
+        Return the layer bits of a structure placed with an (a,b,c,d) orientation at the origin
+        and the (column,row) of its first pixel, or (None,None) if nothing in it is a pixel big.
+        """
+        key = (structureName,orientation)
+        if key in self.tiles:
+            return self.tiles[key]
+        structure = self.layout.structures[structureName]
+        (layers,rectangles) = self.structureRectangles(structure,orientation)
+        placements = []
+        for sref in structure.allSrefs():
+            transform = composeTransforms(orientation+(0,0),referenceTransform(sref.rotateAngle,sref.transFlags,
+                                                                               sref.coordinates))
+            (childTile,childCorner) = self.structureTile(sref.sName,transform[0:4])
+            if childTile is None:
+                self.culledInstances += 1
+                continue
+            placements.append((childTile,(childCorner[0]+int(round(transform[4]*self.scale)),
+                                          childCorner[1]+int(round(transform[5]*self.scale)))))
+        #the tile covers the pixels of the shapes and of the placed tiles
+        (columnStart,columnEnd,rowStart,rowEnd) = self.pixelRanges(rectangles)
+        firstColumns = [int(columnStart.min())] if len(rectangles) > 0 else []
+        firstRows = [int(rowStart.min())] if len(rectangles) > 0 else []
+        lastColumns = [int(columnEnd.max())] if len(rectangles) > 0 else []
+        lastRows = [int(rowEnd.max())] if len(rectangles) > 0 else []
+        for (childTile,(column,row)) in placements:
+            firstColumns.append(column)
+            firstRows.append(row)
+            lastColumns.append(column+childTile.shape[1])
+            lastRows.append(row+childTile.shape[0])
+        if len(firstColumns) == 0:
+            self.tiles[key] = (None,None)
+            return self.tiles[key]
+        corner = (min(firstColumns),min(firstRows))
+        tile = numpy.zeros((max(lastRows)-corner[1],max(lastColumns)-corner[0]),dtype=numpy.uint64)
+        for layer in numpy.unique(layers):
+            bit = self.layerBit(int(layer))
+            if bit == None:
+                continue
+            onLayer = layers == layer
+            paintRectangles(tile,numpy.uint64(1) << numpy.uint64(bit),columnStart[onLayer]-corner[0],
+                            columnEnd[onLayer]-corner[0],rowStart[onLayer]-corner[1],rowEnd[onLayer]-corner[1])
+        for (childTile,(column,row)) in placements:
+            (rows,columns) = childTile.shape
+            tile[row-corner[1]:row-corner[1]+rows,column-corner[0]:column-corner[0]+columns] |= childTile
+        self.tiles[key] = (tile,corner)
+        return self.tiles[key]
+
+    def structureRectangles(self, structure, orientation):
+        """
+        Return the layers and the [left,bottom,right,top] boxes, in database units, of the boundaries
+        and path segments of a structure placed with an orientation, without the ones under a pixel.
+        Boundaries are drawn as the box of their first and third points, like measureBoundary does.
+        """
+        layers = []
+        corners = []
+        for (layer,leftBottom,rightTop) in structure.boundaryCorners():
+            layers.append(layer)
+            corners.append((leftBottom[0],leftBottom[1],rightTop[0],rightTop[1]))
+        for path in structure.paths:
+            halfWidth = path.pathWidth/2.0
+            points = path.coordinates
+            for (start,end) in zip(points[:-1],points[1:]) or [(points[0],points[0])]:
+                layers.append(path.drawingLayer)
+                corners.append((min(start[0],end[0])-halfWidth,min(start[1],end[1])-halfWidth,
+                                max(start[0],end[0])+halfWidth,max(start[1],end[1])+halfWidth))
+        layers = numpy.array(layers,dtype=numpy.int64)
+        corners = numpy.array(corners,dtype=numpy.float64).reshape(-1,4)
+        #place the corners with the transposed rotation of transformCoordinate
+        (a,b,c,d) = orientation
+        x0 = a*corners[:,0]+c*corners[:,1]
+        y0 = b*corners[:,0]+d*corners[:,1]
+        x1 = a*corners[:,2]+c*corners[:,3]
+        y1 = b*corners[:,2]+d*corners[:,3]
+        rectangles = numpy.column_stack((numpy.minimum(x0,x1),numpy.minimum(y0,y1),
+                                         numpy.maximum(x0,x1),numpy.maximum(y0,y1)))
+        #level of detail: shapes under a pixel in both directions are not drawn
+        visible = ((rectangles[:,2]-rectangles[:,0])*self.scale >= 1) | ((rectangles[:,3]-rectangles[:,1])*self.scale >= 1)
+        self.culledShapes += int(len(visible)-visible.sum())
+        return (layers[visible],rectangles[visible])
+
+    def pixelRanges(self, rectangles):
+        """Return the [start,end) columns and rows of boxes, at least one pixel across"""
+        columnStart = numpy.floor(rectangles[:,0]*self.scale).astype(numpy.int64)
+        columnEnd = numpy.maximum(numpy.ceil(rectangles[:,2]*self.scale).astype(numpy.int64),columnStart+1)
+        rowStart = numpy.floor(rectangles[:,1]*self.scale).astype(numpy.int64)
+        rowEnd = numpy.maximum(numpy.ceil(rectangles[:,3]*self.scale).astype(numpy.int64),rowStart+1)
+        return (columnStart,columnEnd,rowStart,rowEnd)
+
+    def layerBit(self, layer):
+        """Return the mask bit of a layer; only the first 64 layers found are drawn"""
+        if layer not in self.layerBits:
+            if len(self.layerBits) == 64:
+                return None
+            self.layerBits[layer] = len(self.layerBits)
+        return self.layerBits[layer]
+
+    def image(self, opacity=0.5):
+        """Return the rows x columns x 3 RGB image, top row first, with the layers blended in layer order"""
+        pixels = self.render()[::-1]
+        #there are only a few different combinations of layers, so each one is blended once
+        if len(self.layerBits) <= 16:
+            masks = pixels.astype(numpy.uint16)
+            values = numpy.flatnonzero(numpy.bincount(masks.ravel(),minlength=1)).astype(numpy.uint64)
+        else:
+            (values,masks) = numpy.unique(pixels,return_inverse=True)
+            masks = masks.reshape(pixels.shape)
+        colors = numpy.ones((len(values),3),dtype=numpy.float64)
+        for layer in sorted(self.layerBits.keys()):
+            onLayer = ((values >> numpy.uint64(self.layerBits[layer])) & numpy.uint64(1)).astype(bool)
+            colors[onLayer] = colors[onLayer]*(1-opacity)+numpy.array(self.layerColor(layer))*opacity
+        colors = (colors*255+0.5).astype(numpy.uint8)
+        if len(self.layerBits) <= 16:
+            #index the colors by the mask itself
+            palette = numpy.zeros((1<<16,3),dtype=numpy.uint8)
+            palette[values.astype(numpy.int64)] = colors
+            colors = palette
+        return colors[masks]
+
+    def layerColor(self, layer):
+        """Return the (red,green,blue) of a layer from 0 to 1, picking a fixed color for layers without one"""
+        if layer not in self.layerColors:
+            hue = (layer*0.618033988749895) % 1.0
+            self.layerColors[layer] = "#%02X%02X%02X"%tuple([int(255*channel) for channel in hueColor(hue)])
+        hexColor = self.layerColors[layer]
+        return (int(hexColor[1:3],16)/255.0,int(hexColor[3:5],16)/255.0,int(hexColor[5:7],16)/255.0)
+
+    def pngData(self):
+        """Return the image as the bytes of a PNG file"""
+        image = self.image()
+        (rows,columns) = image.shape[0:2]
+        #every row starts with filter type 0 (none)
+        scanlines = numpy.zeros((rows,1+3*columns),dtype=numpy.uint8)
+        scanlines[:,1:] = image.reshape(rows,3*columns)
+        def chunk(chunkType,data):
+            return struct.pack(">I",len(data))+chunkType+data+struct.pack(">I",zlib.crc32(chunkType+data) & 0xFFFFFFFF)
+        return ("\x89PNG\r\n\x1a\n"+chunk("IHDR",struct.pack(">IIBBBBB",columns,rows,8,2,0,0,0))
+                +chunk("IDAT",zlib.compress(scanlines.tostring(),6))+chunk("IEND",""))
+
+    def writeToFile(self, fileName):
+        """Write the preview as a PNG file, or as an SVG file with the bitmap in it if the name ends in .svg"""
+        data = self.pngData()
+        if fileName.lower().endswith(".svg"):
+            (rows,columns) = self.render().shape
+            data = ('<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" '
+                    'width="{0}" height="{1}">\n<image width="{0}" height="{1}" '
+                    'xlink:href="data:image/png;base64,{2}"/>\n</svg>\n').format(columns,rows,base64.b64encode(data))
+        fileHandle = open(fileName,"wb")
+        fileHandle.write(data)
+        fileHandle.close()
+
+def paintRectangles(tile, bit, columnStart, columnEnd, rowStart, rowEnd):
+    """
+    Set a bit in the [start,end) column and row ranges of a tile. A few large boxes are set one
+    slice at a time, and many small ones are rasterized together in the window around them.
+    """
+    columnStart = numpy.clip(columnStart,0,tile.shape[1])
+    columnEnd = numpy.clip(columnEnd,0,tile.shape[1])
+    rowStart = numpy.clip(rowStart,0,tile.shape[0])
+    rowEnd = numpy.clip(rowEnd,0,tile.shape[0])
+    if len(columnStart) == 0:
+        return
+    (left,right,bottom,top) = (columnStart.min(),columnEnd.max(),rowStart.min(),rowEnd.max())
+    area = ((columnEnd-columnStart)*(rowEnd-rowStart)).sum()
+    if area < (right-left)*(top-bottom):
+        for (column0,column1,row0,row1) in zip(columnStart,columnEnd,rowStart,rowEnd):
+            tile[row0:row1,column0:column1] |= bit
+        return
+    covered = rasterize(columnStart-left,columnEnd-left,rowStart-bottom,rowEnd-bottom,right-left,top-bottom)
+    tile[bottom:top,left:right] |= covered.astype(numpy.uint64)*bit
+
+def hueColor(hue):
+    """Return a fully saturated (red,green,blue) for a hue from 0 to 1"""
+    sector = int(hue*6) % 6
+    fraction = hue*6-int(hue*6)
+    return [(1,fraction,0),(1-fraction,1,0),(0,1,fraction),(0,1-fraction,1),(fraction,0,1),(1,0,1-fraction)][sector]
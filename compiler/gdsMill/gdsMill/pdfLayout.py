@@ -1,12 +1,20 @@
-import pyx
 import math
-import mpmath
 from gdsPrimitives import *
 import random
 
+def importDrawingModules():
+    """
+    pyx and mpmath take longer to import than all of the rest of gdsMill, so they
+    are only imported when the first PDF view is made rather than with the package.
+    """
+    global pyx, mpmath
+    import pyx
+    import mpmath
+
 class pdfLayout:
     """Class representing a view for a layout as a PDF"""
     def __init__(self,theLayout):
+        importDrawingModules()
         self.canvas = pyx.canvas.canvas()
         self.layout = theLayout
         self.layerColors=dict()
@@ -0,0 +1,93 @@
+class ShapeIndex:
+    """
+    Class to represent a spatial index of the flattened rectangles of a layout.
+    The rectangles of each layer are kept in uniform bins so that point and
+    rectangle queries only test the shapes near the query. Queries return the
+    rectangles in the order they were added.
+    """
+    def __init__(self, maxBinsPerShape = 64):
+        #shapes spanning more bins than this are tested on every query instead
+        self.maxBinsPerShape = maxBinsPerShape
+        self.shapes = dict()  #layer -> list of [left,bottom,right,top] in insertion order
+        self.layerBins = dict()  #layer -> (binSize, dict of (binX,binY) -> shape indices, large shape indices)
+
+    def addRectangle(self, layer, rectangle):
+        """Add a [left,bottom,right,top] rectangle on a layer"""
+        if layer not in self.shapes:
+            self.shapes[layer] = []
+        self.shapes[layer] += [rectangle]
+        #the bins of this layer are rebuilt on the next query
+        if layer in self.layerBins:
+            del self.layerBins[layer]
+
+    def binsOfLayer(self, layer):
+        """Return the bins of a layer, building them on first use"""
+        if layer not in self.layerBins:
+            self.layerBins[layer] = self.buildBins(self.shapes.get(layer, []))
+        return self.layerBins[layer]
+
+    def buildBins(self, shapes):
+        """Sort the shapes of a layer into bins about the size of a typical shape"""
+        sizes = sorted(max(int(shape[2])-int(shape[0]), int(shape[3])-int(shape[1])) for shape in shapes)
+        binSize = 1
+        if len(sizes) > 0:
+            binSize = max(1, 2*sizes[len(sizes)//2])
+        bins = dict()
+        largeShapes = []
+        for index in range(len(shapes)):
+            (left,bottom,right,top) = [int(value) for value in shapes[index]]
+            binsX = xrange(left//binSize, right//binSize+1)
+            binsY = xrange(bottom//binSize, top//binSize+1)
+            if len(binsX)*len(binsY) > self.maxBinsPerShape:
+                largeShapes += [index]
+                continue
+            for binX in binsX:
+                for binY in binsY:
+                    if (binX,binY) in bins:
+                        bins[(binX,binY)] += [index]
+                    else:
+                        bins[(binX,binY)] = [index]
+        return (binSize, bins, largeShapes)
+
+    def pointQuery(self, coordinate, layer):
+        """
+        Return all the rectangles on a layer that contain a point, including
+        the points on their edges.
+        """
+        shapes = self.shapes.get(layer, [])
+        (binSize, bins, largeShapes) = self.binsOfLayer(layer)
+        (x,y) = (coordinate[0], coordinate[1])
+        candidates = bins.get((int(x)//binSize, int(y)//binSize), []) + largeShapes
+        found = []
+        for index in candidates:
+            shape = shapes[index]
+            if (x>=int(shape[0])) & (x<=int(shape[2])) & (y>=int(shape[1])) & (y<=int(shape[3])):
+                found += [index]
+        found.sort()
+        return [list(shapes[index]) for index in found]
+
+    def rectangleQuery(self, rectangle, layer):
+        """
+        Return all the rectangles on a layer that overlap or touch a
+        [left,bottom,right,top] rectangle.
+        """
+        shapes = self.shapes.get(layer, [])
+        (binSize, bins, largeShapes) = self.binsOfLayer(layer)
+        (left,bottom,right,top) = [int(value) for value in rectangle]
+        binsX = xrange(left//binSize, right//binSize+1)
+        binsY = xrange(bottom//binSize, top//binSize+1)
+        if len(binsX)*len(binsY) > len(shapes):
+            #the query covers most of the layer, so test every shape
+            candidates = range(len(shapes))
+        else:
+            candidates = set(largeShapes)
+            for binX in binsX:
+                for binY in binsY:
+                    candidates.update(bins.get((binX,binY), []))
+        found = []
+        for index in candidates:
+            shape = shapes[index]
+            if (int(shape[0])<=right) & (int(shape[2])>=left) & (int(shape[1])<=top) & (int(shape[3])>=bottom):
+                found += [index]
+        found.sort()
+        return [list(shapes[index]) for index in found]
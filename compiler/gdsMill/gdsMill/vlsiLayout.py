@@ -1,15 +1,20 @@
 from gdsPrimitives import *
+from shapeIndex import *
+from gdsIndex import *
+from gdsDigest import *
 from datetime import *
-import mpmath
 import gdsPrimitives
 import debug
+import array
 
 class VlsiLayout:
     """Class represent a hierarchical layout"""
 
-    def __init__(self, name=None, units=(0.001,1e-9), libraryName = "DEFAULT.DB", gdsVersion=5):
+    def __init__(self, name=None, units=(0.001,1e-9), libraryName = "DEFAULT.DB", gdsVersion=5, columnar=False):
         #keep a list of all the structures in this layout
         self.units = units
+        #store the boundaries, paths and texts of the structures in per-layer arrays
+        self.columnar = columnar
         #print units
         modDate = datetime.now()
         self.structures=dict()
@@ -18,7 +23,7 @@ class VlsiLayout:
         if name:
             self.rootStructureName=name
             #create the ROOT structure
-            self.structures[self.rootStructureName] = GdsStructure()
+            self.structures[self.rootStructureName] = GdsStructure(columnar)
             self.structures[self.rootStructureName].name = name
             self.structures[self.rootStructureName].createDate = (modDate.year,
                                                                   modDate.month,
@@ -54,6 +59,10 @@ class VlsiLayout:
                         #expanded to include srefs / arefs separately.
                         #each structure will have an X,Y,offset, and rotate associated
                         #with it.  Populate via traverseTheHierarchy method.
+        self.shapeIndex = None #spatial index of the flattened boundaries in the xyTree,
+                               #built on the first pin query.
+        self.boundingBoxes = dict() #(structure name, orientation) -> bounding box, see structureBoundary
+        self.structureDigests = dict() #structure name -> (digest,local digest), see structureDigest
         
         #temp variables used in delegate functions
         self.tempCoordinates=None
@@ -82,6 +91,7 @@ class VlsiLayout:
         self.structures[newName].name = newName
         #and delete the old root
         del self.structures[self.rootStructureName]
+        self.structureDigests.pop(self.rootStructureName,None)
         self.rootStructureName = newName
         #repopulate the 2d map so drawing occurs correctly
         del self.xyTree[:]
@@ -100,7 +110,7 @@ class VlsiLayout:
 
         modDate = datetime.now()
 
-        self.structures[newName] = GdsStructure()
+        self.structures[newName] = GdsStructure(self.columnar)
         self.structures[newName].name = newName
 
 
@@ -110,7 +120,7 @@ class VlsiLayout:
         self.rootStructureName=newName
 
         #create the ROOT structure
-        self.structures[self.rootStructureName] = GdsStructure()
+        self.structures[self.rootStructureName] = GdsStructure(self.columnar)
         #self.structures[self.rootStructureName].name = name
         self.structures[self.rootStructureName].createDate = (modDate.year,
                                                                   modDate.month,
@@ -144,13 +154,22 @@ class VlsiLayout:
             structureNames+=[name]
             
         for name in self.structures:
-            if(len(self.structures[name].srefs)>0): #does this structure reference any others?
-                for sref in self.structures[name].srefs: #go through each reference
-                    if sref.sName in structureNames: #and compare to our list
-                        structureNames.remove(sref.sName)
+            for referenceName in self.referencedStructureNames(name): #go through each reference
+                if referenceName in structureNames: #and compare to our list
+                    structureNames.remove(referenceName)
         
         self.rootStructureName = structureNames[0]
 
+    def referencedStructureNames(self,name):
+        """
+        Return the names of the structures referenced by a structure. Structures
+        that have not been read from an indexed file yet are not loaded to find them.
+        """
+        if isinstance(self.structures,LazyStructures):
+            return self.structures.referencedNames(name)
+        structure = self.structures[name]
+        return [sref.sName for sref in structure.srefs]+[aref.aName for aref in structure.arefs]
+
     def traverseTheHierarchy(self, startingStructureName=None, delegateFunction = None, 
                              transformPath = [], rotateAngle = 0, transFlags = (0,0,0), coordinates = (0,0)):
         #since this is a recursive function, must deal with the default
@@ -158,36 +177,19 @@ class VlsiLayout:
         if startingStructureName == None:
             startingStructureName = self.rootStructureName            
 
-        #set up the rotation matrix        
-        if(rotateAngle == None or rotateAngle == ""):
-            rotateAngle = 0
-        else:
-            rotateAngle = math.radians(float(rotateAngle))
-        mRotate = mpmath.matrix([[math.cos(rotateAngle),-math.sin(rotateAngle),0.0],
-                                 [math.sin(rotateAngle),math.cos(rotateAngle),0.0],[0.0,0.0,1.0],])
-        #set up the translation matrix
-        translateX = float(coordinates[0])
-        translateY = float(coordinates[1])
-        mTranslate = mpmath.matrix([[1.0,0.0,translateX],[0.0,1.0,translateY],[0.0,0.0,1.0]])
-        #set up the scale matrix (handles mirror X)
-        scaleX = 1.0
-        if(transFlags[0]):
-            scaleY = -1.0
-        else:
-            scaleY = 1.0
-        mScale = mpmath.matrix([[scaleX,0.0,0.0],[0.0,scaleY,0.0],[0.0,0.0,1.0]])
-        
         #we need to keep track of all transforms in the hierarchy
         #when we add an element to the xy tree, we apply all transforms from the bottom up
-        transformPath += [(mRotate,mScale,mTranslate)]
+        transformPath += [referenceTransform(rotateAngle,transFlags,coordinates)]
         if delegateFunction != None:
             delegateFunction(startingStructureName, transformPath)
         #starting with a particular structure, we will recursively traverse the tree
         #********might have to set the recursion level deeper for big layouts!
-        if(len(self.structures[startingStructureName].srefs)>0): #does this structure reference any others?
+        if(len(self.structures[startingStructureName].srefs)>0 or
+           len(self.structures[startingStructureName].arefs)>0): #does this structure reference any others?
             #if so, go through each and call this function again
             #if not, return back to the caller (caller can be this function)            
-            for sref in self.structures[startingStructureName].srefs:
+            #array references are expanded into one reference per element as we go
+            for sref in self.structures[startingStructureName].allSrefs():
                 #here, we are going to modify the sref coordinates based on the parent objects rotation                
 #                if (sref.sName.count("via") == 0): 
                 self.traverseTheHierarchy(startingStructureName = sref.sName,                                    
@@ -198,7 +200,6 @@ class VlsiLayout:
                                           coordinates = sref.coordinates)
 #            else:
 #                print "WARNING: via encountered, ignoring:", sref.sName
-            #MUST HANDLE AREFs HERE AS WELL
         #when we return, drop the last transform from the transformPath
         del transformPath[-1]
         return
@@ -206,31 +207,50 @@ class VlsiLayout:
     def initialize(self):
         self.deduceHierarchy()
         #self.traverseTheHierarchy()
-        self.populateCoordinateMap()    
+        if isinstance(self.structures,LazyStructures):
+            #the xyTree of an indexed file is built on first use, see __getattr__,
+            #so the structures are not all read when the file is loaded
+            self.invalidateGeometryCaches()
+            self.__dict__.pop("xyTree",None)
+        else:
+            self.populateCoordinateMap()    
     
     def populateCoordinateMap(self):
+        self.invalidateGeometryCaches()
+        self.xyTree += self.coordinateMap()
+
+    def coordinateMap(self):
+        """Return the xyTree entries of every structure reached from the root"""
+        entries = []
         def addToXyTree(startingStructureName = None,transformPath = None):
-        #print"populateCoordinateMap"            
-            uVector = mpmath.matrix([1.0,0.0,0.0])  #start with normal basis vectors
-            vVector = mpmath.matrix([0.0,1.0,0.0])
-            origin = mpmath.matrix([0.0,0.0,1.0]) #and an origin (Z component is 1.0 to indicate position instead of vector)
-            #make a copy of all the transforms and reverse it            
-            reverseTransformPath = transformPath[:]
-            if len(reverseTransformPath) > 1:
-                reverseTransformPath.reverse()               
-            #now go through each transform and apply them to our basis and origin in succession
-            for transform in reverseTransformPath:
-                origin = transform[0] * origin  #rotate
-                uVector = transform[0] * uVector  #rotate
-                vVector = transform[0] * vVector  #rotate
-                origin = transform[1] * origin  #scale
-                uVector = transform[1] * uVector  #rotate
-                vVector = transform[1] * vVector  #rotate
-                origin = transform[2] * origin  #translate
-                #we don't need to do a translation on the basis vectors            
-            self.xyTree+=[(startingStructureName,origin,uVector,vVector)]  #populate the xyTree with each
-                                                                            #structureName and coordinate space
+            entries.append(self.xyTreeEntry(startingStructureName,transformPath))  #each structureName and coordinate space
         self.traverseTheHierarchy(delegateFunction = addToXyTree)
+        return entries
+
+    def __getattr__(self,name):
+        """
+        Build the xyTree the first time it is used after initialize has deferred it.
+        Only the structures reached from the root are read from the file then.
+        """
+        if name == "xyTree":
+            self.xyTree = self.coordinateMap()
+            return self.xyTree
+        raise AttributeError(name)
+
+    def xyTreeEntry(self,structureName,transformPath):
+        """
+        Return the (name,origin,uVector,vVector) entry of a structure reached through the
+        reference transforms of traverseTheHierarchy.
+        """
+        #compose the transforms from the top of the hierarchy down to this structure
+        transform = identityTransform
+        for levelTransform in transformPath:
+            transform = composeTransforms(transform,levelTransform)
+        (a,b,c,d,translateX,translateY) = transform
+        origin = (translateX,translateY,1)  #Z component is 1 to indicate position instead of vector
+        uVector = (a,c,0)  #the transformed basis vectors
+        vVector = (b,d,0)
+        return (structureName,origin,uVector,vVector)
         
     def microns(self,userUnits):
         """Utility function to convert user units to microns"""
@@ -323,30 +343,55 @@ class VlsiLayout:
         layoutToAddSref = GdsSref()
         layoutToAddSref.sName = StructureName
         layoutToAddSref.coordinates = offsetInLayoutUnits
-
-        if mirror or rotate:
-        ########flags = (mirror around x-axis, absolute rotation, absolute magnification) 
-            layoutToAddSref.transFlags = (False,False,False)
-        #Below angles are angular angles(relative), not absolute
-            if mirror=="R90":
-                rotate = 90.0
-            if mirror=="R180":
-                rotate = 180.0
-            if mirror=="R270":
-                rotate = 270.0
-            if rotate:
-                layoutToAddSref.rotateAngle = rotate
-            if mirror == "x" or mirror == "MX":
-                layoutToAddSref.transFlags = (True,False,False)
-            if mirror == "y" or mirror == "MY": #NOTE: "MY" option will override specified rotate angle
-                layoutToAddSref.transFlags = (True,False,False)
-                layoutToAddSref.rotateAngle = 180.0
-            if mirror == "xy" or mirror == "XY": #NOTE: "XY" option will override specified rotate angle
-                layoutToAddSref.transFlags = (False,False,False)
-                layoutToAddSref.rotateAngle = 180.0
+        self.setReferenceTransform(layoutToAddSref,mirror,rotate)
 
         #add the sref to the root structure
         self.structures[self.rootStructureName].srefs+=[layoutToAddSref]        
+        self.invalidateGeometryCaches()
+
+    def addInstanceArray(self,layoutToAdd,offsetInMicrons=(0,0),columns=1,rows=1,
+                         columnPitchInMicrons=0,rowPitchInMicrons=0,mirror=None,rotate=None):
+        """
+        Method to insert a columns x rows array of one layout into another with a single
+        array reference. The pitches are the distances between neighboring columns and rows.
+        """
+        offsetInLayoutUnits = (self.userUnits(offsetInMicrons[0]),self.userUnits(offsetInMicrons[1]))
+        columnPitchInLayoutUnits = self.userUnits(columnPitchInMicrons)
+        rowPitchInLayoutUnits = self.userUnits(rowPitchInMicrons)
+        StructureName = layoutToAdd.rootStructureName
+
+        if layoutToAdd != self:
+            #combine the structure dictionaries and the "layers in use" lists the same as addInstance
+            for structure in layoutToAdd.structures:
+                if structure not in self.structures:
+                    self.structures[structure]=layoutToAdd.structures[structure]
+            for layerNumber in layoutToAdd.layerNumbersInUse:
+                if layerNumber not in self.layerNumbersInUse:
+                    self.layerNumbersInUse += [layerNumber]
+
+        layoutToAddAref = GdsAref()
+        layoutToAddAref.aName = StructureName
+        layoutToAddAref.columns = columns
+        layoutToAddAref.rows = rows
+        #reference point, then the points displaced by all the columns and by all the rows
+        layoutToAddAref.coordinates = [offsetInLayoutUnits,
+                                       (offsetInLayoutUnits[0]+columns*columnPitchInLayoutUnits,offsetInLayoutUnits[1]),
+                                       (offsetInLayoutUnits[0],offsetInLayoutUnits[1]+rows*rowPitchInLayoutUnits)]
+        self.setReferenceTransform(layoutToAddAref,mirror,rotate)
+
+        #add the aref to the root structure
+        self.structures[self.rootStructureName].arefs+=[layoutToAddAref]
+        self.invalidateGeometryCaches()
+
+    def setReferenceTransform(self,reference,mirror=None,rotate=None):
+        """
+        Set the mirror and rotation of a structure or array reference.
+        """
+        if mirror or rotate:
+            (rotateAngle,transFlags) = referenceOrientation(mirror,rotate)
+            reference.transFlags = transFlags
+            if rotateAngle:
+                reference.rotateAngle = rotateAngle
         
     def addBox(self,layerNumber=0, purposeNumber=None, offsetInMicrons=(0,0), width=1.0, height=1.0,center=False):
         """
@@ -382,7 +427,41 @@ class VlsiLayout:
         boundaryToAdd.purposeLayer = purposeNumber
         #add the sref to the root structure
         self.structures[self.rootStructureName].boundaries+=[boundaryToAdd]
-    
+        self.invalidateGeometryCaches()
+
+    def addBoxes(self,layerNumber=0, purposeNumber=None, xOffsetsInMicrons=(), yOffsetsInMicrons=(), widths=1.0, heights=1.0):
+        """
+        Method to add many boxes on one layer to a layout, from their lower left corners.
+        The widths and heights are either one value for all of the boxes or one per box. The
+        boxes are the same as the ones addBox makes, in the same order, but a columnar root
+        structure stores them without making a boundary object for each one.
+        """
+        #numpy is imported lazily so that import gdsMill stays light
+        import numpy
+        layoutUnitsPerMicron = 1/self.units[0]
+        def userUnits(microns):
+            #round half away from zero, as round does
+            values = numpy.asarray(microns,dtype=numpy.float64)*layoutUnitsPerMicron
+            return (numpy.sign(values)*numpy.floor(numpy.abs(values)+0.5)).astype(numpy.int64)
+        x = userUnits(xOffsetsInMicrons)
+        y = userUnits(yOffsetsInMicrons)
+        (width,height) = numpy.broadcast_arrays(userUnits(widths),userUnits(heights),x)[0:2]
+        #x0,y0, x0+w,y0, x0+w,y0+h, x0,y0+h, x0,y0 for every box
+        xy = numpy.column_stack((x,y,x+width,y,x+width,y+height,x,y+height,x,y))
+        boundaries = self.structures[self.rootStructureName].boundaries
+        if isinstance(boundaries,GdsElementColumns):
+            boundaries.extendPoints(layerNumber,purposeNumber,
+                                    array.array("i",xy.astype(numpy.int32).tostring()),5,{"dataType":0})
+        else:
+            for points in xy.tolist():
+                boundaryToAdd = GdsBoundary()
+                boundaryToAdd.drawingLayer = layerNumber
+                boundaryToAdd.dataType = 0
+                boundaryToAdd.coordinates = [(float(points[i]),float(points[i+1])) for i in range(0,10,2)]
+                boundaryToAdd.purposeLayer = purposeNumber
+                boundaries+=[boundaryToAdd]
+        self.invalidateGeometryCaches()
+
     def addPath(self, layerNumber=0, purposeNumber = None, coordinates=[(0,0)], width=1.0):
         """
         Method to add a path to a layout
@@ -401,6 +480,7 @@ class VlsiLayout:
         pathToAdd.coordinates=layoutUnitCoordinates
         #add the sref to the root structure
         self.structures[self.rootStructureName].paths+=[pathToAdd]
+        self.structureDigests.pop(self.rootStructureName,None)
         
     def addText(self, text, layerNumber=0, purposeNumber = None, offsetInMicrons=(0,0), magnification=0.1, rotate = None):
         offsetInLayoutUnits = (self.userUnits(offsetInMicrons[0]),self.userUnits(offsetInMicrons[1]))
@@ -420,6 +500,7 @@ class VlsiLayout:
             textToAdd.rotateAngle = rotate
         #add the sref to the root structure
         self.structures[self.rootStructureName].texts+=[textToAdd]
+        self.structureDigests.pop(self.rootStructureName,None)
             
     def isBounded(self,testPoint,startPoint,endPoint):
         #these arguments are touples of (x,y) coordinates
@@ -516,70 +597,34 @@ class VlsiLayout:
         
                 
     def fillAreaDensity(self, layerToFill = 0, offsetInMicrons = (0,0), coverageWidth = 100.0, coverageHeight = 100.0,
-                        minSpacing = 0.22, blockSize = 1.0):
+                        minSpacing = 0.22, blockSize = 1.0, targetDensity = None, windowSize = None,
+                        purposeNumber = None):
+        """
+        Fill an area with blockSize squares on a layer, at least minSpacing away from the shapes
+        already on the layer anywhere in the hierarchy. Without a target density every block that
+        fits is placed. With one, each windowSize square window (the whole area by default) only gets
+        the blocks it needs to reach that density. The blocks are array references to one fill
+        structure. Returns the number of blocks placed.
+        """
+        #areaFill uses numpy, so it is imported lazily to keep import gdsMill light
+        from areaFill import AreaFill
         effectiveBlock = blockSize+minSpacing
         widthInBlocks = int(coverageWidth/effectiveBlock)
         heightInBlocks = int(coverageHeight/effectiveBlock)
-        passFailRecord = []
-
-        print "Filling layer:",layerToFill
-        def isThisBlockOk(startingStructureName,coordinates,rotateAngle=None):
-            #go through every boundary and check
-            for boundary in self.structures[startingStructureName].boundaries:
-                #only test shapes on the same layer
-                if(boundary.drawingLayer == layerToFill):
-                    #remap coordinates
-                    shiftedBoundaryCoordinates = []
-                    for shapeCoordinate in boundary.rotatedCoordinates(rotateAngle):
-                        shiftedBoundaryCoordinates+=[(shapeCoordinate[0]+coordinates[0],shapeCoordinate[1]+coordinates[1])]
-                    joint = self.doShapesIntersect(self.tempCoordinates, shiftedBoundaryCoordinates)
-                    if joint:
-                        self.tempPassFail = False                    
-                    common = self.isShapeInsideOfBox(shiftedBoundaryCoordinates,self.tempCoordinates)
-                    if common:
-                        self.tempPassFail = False
-            for path in self.structures[startingStructureName].paths:
-                #only test shapes on the same layer
-                if(path.drawingLayer == layerToFill):
-                    #remap coordinates
-                    shiftedBoundaryCoordinates = []
-                    for shapeCoordinate in path.equivalentBoundaryCoordinates(rotateAngle):
-                        shiftedBoundaryCoordinates+=[(shapeCoordinate[0]+coordinates[0],shapeCoordinate[1]+coordinates[1])]
-                    joint = self.doShapesIntersect(self.tempCoordinates, shiftedBoundaryCoordinates)
-                    if joint:
-                        self.tempPassFail = False                    
-                    common = self.isShapeInsideOfBox(shiftedBoundaryCoordinates,self.tempCoordinates)
-                    if common:
-                        self.tempPassFail = False
-        
-        for yIndex in range(0,heightInBlocks):
-            for xIndex in range(0,widthInBlocks):
-                percentDone = (float((yIndex*heightInBlocks)+xIndex) / (heightInBlocks*widthInBlocks))*100
-                blockX = (xIndex*effectiveBlock)+offsetInMicrons[0]
-                blockY = (yIndex*effectiveBlock)+offsetInMicrons[1]
-                self.tempCoordinates=[(self.userUnits(blockX-minSpacing),self.userUnits(blockY-minSpacing)),
-                    (self.userUnits(blockX-minSpacing),self.userUnits(blockY+effectiveBlock)),
-                    (self.userUnits(blockX+effectiveBlock),self.userUnits(blockY+effectiveBlock)),
-                    (self.userUnits(blockX+effectiveBlock),self.userUnits(blockY-minSpacing)),
-                    (self.userUnits(blockX-minSpacing),self.userUnits(blockY-minSpacing))]
-                self.tempPassFail = True
-                #go through the hierarchy and see if the block will fit
-                self.traverseTheHierarchy(delegateFunction = isThisBlockOk)
-                #if its bad, this global tempPassFail will be false
-                #if true, we can add the block
-                passFailRecord+=[self.tempPassFail]
-            print "Percent Complete:"+str(percentDone)
-
-                
-        passFailIndex=0
-        for yIndex in range(0,heightInBlocks):
-            for xIndex in range(0,widthInBlocks):
-                blockX = (xIndex*effectiveBlock)+offsetInMicrons[0]
-                blockY = (yIndex*effectiveBlock)+offsetInMicrons[1]
-                if passFailRecord[passFailIndex]:
-                    self.addBox(layerToFill, (blockX,blockY), width=blockSize, height=blockSize)
-                passFailIndex+=1
-        print "Done\n\n"
+        origin = (int(self.userUnits(offsetInMicrons[0])),int(self.userUnits(offsetInMicrons[1])))
+        pitch = int(self.userUnits(effectiveBlock))
+        block = int(self.userUnits(blockSize))
+        spacing = int(self.userUnits(minSpacing))
+        width = int(self.userUnits(coverageWidth))
+        height = int(self.userUnits(coverageHeight))
+        if windowSize != None:
+            windowSize = self.userUnits(windowSize)
+        fill = AreaFill(self,layerToFill,purposeNumber)
+        freeSites = ~fill.blockedSites(origin,pitch,block,spacing,widthInBlocks,heightInBlocks)
+        selected = fill.selectSites(freeSites,origin,pitch,block,width,height,
+                                    targetDensity=targetDensity,windowSize=windowSize,
+                                    resolution=max(min(spacing,block),1))
+        return fill.placeBlocks(selected,origin,pitch,block)
 
     def getLayoutBorder(self,borderlayer):
         for boundary in self.structures[self.rootStructureName].boundaries:
@@ -595,23 +640,63 @@ class VlsiLayout:
         return cellSizeMicron
 
     def measureSize(self,startStructure):
-        self.rootStructureName=startStructure
-        self.populateCoordinateMap()
-        cellBoundary = [None, None, None, None]
-        for TreeUnit in self.xyTree:
-            cellBoundary=self.measureSizeInStructure(TreeUnit,cellBoundary)
+        cellBoundary=self.structureBoundary(startStructure)
         cellSize=[cellBoundary[2]-cellBoundary[0],cellBoundary[3]-cellBoundary[1]]
         cellSizeMicron=[cellSize[0]*self.units[0],cellSize[1]*self.units[0]]
         return cellSizeMicron
 
     def measureBoundary(self,startStructure):
-        self.rootStructureName=startStructure
-        self.populateCoordinateMap()
-        cellBoundary = [None, None, None, None]
-        for TreeUnit in self.xyTree:
-            cellBoundary=self.measureSizeInStructure(TreeUnit,cellBoundary)
+        cellBoundary=self.structureBoundary(startStructure)
         return [[self.units[0]*cellBoundary[0],self.units[0]*cellBoundary[1]],
                 [self.units[0]*cellBoundary[2],self.units[0]*cellBoundary[3]]]
+
+    def structureBoundary(self,structureName,transform=None):
+        """
+        Return the [left,bottom,right,top] box of the boundaries of a structure and of
+        everything it references, placed with an (a,b,c,d,x,y) transform, or None if there
+        are no boundaries. The box of a structure is memoized for each Manhattan orientation
+        and then only translated, so the hierarchy is walked once per structure and
+        orientation instead of once per placed instance.
+        """
+        if transform == None:
+            transform = identityTransform
+        (a,b,c,d,translateX,translateY) = transform
+        if not isManhattan(transform):
+            return self.boundaryInStructure(structureName,transform)
+        key = (structureName,(a,b,c,d))
+        if key not in self.boundingBoxes:
+            self.boundingBoxes[key] = self.boundaryInStructure(structureName,(a,b,c,d,0,0))
+        box = self.boundingBoxes[key]
+        if box == None:
+            return None
+        return [box[0]+translateX,box[1]+translateY,box[2]+translateX,box[3]+translateY]
+
+    def boundaryInStructure(self,structureName,transform):
+        """
+        Return the box of the boundaries in a structure and the boxes of the structures it
+        references. The boundaries are placed like the xyTree entries are in measureSizeInStructure,
+        with the transposed rotation of transformCoordinate.
+        """
+        (a,b,c,d,translateX,translateY) = transform
+        structure = self.structures[structureName]
+        cellBoundary = None
+        for (boundaryLayer,left_bottom,right_top) in structure.boundaryCorners():
+            thisBoundary = self.transformRectangle([left_bottom[0],left_bottom[1],right_top[0],right_top[1]],
+                                                   (a,c,0),(b,d,0))
+            cellBoundary = unionBoxes(cellBoundary,[thisBoundary[0]+translateX,thisBoundary[1]+translateY,
+                                                    thisBoundary[2]+translateX,thisBoundary[3]+translateY])
+        if isManhattan(transform):
+            #the corner elements of an array reach as far as the whole array does
+            references = structure.srefs+[sref for aref in structure.arefs for sref in aref.cornerSrefs()]
+        else:
+            references = structure.allSrefs()
+        for sref in references:
+            referenceBoundary = self.structureBoundary(sref.sName,
+                                                       composeTransforms(transform,referenceTransform(sref.rotateAngle,
+                                                                                                      sref.transFlags,
+                                                                                                      sref.coordinates)))
+            cellBoundary = unionBoxes(cellBoundary,referenceBoundary)
+        return cellBoundary
     
     def measureSizeInStructure(self,Structure,cellBoundary):
         StructureName=Structure[0]
@@ -623,9 +708,7 @@ class VlsiLayout:
         #debug.info(debug_level,"-Structure direction: uVector["+str(StructureuVector)+"]")
         #debug.info(debug_level,"-Structure direction: vVector["+str(StructurevVector)+"]")
         
-        for boundary in self.structures[str(StructureName)].boundaries:
-            left_bottom=boundary.coordinates[0]
-            right_top=boundary.coordinates[2]
+        for (boundaryLayer,left_bottom,right_top) in self.structures[str(StructureName)].boundaryCorners():
             thisBoundary=[left_bottom[0],left_bottom[1],right_top[0],right_top[1]]
             thisBoundary=self.transformRectangle(thisBoundary,StructureuVector,StructurevVector)
             thisBoundary=[thisBoundary[0]+StructureOrigin[0],thisBoundary[1]+StructureOrigin[1],
@@ -745,35 +828,95 @@ class VlsiLayout:
         Given a coordinate, search for enclosing structures on the given layer.
         Return all pin shapes.
         """
-        boundaries = []
+        return self.getShapeIndex().pointQuery(coordinates,layer)
 
-        for TreeUnit in self.xyTree:
-            boundaries += self.getPinInStructure(coordinates,layer,TreeUnit)
-
-        return boundaries
+    def getAllShapesInRectangle(self,rectangle,layer):
+        """
+        Return all the shapes on the given layer that overlap a
+        [left,bottom,right,top] rectangle. Coordinates should be in DB units.
+        """
+        return self.getShapeIndex().rectangleQuery(rectangle,layer)
 
+    def getShapeIndex(self):
+        """
+        Return the spatial index of all the boundaries in the xyTree,
+        building it the first time it is needed.
+        """
+        if self.shapeIndex == None:
+            self.shapeIndex = ShapeIndex()
+            for TreeUnit in self.xyTree:
+                for (layer,boundary) in self.getShapesInStructure(TreeUnit):
+                    self.shapeIndex.addRectangle(layer,boundary)
+        return self.shapeIndex
+
+    def invalidateGeometryCaches(self):
+        """
+        Drop the spatial index and the bounding boxes after the geometry or the xyTree changes.
+        Only the root structure is edited through the layout, so it is the only digest dropped.
+        """
+        self.shapeIndex = None
+        self.boundingBoxes = dict()
+        self.structureDigests.pop(self.rootStructureName,None)
 
-    def getPinInStructure(self,coordinates,layer,Structure):
-        """ 
-        Go through all the shapes in a structure and return the list of shapes
-        that the label coordinates are inside.
+    def structureDigest(self,structureName=None,local=False):
+        """
+        Return a hex digest of the geometry of a structure and everything below it. It does not
+        depend on the dates, the element order or the structure names, so structures with the same
+        digest are the same layout. Each referenced structure is hashed once and its digest is
+        used in its parents' digests, so only the structures that change are hashed again.
+        The local digest only covers the structure's own shapes and the names of its references.
+        """
+        if structureName == None:
+            structureName = self.rootStructureName
+        if structureName not in self.structureDigests:
+            self.structureDigests[structureName] = structureDigests(self.structures[structureName],
+                                                                    self.structureDigest)
+        return self.structureDigests[structureName][int(local)]
+
+    def invalidateStructureDigest(self,structureName):
+        """
+        Drop the digests of a structure and the structures that reference it, after
+        the structure's elements are changed directly rather than through the layout.
+        """
+        changed = set([structureName])
+        pending = [structureName]
+        while len(pending) > 0:
+            name = pending.pop()
+            self.structureDigests.pop(name,None)
+            for parent in self.structureDigests.keys():
+                if parent not in changed and name in self.referencedStructureNames(parent):
+                    changed.add(parent)
+                    pending.append(parent)
+
+    def getShapesInStructure(self,Structure):
+        """
+        Return the (layer,rectangle) of every boundary in a structure,
+        transformed into the coordinate space of the xyTree entry.
         """
         StructureName=Structure[0]
         StructureOrigin=[Structure[1][0],Structure[1][1]]
         StructureuVector=[Structure[2][0],Structure[2][1],Structure[2][2]]
         StructurevVector=[Structure[3][0],Structure[3][1],Structure[3][2]]
 
+        shapes = []
+        for (boundaryLayer,left_bottom,right_top) in self.structures[str(StructureName)].boundaryCorners():
+            MetalBoundary=[left_bottom[0],left_bottom[1],right_top[0],right_top[1]]
+            MetalBoundary=self.transformRectangle(MetalBoundary,StructureuVector,StructurevVector)
+            MetalBoundary=[MetalBoundary[0]+StructureOrigin[0],MetalBoundary[1]+StructureOrigin[1],
+            MetalBoundary[2]+StructureOrigin[0],MetalBoundary[3]+StructureOrigin[1]]
+            shapes.append((boundaryLayer,MetalBoundary))
+        return shapes
+
+
+    def getPinInStructure(self,coordinates,layer,Structure):
+        """ 
+        Go through all the shapes in a structure and return the list of shapes
+        that the label coordinates are inside.
+        """
         boundaries = []
         
-        for boundary in self.structures[str(StructureName)].boundaries:
-            if layer==boundary.drawingLayer:
-                left_bottom=boundary.coordinates[0]
-                right_top=boundary.coordinates[2]
-                MetalBoundary=[left_bottom[0],left_bottom[1],right_top[0],right_top[1]]
-                MetalBoundary=self.transformRectangle(MetalBoundary,StructureuVector,StructurevVector)
-                MetalBoundary=[MetalBoundary[0]+StructureOrigin[0],MetalBoundary[1]+StructureOrigin[1],
-                MetalBoundary[2]+StructureOrigin[0],MetalBoundary[3]+StructureOrigin[1]]
-
+        for (boundaryLayer,MetalBoundary) in self.getShapesInStructure(Structure):
+            if layer==boundaryLayer:
                 if self.labelInRectangle(coordinates,MetalBoundary):
                     boundaries.append(MetalBoundary)
                     
@@ -784,11 +927,8 @@ class VlsiLayout:
         Transforms the four coordinates of a rectangle in space
         and recomputes the left, bottom, right, top values.
         """
-        leftBottom=mpmath.matrix([orignalRectangle[0],orignalRectangle[1]])
-        leftBottom=self.transformCoordinate(leftBottom,uVector,vVector)
-
-        rightTop=mpmath.matrix([orignalRectangle[2],orignalRectangle[3]])
-        rightTop=self.transformCoordinate(rightTop,uVector,vVector)
+        leftBottom=self.transformCoordinate(orignalRectangle[0:2],uVector,vVector)
+        rightTop=self.transformCoordinate(orignalRectangle[2:4],uVector,vVector)
 
         left=min(leftBottom[0],rightTop[0])
         bottom=min(leftBottom[1],rightTop[1])
@@ -819,6 +959,80 @@ class VlsiLayout:
         else:
             return False
 
+identityTransform = (1,0,0,1,0,0)
+
+#cos and sin of the manhattan rotations, indexed by quarter turns
+quarterTurns = ((1,0),(0,1),(-1,0),(0,-1))
+
+def referenceOrientation(mirror=None,rotate=None):
+    """
+    Returns the (rotateAngle,transFlags) of a reference placed with a mirror and a rotation,
+    as setReferenceTransform sets them. The rotateAngle is None when it is not set.
+    """
+    ########flags = (mirror around x-axis, absolute rotation, absolute magnification) 
+    transFlags = (False,False,False)
+    #Below angles are angular angles(relative), not absolute
+    if mirror=="R90":
+        rotate = 90.0
+    if mirror=="R180":
+        rotate = 180.0
+    if mirror=="R270":
+        rotate = 270.0
+    rotateAngle = rotate if rotate else None
+    if mirror == "x" or mirror == "MX":
+        transFlags = (True,False,False)
+    if mirror == "y" or mirror == "MY": #NOTE: "MY" option will override specified rotate angle
+        transFlags = (True,False,False)
+        rotateAngle = 180.0
+    if mirror == "xy" or mirror == "XY": #NOTE: "XY" option will override specified rotate angle
+        transFlags = (False,False,False)
+        rotateAngle = 180.0
+    return (rotateAngle,transFlags)
+
+def referenceTransform(rotateAngle=0,transFlags=(0,0,0),coordinates=(0,0)):
+    """
+    Returns the (a,b,c,d,x,y) affine transform of a structure reference, which maps
+    a point to (a*px+b*py+x, c*px+d*py+y). The rotation is applied first, then the
+    mirror about the X axis, then the translation. Manhattan rotations stay exact
+    integers; arbitrary angles fall back to floating point.
+    """
+    if(rotateAngle == None or rotateAngle == ""):
+        rotateAngle = 0
+    if rotateAngle % 90 == 0:
+        (cosine,sine) = quarterTurns[int(rotateAngle//90) % 4]
+    else:
+        angle = math.radians(float(rotateAngle))
+        (cosine,sine) = (math.cos(angle),math.sin(angle))
+    if(transFlags[0]):
+        return (cosine,-sine,-sine,-cosine,coordinates[0],coordinates[1])
+    return (cosine,-sine,sine,cosine,coordinates[0],coordinates[1])
+
+def composeTransforms(outer,inner):
+    """
+    Returns the transform that applies the inner transform and then the outer one.
+    """
+    (a1,b1,c1,d1,x1,y1) = outer
+    (a2,b2,c2,d2,x2,y2) = inner
+    return (a1*a2+b1*c2, a1*b2+b1*d2,
+            c1*a2+d1*c2, c1*b2+d1*d2,
+            a1*x2+b1*y2+x1, c1*x2+d1*y2+y1)
+
+def isManhattan(transform):
+    """
+    Returns true if a transform only mirrors and rotates by multiples of 90 degrees.
+    """
+    return all(value in (-1,0,1) for value in transform[0:4])
+
+def unionBoxes(A,B):
+    """
+    Returns the [left,bottom,right,top] box around two boxes, either of which may be None.
+    """
+    if A == None:
+        return B
+    if B == None:
+        return A
+    return [min(A[0],B[0]),min(A[1],B[1]),max(A[2],B[2]),max(A[3],B[3])]
+
 def cmpBoundaryAreas(A,B):
     """
     Compares two rectangles and return true if Area(A)>Area(B).
@@ -1,15 +1,20 @@
 """
 This provides a set of useful generic types for the gdsMill interface. 
 """
+import numpy as np
+import gdsMill
 import debug
 from vector import vector
-from tech import GDS
+from tech import GDS, drc
 
-class geometry:
+class geometry(object):
     """
     A specific path, shape, or text geometry. Base class for shared
-    items.
+    items. A layout has one of these for every shape, so they only
+    have slots for their attributes and no attribute dictionary.
     """
+    __slots__ = ("width", "height")
+
     def __init__(self):
         """ By default, everything has no size. """
         self.width = 0
@@ -29,6 +34,8 @@ class instance(geometry):
     An instance of an instance/module with a specified location and
     rotation
     """
+    __slots__ = ("name", "mod", "gds", "rotate", "offset", "mirror", "pin_cache")
+
     def __init__(self, name, mod, offset, mirror, rotate):
         """Initializes an instance to represent a module"""
         geometry.__init__(self)
@@ -38,9 +45,35 @@ class instance(geometry):
         self.rotate = rotate
         self.offset = vector(offset).snap_to_grid()
         self.mirror = mirror
+        # pin name -> (offset, pins placed at that offset)
+        self.pin_cache = {}
 
         debug.info(3, "creating instance: " + self.name)
 
+    def transform(self):
+        """ The (a,b,c,d,x,y) transform of the module's coordinates to
+        the parent's, the same one the GDS reference gets """
+        (rotateAngle, transFlags) = gdsMill.referenceOrientation(self.mirror, self.rotate)
+        return gdsMill.referenceTransform(rotateAngle or 0, transFlags, self.offset)
+
+    def get_pins(self, name):
+        """ The shapes of a pin of the module, placed like the instance.
+        They are placed once and again only if the instance is moved.
+        The parent applies its origin first, see design.get_layout_pins. """
+        cached = self.pin_cache.get(name)
+        if cached == None or cached[0] != self.offset:
+            transform = self.transform()
+            cached = (vector(self.offset), [pin.transform(transform) for pin in self.mod.get_pins(name)])
+            self.pin_cache[name] = cached
+        return cached[1]
+
+    def get_pin(self, name):
+        """ The shape of a pin that has only one """
+        pins = self.get_pins(name)
+        if len(pins) != 1:
+            debug.error("Pin {0} of instance {1} has {2} shapes.".format(name, self.name, len(pins)), -1)
+        return pins[0]
+
     def gds_write_file(self, newLayout):
         """Recursively writes all the sub-modules in this instance"""
         debug.info(3, "writing instance: " + self.name)
@@ -61,13 +94,115 @@ class instance(geometry):
         """ override print function output """
         return "( inst: " + self.name + " @" + str(self.offset) + " mod=" + self.mod.name + " " + self.mirror + " R=" + str(self.rotate) + ")"
 
+class instance_array(geometry):
+    """
+    A columns x rows array of instances of a module written as GDS
+    array references. With mirror_rows, every odd row is mirrored about
+    the x-axis and abuts the row below it, as in a bitcell array.
+    """
+    __slots__ = ("name", "mod", "gds", "rotate", "offset", "mirror", "columns", "rows", "pitch", "mirror_rows")
+
+    def __init__(self, name, mod, offset, columns, rows, pitch, mirror, rotate, mirror_rows):
+        """Initializes an instance array to represent a grid of modules"""
+        geometry.__init__(self)
+        self.name = name
+        self.mod = mod
+        self.gds = mod.gds
+        self.rotate = rotate
+        self.offset = vector(offset).snap_to_grid()
+        self.mirror = mirror
+        self.columns = columns
+        self.rows = rows
+        self.pitch = vector(pitch).snap_to_grid()
+        self.mirror_rows = mirror_rows
+        debug.check(not mirror_rows or (mirror == "R0" and rotate == 0),
+                    "Mirrored rows are only supported for unrotated arrays.")
+
+        debug.info(3, "creating instance array: {0} {1} x {2}".format(self.name, self.rows, self.columns))
+
+    def __len__(self):
+        """ number of instances in the array """
+        return self.columns * self.rows
+
+    def element_name(self, row, col):
+        """ name of the instance in a given row and column """
+        return "{0}_r{1}_c{2}".format(self.name, row, col)
+
+    def element_names(self):
+        """ Generate the names of the instances, in the same order as elements """
+        for col in range(self.columns):
+            for row in range(self.rows):
+                yield self.element_name(row, col)
+
+    def elements(self):
+        """ Generate the instances of the array, column by column. These
+        are created on demand and not stored. """
+        for col in range(self.columns):
+            for row in range(self.rows):
+                if self.mirror_rows and row % 2:
+                    yield instance(self.element_name(row, col),
+                                   self.mod,
+                                   self.offset + vector(col * self.pitch.x, (row + 1) * self.pitch.y),
+                                   "MX",
+                                   0)
+                else:
+                    yield instance(self.element_name(row, col),
+                                   self.mod,
+                                   self.offset + vector(col * self.pitch.x, row * self.pitch.y),
+                                   self.mirror,
+                                   self.rotate)
+
+    def gds_write_file(self, newLayout):
+        """Recursively writes the module and the array references"""
+        debug.info(3, "writing instance array: " + self.name)
+        # make sure to write out my module/structure 
+        # (it will only be written the first time though)
+        self.mod.gds_write_file(self.gds)
+        if not self.mirror_rows:
+            newLayout.addInstanceArray(self.gds,
+                                       offsetInMicrons=self.offset,
+                                       columns=self.columns,
+                                       rows=self.rows,
+                                       columnPitchInMicrons=self.pitch.x,
+                                       rowPitchInMicrons=self.pitch.y,
+                                       mirror=self.mirror,
+                                       rotate=self.rotate)
+            return
+        # one array for the even rows and a mirrored one for the odd rows
+        newLayout.addInstanceArray(self.gds,
+                                   offsetInMicrons=self.offset,
+                                   columns=self.columns,
+                                   rows=(self.rows + 1) / 2,
+                                   columnPitchInMicrons=self.pitch.x,
+                                   rowPitchInMicrons=2 * self.pitch.y,
+                                   mirror="R0",
+                                   rotate=0)
+        if self.rows > 1:
+            newLayout.addInstanceArray(self.gds,
+                                       offsetInMicrons=self.offset + vector(0, 2 * self.pitch.y),
+                                       columns=self.columns,
+                                       rows=self.rows / 2,
+                                       columnPitchInMicrons=self.pitch.x,
+                                       rowPitchInMicrons=2 * self.pitch.y,
+                                       mirror="MX",
+                                       rotate=0)
+
+    def __str__(self):
+        """ override print function output """
+        return "inst array: " + self.name + " mod=" + self.mod.name
+
+    def __repr__(self):
+        """ override print function output """
+        return "( inst array: " + self.name + " @" + str(self.offset) + " mod=" + self.mod.name + " " + str(self.rows) + "x" + str(self.columns) + " pitch=" + str(self.pitch) + " " + self.mirror + " R=" + str(self.rotate) + ")"
+
 class path(geometry):
     """Represents a Path"""
+    __slots__ = ("layerNumber", "coordinates", "path_width")
+    name = "path"
 
     def __init__(self, layerNumber, coordinates, path_width):
         """Initializes a path for the specified layer"""
         geometry.__init__(self)
-        self.name = "path"
         self.layerNumber = layerNumber
         self.coordinates = map(lambda x: [x[0], x[1]], coordinates)
         self.coordinates = vector(self.coordinates).snap_to_grid()
@@ -96,11 +231,12 @@ class path(geometry):
 
 class label(geometry):
     """Represents a text label"""
+    __slots__ = ("text", "layerNumber", "offset", "zoom", "size")
+    name = "label"
 
     def __init__(self, text, layerNumber, offset, zoom=-1):
         """Initializes a text label for specified layer"""
         geometry.__init__(self)
-        self.name = "label"
         self.text = text
         self.layerNumber = layerNumber
         self.offset = vector(offset).snap_to_grid()
@@ -112,7 +248,8 @@ class label(geometry):
 
         self.size = 0
 
-        debug.info(3,"creating label " + self.text + " " + str(self.layerNumber) + " " + str(self.offset))
+        if debug.enabled(3):
+            debug.info(3,"creating label " + self.text + " " + str(self.layerNumber) + " " + str(self.offset))
 
     def gds_write_file(self, newLayout):
         """Writes the text label to GDS"""
@@ -134,25 +271,27 @@ class label(geometry):
 
 class rectangle(geometry):
     """Represents a rectangular shape"""
+    __slots__ = ("layerNumber", "offset", "size")
+    name = "rect"
 
     def __init__(self, layerNumber, offset, width, height):
         """Initializes a rectangular shape for specified layer"""
-        geometry.__init__(self)
-        self.name = "rect"
         self.layerNumber = layerNumber
         self.offset = vector(offset).snap_to_grid()
         self.size = vector(width, height).snap_to_grid()
         self.width = self.size.x
         self.height = self.size.y
 
-        debug.info(3, "creating rectangle (" + str(self.layerNumber) + "): " 
-                   + str(self.width) + "x" + str(self.height) + " @ " + str(self.offset))
+        if debug.enabled(3):
+            debug.info(3, "creating rectangle (" + str(self.layerNumber) + "): " 
+                       + str(self.width) + "x" + str(self.height) + " @ " + str(self.offset))
 
 
     def gds_write_file(self, newLayout):
         """Writes the rectangular shape to GDS"""
-        debug.info(3, "writing rectangle (" + str(self.layerNumber) + "):" 
-                   + str(self.width) + "x" + str(self.height) + " @ " + str(self.offset))
+        if debug.enabled(3):
+            debug.info(3, "writing rectangle (" + str(self.layerNumber) + "):" 
+                       + str(self.width) + "x" + str(self.height) + " @ " + str(self.offset))
         newLayout.addBox(layerNumber=self.layerNumber,
                          purposeNumber=0,
                          offsetInMicrons=self.offset,
@@ -167,3 +306,72 @@ class rectangle(geometry):
     def __repr__(self):
         """ override print function output """
         return "( rect: @" + str(self.offset) + " " + str(self.width) + "x" + str(self.height) + " layer=" + str(self.layerNumber) + " )"
+
+class rectangle_array(geometry):
+    """
+    Many rectangles on one layer, such as the lines of a bus, stored as
+    arrays of the x, y, width and height in grid units. The offset is the
+    lowest left corner of the rectangles and setting it moves all of them,
+    so the array can be measured and translated like a single rectangle.
+    """
+    __slots__ = ("layerNumber", "x", "y", "w", "h")
+    name = "rects"
+
+    def __init__(self, layerNumber, x, y, width, height):
+        """Initializes the rectangles from their offsets and sizes in microns.
+        The width and height are one value for all of them or one for each."""
+        geometry.__init__(self)
+        self.layerNumber = layerNumber
+        self.x = snap_to_grid(x)
+        self.y = snap_to_grid(y)
+        (self.w, self.h) = np.broadcast_arrays(snap_to_grid(width), snap_to_grid(height), self.x)[0:2]
+
+        if debug.enabled(3):
+            debug.info(3, "creating " + str(self))
+
+    def __len__(self):
+        """ number of rectangles """
+        return len(self.x)
+
+    def get_offset(self):
+        grid = drc["grid"]
+        return vector(int(self.x.min()) * grid, int(self.y.min()) * grid)
+
+    def set_offset(self, offset):
+        lowest = self.get_offset()
+        self.x = self.x + snap_to_grid(offset[0] - lowest.x)
+        self.y = self.y + snap_to_grid(offset[1] - lowest.y)
+
+    offset = property(get_offset, set_offset)
+
+    def rectangles(self):
+        """ Generate the rectangles, in the order they were added """
+        grid = drc["grid"]
+        for (x, y, w, h) in zip(self.x.tolist(), self.y.tolist(), self.w.tolist(), self.h.tolist()):
+            yield rectangle(self.layerNumber, vector(x * grid, y * grid), w * grid, h * grid)
+
+    def gds_write_file(self, newLayout):
+        """Writes all of the rectangles to GDS at once"""
+        if debug.enabled(3):
+            debug.info(3, "writing " + str(self))
+        grid = drc["grid"]
+        newLayout.addBoxes(layerNumber=self.layerNumber,
+                           purposeNumber=0,
+                           xOffsetsInMicrons=self.x * grid,
+                           yOffsetsInMicrons=self.y * grid,
+                           widths=self.w * grid,
+                           heights=self.h * grid)
+
+    def __str__(self):
+        """ override print function output """
+        return "rects: " + str(len(self)) + " @" + str(self.offset) + " layer=" + str(self.layerNumber)
+
+    def __repr__(self):
+        """ override print function output """
+        return "( rects: " + str(len(self)) + " @" + str(self.offset) + " layer=" + str(self.layerNumber) + " )"
+
+def snap_to_grid(values):
+    """ Round microns to whole grid units, the same way as vector.snap_to_grid """
+    values = np.round(np.asarray(values, dtype=np.float64).reshape(-1) / drc["grid"], 2)
+    # round half away from zero, as round does
+    return (np.sign(values) * np.floor(np.abs(values) + 0.5)).astype(np.int64)
@@ -142,6 +142,12 @@ def read_config(config_file):
         OPTS.output_path += "/"
     debug.info(1, "Output saved in " + OPTS.output_path)
 
+    # The config file may move or disable the cache of modules and library cells.
+    try:
+        OPTS.cache_path = OPTS.config.cache_path
+    except AttributeError:
+        pass
+
     # Don't delete the output dir, it may have other files!
     # make the directory if it doesn't exist
     try:
@@ -181,10 +187,11 @@ def end_openram():
     """ Clean up openram for a proper exit """
     cleanup_paths()
 
-    # Reset the static duplicate name checker for unit tests.
-    # This is needed for running unit tests.
+    # Reset the static duplicate name checker and the shared modules
+    # for unit tests. This is needed for running unit tests.
     import design
-    design.design.name_map=[]
+    design.design.name_map=set()
+    design.factory.clear()
     
     
 def cleanup_paths():
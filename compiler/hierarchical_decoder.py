@@ -18,6 +18,11 @@ class hierarchical_decoder(design.design):
     Dynamically generated hierarchical decoder.
     """
 
+    # Moved by offset_all_coordinates
+    coordinate_attributes = ["A_positions", "vdd_positions", "gnd_positions",
+                             "decode_out_positions", "pre_decoder_vdd_positions",
+                             "pre_decoder_gnd_positions"]
+
     def __init__(self, nand2_nmos_width, nand3_nmos_width, rows):
         design.design.__init__(self, "hierarchical_decoder_{0}rows".format(rows))
 
@@ -50,7 +55,7 @@ class hierarchical_decoder(design.design):
         self.create_vertical_rail()
 
     def add_modules(self):
-        self.m1m2_via = contact(layer_stack=("metal1", "via1", "metal2"))
+        self.m1m2_via = design.factory.get(contact, layer_stack=("metal1", "via1", "metal2"))
         # Vertical metal rail gap definition
         self.metal2_extend_contact = (self.m1m2_via.second_layer_height - self.m1m2_via.contact_width) / 2
         self.gap_between_rails = self.metal2_extend_contact  + drc["metal2_to_metal2"]
@@ -59,15 +64,15 @@ class hierarchical_decoder(design.design):
         # used to shift contact when connecting to NAND3 C pin down
         self.contact_shift = (self.m1m2_via.first_layer_width - self.m1m2_via.contact_width) / 2
 
-        self.inv = pinv(nmos_width=drc["minwidth_tx"],
-                        beta=2,
-                        height=self.bitcell_height)
+        self.inv = design.factory.get(pinv, nmos_width=drc["minwidth_tx"],
+                                            beta=2,
+                                            height=self.bitcell_height)
         self.add_mod(self.inv)
-        self.nand2 = nand_2(nmos_width=self.nand2_nmos_width,
-                            height=self.bitcell_height)
+        self.nand2 = design.factory.get(nand_2, nmos_width=self.nand2_nmos_width,
+                                                height=self.bitcell_height)
         self.add_mod(self.nand2)
-        self.nand3 = nand_3(nmos_width=self.nand3_nmos_width,
-                            height=self.bitcell_height)
+        self.nand3 = design.factory.get(nand_3, nmos_width=self.nand3_nmos_width,
+                                                height=self.bitcell_height)
         self.add_mod(self.nand3)
 
         # CREATION OF PRE-DECODER
@@ -474,11 +479,12 @@ class hierarchical_decoder(design.design):
             for i in range(self.total_number_of_predecoder_outputs):
                 vertical_rail_x_offsets.append(-self.gap_between_rail_offset \
                                                     * (self.total_number_of_predecoder_outputs - i))
-                self.add_rect(layer="metal2",
-                              offset=[-self.gap_between_rail_offset * (i + 1), 
-                                       0],
-                              width=drc["minwidth_metal2"],
-                              height=self.height)
+            self.add_bus(layer="metal2",
+                         offset=[-self.gap_between_rail_offset, 0],
+                         bits=self.total_number_of_predecoder_outputs,
+                         pitch=[-self.gap_between_rail_offset, 0],
+                         width=drc["minwidth_metal2"],
+                         height=self.height)
 
             # Horizontal metal extensions from pre-decoder 2x4ouput.
             for i in range(self.no_of_pre2x4):
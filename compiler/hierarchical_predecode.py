@@ -33,10 +33,10 @@ class hierarchical_predecode(design.design):
 
     def create_modules(self):
         layer_stack = ("metal1", "via1", "metal2")
-        self.m1m2_via = contact(layer_stack=layer_stack) 
-        self.inv = pinv(nmos_width=drc["minwidth_tx"],
-                        beta=2,
-                        height=self.bitcell_height)
+        self.m1m2_via = design.factory.get(contact, layer_stack=layer_stack) 
+        self.inv = design.factory.get(pinv, nmos_width=drc["minwidth_tx"],
+                                            beta=2,
+                                            height=self.bitcell_height)
         self.add_mod(self.inv)
         # create_nand redefine in sub class based on number of inputs
         self.create_nand()
@@ -19,8 +19,8 @@ class hierarchical_predecode2x4(hierarchical_predecode):
         self.route()
 
     def create_nand(self):
-        self.nand = nand_2(nmos_width=self.nmos_width,
-                           height=self.bitcell_height)
+        self.nand = design.factory.get(nand_2, nmos_width=self.nmos_width,
+                                               height=self.bitcell_height)
 
     def set_rail_height(self):
         self.rail_height = (self.number_of_outputs * self.nand.height 
@@ -1,11 +1,14 @@
 import itertools
+import numpy as np
 import geometry
 import gdsMill
 import debug
 from tech import drc, GDS
 from tech import layer as techlayer
 import os
+import library_cache
 from vector import vector
+from pin_layout import pin_layout
 
 class layout:
     """
@@ -17,12 +20,21 @@ class layout:
     layout/netlist and perform LVS/DRC.
     """
 
+    # Attributes holding coordinates that offset_all_coordinates moves
+    # along with the objs and insts
+    coordinate_attributes = []
+
     def __init__(self, name):            
         self.name = name
         self.width = None
         self.height = None
         self.insts = []  # Holds module/cell layout instances
         self.objs = []  # Holds all other objects (labels, geometries, etc)
+        self.pin_map = {}  # Holds the pin shapes by pin name, see add_pin_shape
+        self.inst_map = {}  # Holds the insts by name
+        # Lower left corner that the objs and insts still have to be moved
+        # by, see offset_all_coordinates and apply_origin
+        self.origin = vector(0, 0)
 
         self.visited = False # Flag for traversing the hierarchy 
 
@@ -33,16 +45,25 @@ class layout:
     ############################################################
     def offset_all_coordinates(self):
         """ This function is called after everything is placed to
-        shift the origin in the lowest left corner """
+        shift the origin in the lowest left corner. The registered
+        coordinate attributes are moved now and the objs and insts
+        the next time they are used. """
         coordinate = self.find_lowest_coords()
         self.offset_attributes(coordinate)
-        self.translate(coordinate)
-
+        self.origin = coordinate
 
+    def apply_origin(self):
+        """ Move the objs and insts to the origin set by offset_all_coordinates.
+        This is done before anything is added, measured or written. """
+        if self.origin.x != 0 or self.origin.y != 0:
+            coordinate = self.origin
+            self.origin = vector(0, 0)
+            self.translate(coordinate)
 
     def find_lowest_coords(self):
         """Finds the lowest set of 2d cartesian coordinates within
         this layout"""
+        self.apply_origin()
         #***1,000,000 number is used to avoid empty sequences errors***
         # FIXME Is this hard coded value ok??
         try:
@@ -58,39 +79,27 @@ class layout:
         return vector(min(lowestx1, lowestx2), min(lowesty1, lowesty2))
 
     def offset_attributes(self, coordinate):
-        """Translates all stored 2d cartesian coordinates within the
-        attr dictionary"""
-        # FIXME: This is dangerous. I think we should not do this, but explicitly
-        # offset the necessary coordinates.
-
-        #for attr_key, attr_val in self.attr.items():
-        for attr_key in dir(self):
-            attr_val = getattr(self,attr_key)
-
-            # skip the list of things as these will be offset separately
-            if (attr_key in ['objs','insts','mods','pins','conns','name_map']): continue
+        """Translates the coordinates in the attributes named in the
+        class's coordinate_attributes: vectors, [x,y] lists and lists
+        of vectors or [x,y] lists."""
+        for attr_key in self.coordinate_attributes:
+            attr_val = getattr(self, attr_key, None)
 
             # if is a list
             if isinstance(attr_val, list):
-                
                 for i in range(len(attr_val)):
                     # each unit in the list is a list coordinates
                     if isinstance(attr_val[i], (list,vector)):
                         attr_val[i] = vector(attr_val[i] - coordinate)
                     # the list itself is a coordinate
-                    else:
-                        if len(attr_val)!=2: continue
-                        for val in attr_val:
-                            if not isinstance(val, (int, long, float)): continue
-                        setattr(self,attr_key, vector(attr_val - coordinate))
+                    elif len(attr_val) == 2:
+                        setattr(self, attr_key, vector(attr_val - coordinate))
                         break
 
             # if is a vector coordinate
-            if isinstance(attr_val, vector):
+            elif isinstance(attr_val, vector):
                 setattr(self, attr_key, vector(attr_val - coordinate))
 
-
-
     def translate(self, coordinate):
         """Translates all 2d cartesian coordinates in a layout given
         the (x,y) offset"""
@@ -98,40 +107,114 @@ class layout:
             obj.offset = vector(obj.offset - coordinate)
         for inst in self.insts:
             inst.offset = vector(inst.offset - coordinate)
+        for pins in self.pin_map.values():
+            for pin in pins:
+                pin.translate(coordinate)
 
     # FIXME: Make name optional and pick a random one if not specified
     def add_inst(self, name, mod, offset=[0,0], mirror="R0",rotate=0):
         """Adds an instance of a mod to this module"""
+        self.apply_origin()
         self.insts.append(geometry.instance(name, mod, offset, mirror, rotate))
-        message = []
-        for x in self.insts:
-            message.append(x.name)
-        debug.info(4, "adding instance" + ",".join(message))
+        self.inst_map[name] = self.insts[-1]
+        if debug.enabled(4):
+            debug.info(4, "adding instance" + ",".join([x.name for x in self.insts]))
+
+    def add_inst_array(self, name, mod, offset=[0,0], columns=1, rows=1, pitch=None,
+                       mirror="R0", rotate=0, mirror_rows=False):
+        """Adds a columns x rows array of a mod to this module. The pitch
+        defaults to the mod size and the instances are named
+        name_r<row>_c<col>."""
+        self.apply_origin()
+        if pitch == None:
+            pitch = [mod.width, mod.height]
+        self.insts.append(geometry.instance_array(name, mod, offset, columns, rows,
+                                                  pitch, mirror, rotate, mirror_rows))
+        self.inst_map[name] = self.insts[-1]
+        debug.info(4, "adding instance array {0} {1} x {2}".format(name, rows, columns))
 
     def add_rect(self, layer, offset, width, height):
         """Adds a rectangle on a given layer,offset with width and height"""
+        self.apply_origin()
         # negative layers indicate "unused" layers in a given technology
         layerNumber = techlayer[layer]
         if layerNumber >= 0:
             self.objs.append(geometry.rectangle(layerNumber, offset, width, height))
 
+    def add_rects(self, layer, offsets, width, height):
+        """Adds many rectangles on a given layer at once. The width and
+        height are one value for all of them or a list with one for each
+        offset. They are stored and written as one rectangle array."""
+        self.apply_origin()
+        layerNumber = techlayer[layer]
+        if layerNumber >= 0 and len(offsets) > 0:
+            self.objs.append(geometry.rectangle_array(layerNumber,
+                                                      [offset[0] for offset in offsets],
+                                                      [offset[1] for offset in offsets],
+                                                      width,
+                                                      height))
+
+    def add_bus(self, layer, offset, bits, pitch, width, height):
+        """Adds a bus of lines with the same width and height on a given
+        layer, with the first line at offset and each next one a pitch
+        vector further. Returns the offsets of the lines."""
+        self.apply_origin()
+        steps = np.arange(bits)
+        x = offset[0] + steps * pitch[0]
+        y = offset[1] + steps * pitch[1]
+        layerNumber = techlayer[layer]
+        if layerNumber >= 0 and bits > 0:
+            self.objs.append(geometry.rectangle_array(layerNumber, x, y, width, height))
+        return map(vector, x.tolist(), y.tolist())
+
     def add_layout_pin(self, text, layer, offset, width, height):
         """Create a labeled pin"""
         self.add_rect(layer=layer,
                       offset=offset,
                       width=width,
                       height=height)
-        self.add_label(text=text,
-                       layer=layer,
-                       offset=offset)
+        layerNumber = techlayer[layer]
+        if layerNumber >= 0:
+            self.objs.append(geometry.label(text, layerNumber, offset, -1))
+        self.add_pin_shape(text, layer, offset, width, height)
 
 
     def add_label(self, text, layer, offset=[0,0],zoom=-1):
-        """Adds a text label on the given layer,offset, and zoom level"""
+        """Adds a text label on the given layer,offset, and zoom level.
+        The label is also a pin at that point."""
+        self.apply_origin()
         # negative layers indicate "unused" layers in a given technology
         layerNumber = techlayer[layer]
         if layerNumber >= 0:
             self.objs.append(geometry.label(text, layerNumber, offset, zoom))
+        self.add_pin_shape(text, layer, offset)
+
+    def add_pin_shape(self, text, layer, offset, width=0, height=0):
+        """Adds a shape to the pins named text, in the coordinates of
+        this module. The shapes are not drawn."""
+        self.apply_origin()
+        offset = vector(offset)
+        pin = pin_layout(text, [offset, offset + vector(width, height)], layer)
+        self.pin_map.setdefault(text, []).append(pin)
+
+    def add_library_pins(self, chars, pins):
+        """Adds the pins measured in a library cell, see
+        utils.auto_measure_libcell, as points on an unknown layer"""
+        for pin in pins:
+            if chars.get(pin) != None:
+                self.add_pin_shape(pin, None, chars[pin])
+
+    def get_pins(self, text):
+        """Returns the shapes of a pin in the coordinates of this module"""
+        self.apply_origin()
+        return self.pin_map.get(text, [])
+
+    def get_pin(self, text):
+        """Returns the shape of a pin that has only one"""
+        pins = self.get_pins(text)
+        if len(pins) != 1:
+            debug.error("Pin {0} of {1} has {2} shapes.".format(text, self.name, len(pins)), -1)
+        return pins[0]
 
 
     def add_path(self, layer, coordinates, width=None):
@@ -182,8 +265,10 @@ class layout:
     def add_via(self, layers, offset, size=[1,1], mirror="R0", rotate=0):
         """ Add a three layer via structure. """
         import contact
-        via = contact.contact(layer_stack=layers,
-                              dimensions=size)
+        import design
+        via = design.factory.get(contact.contact,
+                                 layer_stack=layers,
+                                 dimensions=size)
         self.add_mod(via)
         self.add_inst(name=via.name, 
                       mod=via, 
@@ -197,9 +282,11 @@ class layout:
     def add_ptx(self, offset, mirror="R0", rotate=0, width=1, mults=1, tx_type="nmos"):
         """Adds a ptx module to the design."""
         import ptx
-        mos = ptx.ptx(width=width,
-                      mults=mults,
-                      tx_type=tx_type)
+        import design
+        mos = design.factory.get(ptx.ptx,
+                                 width=width,
+                                 mults=mults,
+                                 tx_type=tx_type)
         self.add_mod(mos)
         self.add_inst(name=mos.name, 
                       mod=mos, 
@@ -215,12 +302,10 @@ class layout:
         # open the gds file if it exists or else create a blank layout
         if os.path.isfile(self.gds_file):
             debug.info(3, "opening %s" % self.gds_file)
-            self.gds = gdsMill.VlsiLayout(units=GDS["unit"])
-            reader = gdsMill.Gds2reader(self.gds)
-            reader.loadFromFile(self.gds_file)
+            self.gds = gds_cache.get(self.gds_file)
         else:
             debug.info(3, "creating structure %s" % self.name)
-            self.gds = gdsMill.VlsiLayout(name=self.name, units=GDS["unit"])
+            self.gds = gdsMill.VlsiLayout(name=self.name, units=GDS["unit"], columnar=True)
 
     def print_gds(self, gds_file=None):
         """Print the gds file (not the vlsi class) to the terminal """
@@ -242,6 +327,7 @@ class layout:
         """Recursive GDS write function"""
         if self.visited:
             return
+        self.apply_origin()
         for i in self.insts:
             i.gds_write_file(newLayout)
         for i in self.objs:
@@ -262,6 +348,18 @@ class layout:
         # self.gds.prepareForWrite()
         writer.writeToFile(gds_name)
 
+    def preview_write(self, preview_name, width=1024):
+        """Write a PNG picture of the layout, or an SVG one if the name ends in .svg"""
+        from gdsMill.layoutPreview import LayoutPreview
+        debug.info(3, "Writing preview to {0}".format(preview_name))
+        if not self.visited:
+            # the structures have not been written by gds_write yet
+            self.clear_visited()
+            self.gds_write_file(self.gds)
+        preview = LayoutPreview(self.gds, width)
+        preview.writeToFile(preview_name)
+        return preview
+
     def pdf_write(self, pdf_name):
         # NOTE: Currently does not work (Needs further research)
         #self.pdf_name = self.name + ".pdf"
@@ -304,3 +402,21 @@ class layout:
         for inst in self.insts:
             debug.info(0, "name={0} : mod={1} : offset={2}".format(
                 inst.name, inst.mod.name, inst.offset))
+
+
+def read_gds_library(gds_file):
+    """ Reads a library GDS file into a new layout, or loads it from the disk cache """
+    key = gds_disk_cache.key(gds_file, GDS["unit"])
+    gds = gds_disk_cache.load(key)
+    if gds == None:
+        gds = gdsMill.VlsiLayout(units=GDS["unit"], columnar=True)
+        reader = gdsMill.Gds2reader(gds)
+        # read every structure so the whole layout can be saved
+        reader.loadFromFile(gds_file, lazy=False)
+        gds_disk_cache.store(key, gds)
+    return gds
+
+# Each library GDS is read once and the layout is shared by every module that uses it
+gds_cache = library_cache.library_cache("GDS", read_gds_library)
+# and the parsed layout with its xyTree is kept between runs
+gds_disk_cache = library_cache.disk_cache("gds")
@@ -2,6 +2,9 @@ import debug
 import re
 import os
 import math
+import array
+import geometry
+import library_cache
 
 
 class spice:
@@ -23,7 +26,12 @@ class spice:
         # for each instance, this is the set of nets/nodes that map to the pins for this instance
         # THIS MUST MATCH THE ORDER OF THE PINS (restriction imposed by the
         # Spice format)
+        # The nets are stored as an array of net IDs, see add_net. An
+        # instance array has one array with the nets of every element.
         self.conns = []
+        self.net_names = []  # net ID -> name
+        self.net_ids = {}  # name -> net ID
+        self.net_map = None  # net ID -> connections, see get_net_connections
 
         self.sp_read()
 
@@ -43,6 +51,20 @@ class spice:
         """Adds a subckt/submodule to the subckt hierarchy"""
         self.mods.append(mod)
 
+    def add_net(self, name):
+        """Returns the ID of the net with a name, adding the net the
+        first time the name is used"""
+        net_id = self.net_ids.get(name)
+        if net_id == None:
+            net_id = len(self.net_names)
+            self.net_ids[name] = net_id
+            self.net_names.append(name)
+        return net_id
+
+    def add_nets(self, names):
+        """Returns an array of the IDs of the nets with the names"""
+        return array.array("i", [self.add_net(name) for name in names])
+
     def connect_inst(self, args, check=True):
         """Connects the pins of the last instance added
         It is preferred to use the other function with the check to find if
@@ -50,10 +72,16 @@ class spice:
         where we dynamically generate groups of connections after a
         group of modules are generated."""
 
-        if (check and (len(self.insts[-1].mod.pins) != len(args))):
+        self.connect_inst_nets(self.add_nets(args), check)
+
+    def connect_inst_nets(self, net_ids, check=True):
+        """Connects the pins of the last instance added to the nets with
+        the IDs (see add_net)"""
+        if (check and (len(self.insts[-1].mod.pins) != len(net_ids))):
             debug.error("Number of net connections ({0}) does not match last instance ({1})".format(len(self.insts[-1].mod.pins),
-                                                                                                    len(args)), 1)
-        self.conns.append(args)
+                                                                                                    len(net_ids)), 1)
+        self.conns.append(array.array("i", net_ids))
+        self.net_map = None
 
         if check and (len(self.insts)!=len(self.conns)):
             debug.error("{0} : Not all instance pins ({1}) are connected ({2}).".format(self.name,
@@ -65,87 +93,161 @@ class spice:
 
 
 
+    def connect_inst_array(self, args_list, check=True):
+        """Connects the pins of every instance in the last instance array
+        added. The connections must be given in the same order as the
+        array elements are generated (column by column)."""
+        for args in args_list:
+            if (check and (len(self.insts[-1].mod.pins) != len(args))):
+                debug.error("Number of net connections ({0}) does not match last instance array ({1})".format(len(self.insts[-1].mod.pins),
+                                                                                                              len(args)), 1)
+        self.connect_inst_array_nets(self.add_nets([name for args in args_list for name in args]), check)
+
+    def connect_inst_array_nets(self, net_ids, check=True):
+        """Connects the pins of every instance in the last instance array
+        added to the nets with the IDs (see add_net), the pins of the
+        first element followed by the pins of the next one and so on."""
+        if check and (len(self.insts[-1]) * len(self.insts[-1].mod.pins) != len(net_ids)):
+            debug.error("Number of net connections ({0}) does not match last instance array ({1} x {2} pins)".format(len(net_ids),
+                                                                                                                  len(self.insts[-1]),
+                                                                                                                  len(self.insts[-1].mod.pins)), 1)
+        self.conns.append(array.array("i", net_ids))
+        self.net_map = None
+
+        if check and (len(self.insts)!=len(self.conns)):
+            debug.error("{0} : Not all instance pins ({1}) are connected ({2}).".format(self.name,
+                                                                                        len(self.insts),
+                                                                                        len(self.conns)),1)
+
+    def get_conns(self, index):
+        """Returns the net names of the instance with an index, or a list
+        of them for each element of an instance array"""
+        names = [self.net_names[net_id] for net_id in self.conns[index]]
+        inst = self.insts[index]
+        if isinstance(inst, geometry.instance_array) and len(names) > 0:
+            pins = len(inst.mod.pins)
+            return [names[i:i + pins] for i in range(0, len(names), pins)]
+        return names
+
+    def get_net_connections(self, name):
+        """Returns the (instance name, pin name) of every pin connected
+        to a net, or [] if there is no net with the name. The map from
+        the nets to the pins is made once for all of the nets."""
+        if name not in self.net_ids:
+            return []
+        if self.net_map == None:
+            self.net_map = [[] for net_id in self.net_names]
+            for (index, nets) in enumerate(self.conns):
+                pins = max(len(self.insts[index].mod.pins), 1)
+                for (position, net_id) in enumerate(nets):
+                    self.net_map[net_id].append((index, position // pins, position % pins))
+        connections = []
+        for (index, element, pin) in self.net_map[self.net_ids[name]]:
+            inst = self.insts[index]
+            if isinstance(inst, geometry.instance_array):
+                inst_name = inst.element_name(element % inst.rows, element // inst.rows)
+            else:
+                inst_name = inst.name
+            connections.append((inst_name, inst.mod.pins[pin]))
+        return connections
+
+    def get_fanout(self, name):
+        """Returns the number of instance pins connected to a net"""
+        return len(self.get_net_connections(name))
+
     def sp_read(self):
         """Reads the sp file (and parse the pins) from the library 
            Otherwise, initialize it to null for dynamic generation"""
         if os.path.isfile(self.sp_file):
             debug.info(3, "opening {0}".format(self.sp_file))
-            f = open(self.sp_file)
-            self.spice = f.readlines()
-            for i in range(len(self.spice)):
-                self.spice[i] = self.spice[i].rstrip(" \n")
-
-            # find first subckt line in the file
-            subckt = re.compile("^.subckt", re.IGNORECASE)
-            subckt_line = filter(subckt.search, self.spice)[0]
-            # parses line into ports and remove subckt
-            self.pins = subckt_line.split(" ")[2:]
+            (self.spice, pins) = sp_cache.get(self.sp_file)
+            self.pins = list(pins)
         else:
             self.spice = []
 
-    def contains(self, mod, modlist):
-        for x in modlist:
-            if x.name == mod.name:
-                return True
-        return False
-
-    def sp_write_file(self, sp, usedMODS):
-        """ Recursive spice subcircuit write;
-            Writes the spice subcircuit from the library or the dynamically generated one"""
-        if not self.spice:
-            # recursively write the modules
-            for i in self.mods:
-                if self.contains(i, usedMODS):
-                    continue
-                usedMODS.append(i)
-                i.sp_write_file(sp, usedMODS)
-
-            if len(self.insts) == 0:
-                return
-            if self.pins == []:
-                return
-            # write out the first spice line (the subcircuit)
-            sp.write("\n.SUBCKT {0} {1}\n".format(self.name,
-                                                  " ".join(self.pins)))
-
-            # every instance must have a set of connections, even if it is empty.
-            if  len(self.insts)!=len(self.conns):
-                debug.error("{0} : Not all instance pins ({1}) are connected ({2}).".format(self.name,
-                                                                                            len(self.insts),
-                                                                                            len(self.conns)))
-                debug.error("Instances: \n"+str(self.insts))
-                debug.error("-----")
-                debug.error("Connections: \n"+str(self.conns),1)
-
-
-
-            for i in range(len(self.insts)):
-                # we don't need to output connections of empty instances.
-                # these are wires and paths
-                if self.conns[i] == []:
-                    continue
-                sp.write("X{0} {1} {2}\n".format(self.insts[i].name,
-                                                 " ".join(self.conns[i]),
-                                                 self.insts[i].mod.name))
-
-            sp.write(".ENDS {0}\n".format(self.name))
-
-        else:
+    def sp_subckt(self):
+        """ The spice text of this module alone: the subcircuit from the
+        library or the dynamically generated one, or "" if it has none """
+        if self.spice:
             # write the subcircuit itself
             # Including the file path makes the unit test fail for other users.
             #if os.path.isfile(self.sp_file):
             #    sp.write("\n* {0}\n".format(self.sp_file))
-            sp.write("\n".join(self.spice))
-            sp.write("\n")
+            return "\n".join(self.spice) + "\n"
+
+        if len(self.insts) == 0:
+            return ""
+        if self.pins == []:
+            return ""
+
+        # every instance must have a set of connections, even if it is empty.
+        if  len(self.insts)!=len(self.conns):
+            debug.error("{0} : Not all instance pins ({1}) are connected ({2}).".format(self.name,
+                                                                                        len(self.insts),
+                                                                                        len(self.conns)))
+            debug.error("Instances: \n"+str(self.insts))
+            debug.error("-----")
+            debug.error("Connections: \n"+str(self.conns),1)
+
+        # write out the first spice line (the subcircuit)
+        lines = ["\n.SUBCKT {0} {1}\n".format(self.name, " ".join(self.pins))]
+        net_names = self.net_names
+        for (inst, conns) in zip(self.insts, self.conns):
+            # we don't need to output connections of empty instances.
+            # these are wires and paths
+            if len(conns) == 0:
+                continue
+            names = [net_names[net_id] for net_id in conns]
+            # instance arrays have the connections of every element
+            if isinstance(inst, geometry.instance_array):
+                pins = len(inst.mod.pins)
+                for (i, name) in zip(range(len(names) // pins), inst.element_names()):
+                    lines.append("X{0} {1} {2}\n".format(name,
+                                                         " ".join(names[i * pins:(i + 1) * pins]),
+                                                         inst.mod.name))
+                continue
+            lines.append("X{0} {1} {2}\n".format(inst.name,
+                                                 " ".join(names),
+                                                 inst.mod.name))
+        lines.append(".ENDS {0}\n".format(self.name))
+        return "".join(lines)
+
+    def sp_chunks(self, used_names=None):
+        """ Generate the spice text of this module and of every module
+        below it, one subcircuit at a time and each one before the
+        subcircuits that use it. A module is written once for its name;
+        used_names is the set of the names already written. The
+        hierarchy is walked with a stack rather than recursively. """
+        if used_names == None:
+            used_names = set()
+        # library cells are written as they are, without their mods
+        stack = [(self, iter([] if self.spice else self.mods))]
+        while stack:
+            (mod, children) = stack[-1]
+            for child in children:
+                if child.name in used_names:
+                    continue
+                used_names.add(child.name)
+                stack.append((child, iter([] if child.spice else child.mods)))
+                break
+            else:
+                stack.pop()
+                text = mod.sp_subckt()
+                if text:
+                    yield text
+
+    def sp_write_file(self, sp, used_names):
+        """ Write the spice of this module and the modules below it
+        that are not in used_names to an open file """
+        for text in self.sp_chunks(used_names):
+            sp.write(text)
 
     def sp_write(self, spname):
         """Writes the spice to files"""
         debug.info(3, "Writing to {0}".format(spname))
         spfile = open(spname, 'w')
         spfile.write("*FIRST LINE IS A COMMENT\n")
-        usedMODS = list()
-        self.sp_write_file(spfile, usedMODS)
-        del usedMODS
+        self.sp_write_file(spfile, set())
         spfile.close()
 
     def delay(self, slew, load=0.0):
@@ -252,3 +354,19 @@ class wire_spice_model:
         result= delay_data(delay, slew)
         return result
 
+
+def read_sp_library(sp_file):
+    """ Reads the lines of a library spice file and the pins of its first subckt """
+    f = open(sp_file)
+    spice = tuple([line.rstrip(" \n") for line in f.readlines()])
+    f.close()
+
+    # find first subckt line in the file
+    subckt = re.compile("^.subckt", re.IGNORECASE)
+    subckt_line = filter(subckt.search, spice)[0]
+    # parses line into ports and remove subckt
+    pins = tuple(subckt_line.split(" ")[2:])
+    return (spice, pins)
+
+# Each library spice file is read once and the lines are shared by every module that uses it
+sp_cache = library_cache.library_cache("SPICE", read_sp_library)
@@ -0,0 +1,137 @@
+import os
+import glob
+import cPickle
+import hashlib
+import debug
+import globals
+
+OPTS = globals.OPTS
+
+
+class library_cache:
+    """
+    Process-wide cache of parsed library cell files. Each file is parsed
+    once for its (path, mtime, size) and the result is shared by every
+    module that reads it, so the cached objects must be treated as read-only.
+    """
+
+    def __init__(self, name, parse):
+        self.name = name
+        self.parse = parse
+        # path -> (key, parsed file); only the latest version of a file is kept
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path):
+        """ Return the parsed file, parsing it only if it changed since it was cached """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        key = (path, stat.st_mtime, stat.st_size)
+        if path in self.entries and self.entries[path][0] == key:
+            self.hits += 1
+            debug.info(3, "{0} cache hit {1}".format(self.name, path))
+            return self.entries[path][1]
+        self.misses += 1
+        debug.info(3, "{0} cache miss {1}".format(self.name, path))
+        parsed = self.parse(path)
+        self.entries[path] = (key, parsed)
+        return parsed
+
+    def clear(self):
+        """ Drop all of the parsed files """
+        self.entries = {}
+
+    def __str__(self):
+        return "{0} library cache: {1} hits, {2} misses".format(self.name, self.hits, self.misses)
+
+
+class disk_cache:
+    """
+    Persistent cache of results computed from the technology library files.
+    Each result is pickled under OPTS.cache_path in a file named by a hash of
+    the library file contents, the technology file, the gdsMill sources and
+    the arguments, so the entry is not used once any of them change.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, paths, args=()):
+        """ Hash the contents of a library file or a list of files, the
+        technology file, the gdsMill sources and the arguments """
+        if isinstance(paths, str):
+            paths = [paths]
+        # the results are gdsMill layouts or are measured with gdsMill
+        gdsmill = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gdsMill", "gdsMill")
+        sources = sorted(glob.glob(os.path.join(gdsmill, "*.py")))
+        digest = hashlib.sha1()
+        digest.update("{0} {1}\n".format(self.name, repr(args)))
+        for filename in list(paths) + [OPTS.openram_tech + "tech/tech.py"] + sources:
+            digest.update(file_digest(filename))
+        return digest.hexdigest()
+
+    def filename(self, key):
+        return os.path.join(OPTS.cache_path, "{0}_{1}.pickle".format(self.name, key))
+
+    def load(self, key):
+        """ Return the cached result or None if there is not one """
+        if OPTS.cache_path == "" or not os.path.isfile(self.filename(key)):
+            self.misses += 1
+            debug.info(3, "{0} disk cache miss {1}".format(self.name, key))
+            return None
+        try:
+            f = open(self.filename(key), "rb")
+            result = cPickle.load(f)
+            f.close()
+        except Exception as e:
+            debug.warning("Ignoring unreadable cache file {0}: {1}".format(self.filename(key), e))
+            self.misses += 1
+            return None
+        self.hits += 1
+        debug.info(3, "{0} disk cache hit {1}".format(self.name, key))
+        return result
+
+    def store(self, key, result):
+        """ Save a result, writing a temporary file first so readers never see part of it.
+        A result that cannot be pickled is not saved. """
+        if OPTS.cache_path == "":
+            return
+        try:
+            if not os.path.isdir(OPTS.cache_path):
+                os.makedirs(OPTS.cache_path, 0o750)
+            tempname = "{0}.{1}".format(self.filename(key), os.getpid())
+            f = open(tempname, "wb")
+            try:
+                cPickle.dump(result, f, cPickle.HIGHEST_PROTOCOL)
+            finally:
+                f.close()
+            os.rename(tempname, self.filename(key))
+        except (IOError, OSError) as e:
+            debug.warning("Unable to write cache file {0}: {1}".format(self.filename(key), e))
+        except (cPickle.PicklingError, TypeError) as e:
+            # the result is made again by the next run instead
+            debug.info(1, "{0} disk cache cannot pickle {1}: {2}".format(self.name, key, e))
+            os.remove(tempname)
+
+    def __str__(self):
+        return "{0} disk cache: {1} hits, {2} misses".format(self.name, self.hits, self.misses)
+
+
+# (path, mtime, size) -> hash of the file contents
+file_digests = {}
+
+def file_digest(path):
+    """ Hash the contents of a file, reading it again only when it changes.
+    A missing file hashes to "". """
+    if not os.path.isfile(path):
+        return ""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime, stat.st_size)
+    if key not in file_digests:
+        f = open(path, "rb")
+        file_digests[key] = hashlib.sha1(f.read()).hexdigest()
+        f.close()
+    return file_digests[key]
@@ -53,8 +53,8 @@ class logic_effort_dc(design.design):
 
     def create_module(self):
         """add the inverters"""
-        self.inv = pinv(nmos_width=drc["minwidth_tx"],
-                        route_output=False)
+        self.inv = design.factory.get(pinv, nmos_width=drc["minwidth_tx"],
+                                            route_output=False)
         self.add_mod(self.inv)
 
 
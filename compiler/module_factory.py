@@ -0,0 +1,105 @@
+import inspect
+import glob
+import os
+import debug
+import globals
+import library_cache
+
+OPTS = globals.OPTS
+
+
+class module_factory:
+    """
+    Process-wide registry of generated modules. A module is made once for
+    each (class, parameters) key and the same object is returned to every
+    caller with those parameters, so contacts, transistors and gates are not
+    laid out again for each use. The shared modules must be treated as
+    read-only once they are made.
+    The modules of classes with persistent set are also saved in the
+    disk cache, so a later run with the same parameters, technology,
+    library cells and compiler loads them instead of making them again.
+    """
+
+    def __init__(self):
+        # (class, parameters) -> module
+        self.modules = {}
+        self.hits = 0
+        self.misses = 0
+        # modules loaded from the disk cache
+        self.reused = 0
+        self.disk_cache = library_cache.disk_cache("module")
+
+    def get(self, module_class, *args, **kwargs):
+        """ Return the module of a class for the constructor arguments, making it the first time """
+        key = self.key(module_class, args, kwargs)
+        if key in self.modules:
+            self.hits += 1
+            return self.modules[key]
+        self.misses += 1
+        module = None
+        if getattr(module_class, "persistent", False):
+            disk_key = self.disk_key(key)
+            module = self.disk_cache.load(disk_key)
+            if module != None:
+                self.reused += 1
+                debug.info(2, "module factory reused {0} for {1}".format(module.name, key))
+        if module == None:
+            module = module_class(*args, **kwargs)
+            if debug.enabled(3):
+                debug.info(3, "module factory made {0} for {1}".format(module.name, key))
+            if getattr(module_class, "persistent", False):
+                self.disk_cache.store(disk_key, module)
+        self.modules[key] = module
+        return module
+
+    def disk_key(self, key):
+        """
+        Hash a module key with everything else the module is made from:
+        the technology and its library cells, the compiler sources and
+        the cell and array options. The disk cache adds the gdsMill sources.
+        """
+        module_class = key[0]
+        compiler = os.path.dirname(os.path.abspath(__file__))
+        paths = (sorted(glob.glob(OPTS.openram_tech + "gds_lib/*.gds"))
+                 + sorted(glob.glob(OPTS.openram_tech + "sp_lib/*.sp"))
+                 + sorted(glob.glob(os.path.join(compiler, "*.py"))))
+        # the configured cell modules, but not the size of the memory
+        cells = sorted((name, value) for (name, value) in vars(OPTS.config).items()
+                       if isinstance(value, str) and not name.startswith(("_", "output", "cache")))
+        options = (OPTS.trim_noncritical, OPTS.hierarchical_bitcell_array, OPTS.bitcell_array_block_rows)
+        return self.disk_cache.key(paths, ("{0}.{1}".format(module_class.__module__, module_class.__name__),
+                                           key[1:], cells, options))
+
+    def key(self, module_class, args, kwargs):
+        """
+        Bind the arguments to the constructor parameters, filling in the
+        defaults, so that positional and keyword calls give the same key.
+        """
+        (names, varargs, varkw, defaults) = inspect.getargspec(module_class.__init__)
+        names = names[1:]
+        values = dict(zip(names[len(names) - len(defaults or ()):], defaults or ()))
+        if len(args) > len(names):
+            debug.error("Too many arguments for {0}: {1}".format(module_class.__name__, args), -1)
+        values.update(zip(names, args))
+        values.update(kwargs)
+        if set(values.keys()) != set(names):
+            debug.error("Arguments {0} do not match the parameters {1} of {2}".format(sorted(values.keys()),
+                                                                                      names,
+                                                                                      module_class.__name__), -1)
+        return (module_class,) + tuple(hashable(values[name]) for name in names)
+
+    def clear(self):
+        """ Forget all of the modules, e.g. after the technology changes """
+        self.modules = {}
+
+    def __str__(self):
+        return "module factory: {0} hits, {1} misses, {2} reused from the disk cache".format(self.hits,
+                                                                                           self.misses,
+                                                                                           self.reused)
+
+
+def hashable(value):
+    """ Layer stacks and dimensions are passed as lists or tuples """
+    if isinstance(value, (list, tuple)):
+        return tuple(hashable(x) for x in value)
+    return value
@@ -18,6 +18,7 @@ class ms_flop(design.design):
 
         self.width = ms_flop.chars["width"]
         self.height = ms_flop.chars["height"]
+        self.add_library_pins(ms_flop.chars, ms_flop.pins)
 
         self.clk_offset = ms_flop.chars["clk"]
         self.din_offset = ms_flop.chars["din"]
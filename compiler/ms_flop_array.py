@@ -12,6 +12,9 @@ class ms_flop_array(design.design):
     hierdecoder
     """
 
+    # Made by the module factory and kept in the disk cache between runs
+    persistent = True
+
     def __init__(self, name, columns, word_size):
         self.columns = columns
         self.word_size = word_size
@@ -60,75 +63,25 @@ class ms_flop_array(design.design):
         self.add_pin("gnd")
 
     def create_ms_flop_array(self):
-        for i in range(self.word_size):
-            name = "Xdff%d" % i
-            if (i % 2 == 0):
-                x_off = i * self.ms_flop.width * self.words_per_row
-                mirror = "None"
-            else:
-                if (self.words_per_row == 1):
-                    x_off = (i + 1) * self.ms_flop.width
-                    mirror="MY"
-                else:
-                    x_off = i * self.ms_flop.width * self.words_per_row
-            self.add_inst(name=name,
-                          mod=self.ms_flop,
-                          offset=[x_off, 0], 
-                          mirror=mirror)
-            self.connect_inst(["din[{0}]".format(i),
-                               "dout[{0}]".format(i),
-                               "dout_bar[{0}]".format(i),
-                               "clk",
-                               "vdd", "gnd"])
-            self.flop_positions.append(vector(x_off, 0))
+        if (self.words_per_row == 1):
+            mirrors = ["R0", "MY"]
+        else:
+            mirrors = ["R0"]
+        (offsets, positions) = self.add_cell_array(name="Xdff{0}",
+                                                   mod=self.ms_flop,
+                                                   count=self.word_size,
+                                                   pitch=[self.ms_flop.width * self.words_per_row, 0],
+                                                   conns=["din[{0}]", "dout[{0}]", "dout_bar[{0}]",
+                                                          "clk", "vdd", "gnd"],
+                                                   mirrors=mirrors,
+                                                   labels=[("gnd", "metal2", self.ms_flop_chars["gnd"]),
+                                                           ("din[{0}]", "metal2", self.ms_flop_chars["din"]),
+                                                           ("dout[{0}]", "metal2", self.ms_flop_chars["dout"]),
+                                                           ("dout_bar[{0}]", "metal2", self.ms_flop_chars["dout_bar"])])
+        self.flop_positions = offsets
+        (self.gnd_positions, self.din_positions, self.dout_positions, self.dout_bar_positions) = positions
 
     def add_labels(self):
-        for i in range(self.word_size):
-            i_str = "[{0}]".format(i)
-            if (i % 2 == 0 or self.words_per_row > 1):
-                base = vector(i * self.ms_flop.width * self.words_per_row, 0)
-                self.add_label(text="gnd",
-                               layer="metal2",
-                               offset=base + self.ms_flop_chars["gnd"])
-                self.add_label(text="din" + i_str,
-                               layer="metal2",
-                               offset=base + self.ms_flop_chars["din"])
-                self.add_label(text="dout" + i_str,
-                               layer="metal2",
-                               offset=base + self.ms_flop_chars["dout"])
-                self.add_label(text="dout_bar" + i_str,
-                               layer="metal2",
-                               offset=base + self.ms_flop_chars["dout_bar"])
-
-                self.din_positions.append(base + self.ms_flop_chars["din"])
-                self.dout_positions.append(base + self.ms_flop_chars["dout"])
-                self.dout_bar_positions.append(base + self.ms_flop_chars["dout_bar"])
-                self.gnd_positions.append(base + self.ms_flop_chars["gnd"])
-            else:
-                base = vector((i + 1) * self.ms_flop.width, 0)
-                gnd_offset = base + vector(self.ms_flop_chars["gnd"]).scale(-1,1)
-                din_offset = base + vector(self.ms_flop_chars["din"]).scale(-1,1)
-                dout_offset = base + vector(self.ms_flop_chars["dout"]).scale(-1,1)
-                dout_bar_offset = base + vector(self.ms_flop_chars["dout_bar"]).scale(-1,1)
-
-                self.add_label(text="gnd",
-                               layer="metal2",
-                               offset=gnd_offset)
-                self.add_label(text="din" + i_str,
-                               layer="metal2",
-                               offset=din_offset)
-                self.add_label(text="dout" + i_str,
-                               layer="metal2",
-                               offset=dout_offset)
-                self.add_label(text="dout_bar" + i_str,
-                               layer="metal2",
-                               offset=dout_bar_offset)
-
-                self.gnd_positions.append(gnd_offset)
-                self.din_positions.append(din_offset)
-                self.dout_positions.append(dout_offset)
-                self.dout_bar_positions.append(dout_bar_offset)
-
         # Continous "clk" rail along with label.
         self.add_rect(layer="metal1",
                       offset=[0, self.ms_flop_chars["clk"][1]],
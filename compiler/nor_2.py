@@ -39,17 +39,19 @@ class nor_2(design.design):
 
     def create_layout(self):
         # These aren't for instantiating, but we use them to get the dimensions
-        self.poly_contact = contact.contact(("poly", "contact", "metal1"))
-        self.m1m2_via = contact.contact(("metal1", "via1", "metal2"))
+        self.poly_contact = design.factory.get(contact.contact, ("poly", "contact", "metal1"))
+        self.m1m2_via = design.factory.get(contact.contact, ("metal1", "via1", "metal2"))
 
         self.determine_sizes()
         self.create_modules()
 
         # These aren't for instantiating, but we use them to get the dimensions
-        self.nwell_contact = contact.contact(layer_stack=("active", "contact", "metal1"),
-                                                     dimensions=(1, self.pmos1.num_of_tacts))
-        self.pwell_contact = contact.contact(layer_stack=("active", "contact", "metal1"),
-                                                     dimensions=(1, self.nmos1.num_of_tacts))
+        self.nwell_contact = design.factory.get(contact.contact,
+                                                layer_stack=("active", "contact", "metal1"),
+                                                dimensions=(1, self.pmos1.num_of_tacts))
+        self.pwell_contact = design.factory.get(contact.contact,
+                                                layer_stack=("active", "contact", "metal1"),
+                                                dimensions=(1, self.nmos1.num_of_tacts))
 
         self.setup_layout_constants()
         self.add_rails()
@@ -65,12 +67,12 @@ class nor_2(design.design):
         for pmos_mults in range(1, 5):
             nmos_size = self.nmos_width
             pmos_size = 4 * self.nmos_width / pmos_mults
-            test_nmos = ptx(width=nmos_size,
-                            mults=nmos_mults,
-                            tx_type="nmos")
-            test_pmos = ptx(width=pmos_size,
-                            mults=pmos_mults,
-                            tx_type="nmos")
+            test_nmos = design.factory.get(ptx, width=nmos_size,
+                                                mults=nmos_mults,
+                                                tx_type="nmos")
+            test_pmos = design.factory.get(ptx, width=pmos_size,
+                                                mults=pmos_mults,
+                                                tx_type="nmos")
             
             # this how the position is done for now
             # postion noms and pmos and put A at 0.3 of the margin of it and put B and the 3rd m1 track above it
@@ -98,22 +100,22 @@ class nor_2(design.design):
 
     def create_modules(self):
         """transistors are created as modules"""
-        self.nmos1 = ptx(width=self.nmos_size,
-                         mults=self.nmos_mults,
-                         tx_type="nmos")
+        self.nmos1 = design.factory.get(ptx, width=self.nmos_size,
+                                             mults=self.nmos_mults,
+                                             tx_type="nmos")
         self.add_mod(self.nmos1)
-        self.nmos2 = ptx(width=self.nmos_size,
-                         mults=self.nmos_mults,
-                         tx_type="nmos")
+        self.nmos2 = design.factory.get(ptx, width=self.nmos_size,
+                                             mults=self.nmos_mults,
+                                             tx_type="nmos")
         self.add_mod(self.nmos2)
 
-        self.pmos1 = ptx(width=self.pmos_size,
-                         mults=self.pmos_mults,
-                         tx_type="pmos")
+        self.pmos1 = design.factory.get(ptx, width=self.pmos_size,
+                                             mults=self.pmos_mults,
+                                             tx_type="pmos")
         self.add_mod(self.pmos1)
-        self.pmos2 = ptx(width=self.pmos_size,
-                         mults=self.pmos_mults,
-                         tx_type="pmos")
+        self.pmos2 = design.factory.get(ptx, width=self.pmos_size,
+                                             mults=self.pmos_mults,
+                                             tx_type="pmos")
         self.add_mod(self.pmos2)
 
 
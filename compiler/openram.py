@@ -76,6 +76,18 @@ s = sram.sram(word_size=word_size,
               num_banks=num_banks,
               name=OPTS.output_name)
 
+# Report how often the library cells and generated modules were shared instead of made again
+import hierarchy_layout
+import hierarchy_spice
+import utils
+import design
+debug.info(1, str(design.factory))
+debug.info(1, str(hierarchy_layout.gds_cache))
+debug.info(1, str(hierarchy_layout.gds_disk_cache))
+debug.info(1, str(utils.chars_cache))
+debug.info(1, str(hierarchy_spice.sp_cache))
+debug.info(1, "Modules reused from the cache: {0}".format(design.factory.reused))
+
 # Measure design area
 # Not working?
 #cell_size = s.gds.measureSize(s.name)
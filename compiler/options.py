@@ -32,8 +32,16 @@ class options(optparse.Values):
     use_pex = False
     # Trim noncritical memory cells for simulation speed-up
     trim_noncritical = False
+    # Build the bitcell array from row modules instead of single cells
+    hierarchical_bitcell_array = False
+    # Group the rows of a hierarchical bitcell array in blocks of this
+    # many rows (an even number). 0 places the rows directly.
+    bitcell_array_block_rows = 0
     # Define the output file paths
     output_path = ""
     # Define the output file base name
     output_name = ""
     analytical_delay = False
+    # Directory where the parsed technology library cells are kept between runs.
+    # Set it to "" to disable the cache. The config file can also set it.
+    cache_path = os.path.join(os.path.expanduser("~"), ".cache", "openram")
@@ -0,0 +1,65 @@
+from vector import vector
+
+
+class pin_layout(object):
+    """
+    A shape of a named pin: the lower left and upper right corners of
+    a rectangle on a layer. Labels and the measured pins of library
+    cells are points, with both corners the same. A module keeps its
+    pins in its own coordinates and an instance transforms them.
+    """
+    __slots__ = ("name", "rect", "layer")
+
+    def __init__(self, name, rect, layer):
+        self.name = name
+        self.rect = [vector(rect[0]), vector(rect[1])]
+        self.layer = layer
+
+    def ll(self):
+        """ lower left corner """
+        return self.rect[0]
+
+    def ur(self):
+        """ upper right corner """
+        return self.rect[1]
+
+    def width(self):
+        return self.rect[1].x - self.rect[0].x
+
+    def height(self):
+        return self.rect[1].y - self.rect[0].y
+
+    def center(self):
+        return vector(0.5 * (self.rect[0].x + self.rect[1].x),
+                      0.5 * (self.rect[0].y + self.rect[1].y))
+
+    def translate(self, coordinate):
+        """ Move the shape by -coordinate, as layout.translate does """
+        self.rect = [vector(self.rect[0] - coordinate), vector(self.rect[1] - coordinate)]
+
+    def transform(self, transform):
+        """ Return the shape placed with an (a,b,c,d,x,y) reference
+        transform, see gdsMill.referenceTransform """
+        (a, b, c, d, x, y) = transform
+        (x0, y0) = (a * self.rect[0].x + b * self.rect[0].y + x,
+                    c * self.rect[0].x + d * self.rect[0].y + y)
+        (x1, y1) = (a * self.rect[1].x + b * self.rect[1].y + x,
+                    c * self.rect[1].x + d * self.rect[1].y + y)
+        return pin_layout(self.name,
+                          [vector(min(x0, x1), min(y0, y1)), vector(max(x0, x1), max(y0, y1))],
+                          self.layer)
+
+    def __eq__(self, other):
+        return (isinstance(other, pin_layout) and self.name == other.name
+                and self.layer == other.layer and self.rect == other.rect)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __str__(self):
+        """ override print function output """
+        return "pin: " + self.name + " " + str(self.rect) + " layer=" + str(self.layer)
+
+    def __repr__(self):
+        """ override print function output """
+        return "( pin: " + self.name + " " + str(self.rect) + " layer=" + str(self.layer) + " )"
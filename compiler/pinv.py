@@ -42,8 +42,8 @@ class pinv(design.design):
         """Calls all functions related to the generation of the layout(gds)"""
 
         # These aren't for instantiating, but we use them to get the dimensions
-        self.poly_contact = contact.contact(("poly", "contact", "metal1"))
-        self.m1m2_via = contact.contact(("metal1", "via1", "metal2"))
+        self.poly_contact = design.factory.get(contact.contact, ("poly", "contact", "metal1"))
+        self.m1m2_via = design.factory.get(contact.contact, ("metal1", "via1", "metal2"))
 
         self.determine_tx_mults()
         self.create_ptx()
@@ -52,10 +52,12 @@ class pinv(design.design):
         self.add_ptx()
 
         # These aren't for instantiating, but we use them to get the dimensions
-        self.nwell_contact = contact.contact(layer_stack=("active", "contact", "metal1"),
-                                             dimensions=(1, self.pmos.num_of_tacts))
-        self.pwell_contact = contact.contact(layer_stack=("active", "contact", "metal1"),
-                                             dimensions=(1, self.nmos.num_of_tacts))
+        self.nwell_contact = design.factory.get(contact.contact,
+                                                layer_stack=("active", "contact", "metal1"),
+                                                dimensions=(1, self.pmos.num_of_tacts))
+        self.pwell_contact = design.factory.get(contact.contact,
+                                                layer_stack=("active", "contact", "metal1"),
+                                                dimensions=(1, self.nmos.num_of_tacts))
 
         self.extend_wells()
         self.extend_active()
@@ -95,15 +97,15 @@ class pinv(design.design):
 
     def create_ptx(self):
         """Intiializes a ptx object"""
-        self.nmos = ptx(width=self.nmos_size,
-                        mults=self.tx_mults,
-                        tx_type="nmos")
+        self.nmos = design.factory.get(ptx, width=self.nmos_size,
+                                            mults=self.tx_mults,
+                                            tx_type="nmos")
         self.nmos.connect_fingered_poly()
         self.nmos.connect_fingered_active()
         self.add_mod(self.nmos)
-        self.pmos = ptx(width=self.pmos_size,
-                        mults=self.tx_mults,
-                        tx_type="pmos")
+        self.pmos = design.factory.get(ptx, width=self.pmos_size,
+                                            mults=self.tx_mults,
+                                            tx_type="pmos")
         self.pmos.connect_fingered_poly()
         self.pmos.connect_fingered_active()
         self.add_mod(self.pmos)
@@ -45,15 +45,16 @@ class precharge(design.design):
 
     def create_ptx(self):
         """Initializes the upper and lower pmos"""
-        self.lower_pmos = ptx(width=self.ptx_width,
-                              mults=1, 
-                              tx_type="pmos")
+        self.lower_pmos = design.factory.get(ptx, width=self.ptx_width,
+                                                  mults=1, 
+                                                  tx_type="pmos")
         self.add_mod(self.lower_pmos)
-        self.upper_pmos = ptx(width=self.beta * self.ptx_width,
-                              mults=1,
-                              tx_type="pmos")
+        self.upper_pmos = design.factory.get(ptx, width=self.beta * self.ptx_width,
+                                                  mults=1,
+                                                  tx_type="pmos")
         self.upper_pmos = self.upper_pmos
         self.add_mod(self.upper_pmos)
+        # this one is changed below, so it is not shared through the factory
         self.temp_pmos = ptx(width=self.beta * self.ptx_width,
                              mults=2,
                              tx_type="pmos")
@@ -63,14 +64,14 @@ class precharge(design.design):
     def create_contacts(self):
         """Initializes all required contacts/vias for this module"""
         # These aren't for instantiating, but we use them to get the dimensions
-        self.nwell_contact = contact(layer_stack=("active", "contact", "metal1"))
-        self.poly_contact = contact(layer_stack=("poly", "contact", "metal1"))
+        self.nwell_contact = design.factory.get(contact, layer_stack=("active", "contact", "metal1"))
+        self.poly_contact = design.factory.get(contact, layer_stack=("poly", "contact", "metal1"))
         self.upper_dimensions = self.upper_pmos.active_contact.dimensions
         self.lower_dimensions = self.lower_pmos.active_contact.dimensions
-        self.upper_contact = contact(layer_stack=("metal1", "via1", "metal2"),
-                                     dimensions=self.upper_dimensions)
-        self.lower_contact = contact(layer_stack=("metal1", "via1", "metal2"),
-                                     dimensions=self.lower_dimensions)
+        self.upper_contact = design.factory.get(contact, layer_stack=("metal1", "via1", "metal2"),
+                                                         dimensions=self.upper_dimensions)
+        self.lower_contact = design.factory.get(contact, layer_stack=("metal1", "via1", "metal2"),
+                                                         dimensions=self.lower_dimensions)
 
     def setup_layout_constants(self):
         self.width = self.bitcell_chars["width"]
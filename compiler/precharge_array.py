@@ -1,7 +1,6 @@
 import design
 import debug
 from tech import drc
-from vector import vector
 from precharge import precharge
 
 
@@ -11,6 +10,13 @@ class precharge_array(design.design):
     of bit line columns, height is the height of the bit-cell array.
     """
 
+    # Made by the module factory and kept in the disk cache between runs
+    persistent = True
+
+    # Moved by offset_all_coordinates
+    coordinate_attributes = ["pc_cell_positions", "pclk_position", "vdd_positions",
+                             "BL_positions", "BR_positions"]
+
     def __init__(self, name, columns, ptx_width, beta=2):
         design.design.__init__(self, name)
         debug.info(1, "Creating {0}".format(name))
@@ -76,22 +82,12 @@ class precharge_array(design.design):
 
     def add_pc(self):
         """Creates a precharge array by horizontally tiling the precharge cell"""
-        self.pc_cell_positions = []
-        for i in range(self.columns):
-            name = "pre_column_{0}".format(i)
-            offset = vector(self.pc_cell.width * i, 0)
-            self.pc_cell_positions.append(offset)
-            self.add_inst(name=name,
-                          mod=self.pc_cell,
-                          offset=offset)
-            self.add_label(text="bl[{0}]".format(i),
-                           layer="metal2",
-                           offset=offset+ self.pc_cell.BL_position.scale(1,0))
-            self.add_label(text="br[{0}]".format(i),
-                           layer="metal2",
-                           offset=offset+ self.pc_cell.BR_position.scale(1,0))
-            self.connect_inst(["bl[{0}]".format(i), "br[{0}]".format(i),
-                               "clk", "vdd"])
-
-            self.BL_positions.append(offset + self.pc_cell.BL_position.scale(1,0))
-            self.BR_positions.append(offset + self.pc_cell.BR_position.scale(1,0))
+        (offsets, positions) = self.add_cell_array(name="pre_column_{0}",
+                                                   mod=self.pc_cell,
+                                                   count=self.columns,
+                                                   pitch=[self.pc_cell.width, 0],
+                                                   conns=["bl[{0}]", "br[{0}]", "clk", "vdd"],
+                                                   labels=[("bl[{0}]", "metal2", self.pc_cell.BL_position.scale(1,0)),
+                                                           ("br[{0}]", "metal2", self.pc_cell.BR_position.scale(1,0))])
+        self.pc_cell_positions = offsets
+        (self.BL_positions, self.BR_positions) = positions
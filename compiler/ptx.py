@@ -10,6 +10,11 @@ class ptx(design.design):
     This module generates gds and spice of a parametrically NMOS or PMOS sized transistor. 
     Creates a simple MOS transistor
     """
+
+    # Moved by offset_all_coordinates
+    coordinate_attributes = ["active_position", "nwell_position", "pwell_position",
+                             "poly_positions", "active_contact_positions"]
+
     def __init__(self, width=1, mults=1, tx_type="nmos"):
         name = "{0}_m{1}_w{2}".format(tx_type, mults, width)
         # remove periods for newer spice compatibility
@@ -20,6 +25,10 @@ class ptx(design.design):
         self.tx_type = tx_type
         self.mults = mults
         self.gate_width = width
+        # the fingers are connected once by the first user that asks,
+        # since the module is shared by every user with these parameters
+        self.poly_connected = False
+        self.active_connected = False
 
         self.add_pins()
         self.create_layout()
@@ -35,8 +44,8 @@ class ptx(design.design):
 
         # This is not actually instantiated but used for calculations
         self.num_of_tacts = self.calculate_num_of_tacts()
-        self.active_contact = contact(layer_stack=("active", "contact", "metal1"),
-                                      dimensions=(1, self.num_of_tacts))
+        self.active_contact = design.factory.get(contact, layer_stack=("active", "contact", "metal1"),
+                                                          dimensions=(1, self.num_of_tacts))
         
         self.add_active()
         self.add_implants()  
@@ -50,9 +59,9 @@ class ptx(design.design):
         self.offset_all_coordinates()
 
     def offset_all_coordinates(self):
-        coordinate = self.find_lowest_coords()
-        self.offset_attributes(coordinate)
-        self.translate(coordinate)
+        design.design.offset_all_coordinates(self)
+        # the size is measured from the moved objs and insts
+        self.apply_origin()
 
         # We can do this in ptx because we have offset all modules it uses.
         # Is this really true considering the paths that connect the src/drain?
@@ -96,6 +105,9 @@ class ptx(design.design):
                                drc["minwidth_well"])
 
     def connect_fingered_poly(self):
+        if self.poly_connected:
+            return
+        self.poly_connected = True
         poly_connect_length = self.poly_positions[-1].x + self.poly_width \
                               - self.poly_positions[0].x
         poly_connect_position = self.poly_positions[0] - vector(0, self.poly_width)
@@ -150,6 +162,9 @@ class ptx(design.design):
             self.drain_positions.append(vector(d + correct))
 
     def connect_fingered_active(self):
+        if self.active_connected:
+            return
+        self.active_connected = True
         self.determine_active_wire_location()
         # allows one to connect the source and drains
         self.source_connect_index = None
@@ -20,3 +20,4 @@ class replica_bitcell(design.design):
 
         self.width = replica_bitcell.chars["width"]
         self.height = replica_bitcell.chars["height"]
+        self.add_library_pins(replica_bitcell.chars, replica_bitcell.pins)
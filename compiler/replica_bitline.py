@@ -16,6 +16,11 @@ class replica_bitline(design.design):
     Used for memory timing control
     """
 
+    # Moved by offset_all_coordinates
+    coordinate_attributes = ["replica_bitline_offset", "access_tx_offset", "delay_chain_offset",
+                             "delay_inv_offset", "BL_inv_offset", "en_input_offset",
+                             "en_nor_offset", "out_offset", "gnd_position"]
+
     def __init__(self, name, rows):
         design.design.__init__(self, "replica_bitline")
 
@@ -96,20 +101,20 @@ class replica_bitline(design.design):
                                                 [1, 1, 1])
         self.add_mod(self.delay_chain)
 
-        self.inv = pinv(nmos_width=drc["minwidth_tx"])
+        self.inv = design.factory.get(pinv, nmos_width=drc["minwidth_tx"])
         self.add_mod(self.inv)
 
         # These aren't for instantiating, but we use them to get the dimensions
-        self.poly_contact = contact(layer_stack=("poly", "contact", "metal1"))
-        self.m1m2_via = contact(layer_stack=("metal1", "via1", "metal2"))
-        self.m2m3_via = contact(layer_stack=("metal2", "via2", "metal3"))
+        self.poly_contact = design.factory.get(contact, layer_stack=("poly", "contact", "metal1"))
+        self.m1m2_via = design.factory.get(contact, layer_stack=("metal1", "via1", "metal2"))
+        self.m2m3_via = design.factory.get(contact, layer_stack=("metal2", "via2", "metal3"))
 
-        self.nor = nor_2(nmos_width=drc["minwidth_tx"])
+        self.nor = design.factory.get(nor_2, nmos_width=drc["minwidth_tx"])
         self.add_mod(self.nor)
 
-        self.access_tx = ptx(width=drc["minwidth_tx"],
-                             mults=1,
-                             tx_type="pmos")
+        self.access_tx = design.factory.get(ptx, width=drc["minwidth_tx"],
+                                                 mults=1,
+                                                 tx_type="pmos")
         self.add_mod(self.access_tx)
 
     def add_modules(self):
@@ -1,5 +1,6 @@
 import gdsMill
 import tech
+import design
 from contact import contact
 import math
 import debug
@@ -61,7 +62,7 @@ class router:
         self.horiz_layer_number = tech.layer[horiz_layer]
 
         # Contacted track spacing.
-        via_connect = contact(self.layers, (1, 1))
+        via_connect = design.factory.get(contact, self.layers, (1, 1))
         self.max_via_size = max(via_connect.width,via_connect.height)
         self.horiz_track_width = self.max_via_size + self.horiz_layer_spacing
         self.vert_track_width = self.max_via_size + self.vert_layer_spacing
@@ -289,7 +290,7 @@ class router:
 
         if add_via:
             # offset this by 1/2 the via size
-            c=contact(self.layers, (1, 1))
+            c=design.factory.get(contact, self.layers, (1, 1))
             via_offset = vector(-0.5*c.width,-0.5*c.height)
             self.cell.add_via(self.layers,vector(point[0],point[1])+via_offset)
 
@@ -466,7 +467,7 @@ class router:
                 
 
         # recurse given the mirror, angle, etc.
-        for cur_sref in self.layout.structures[sref].srefs:
+        for cur_sref in self.layout.structures[sref].allSrefs():
             sMirr = 1
             if cur_sref.transFlags[0] == True:
                 sMirr = -1
@@ -21,3 +21,6 @@ wordline_driver = "wordline_driver"
 replica_bitcell = "replica_bitcell"
 bitcell = "bitcell"
 delay_chain = "logic_effort_dc"
+
+# The tests do not keep modules or library cells between runs
+cache_path = ""
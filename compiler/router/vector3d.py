@@ -1,13 +1,17 @@
 import debug
 import math
 
-class vector3d():
+class vector3d(object):
     """
     This is the vector3d class to represent a 3D coordinate.
     It needs to override several operators to support
     concise vector3d operations, output, and other more complex
     data structures like lists.
+    The router creates a vector3d for every grid point it visits, so
+    there are only slots for the coordinates and the cached hash.
     """
+    __slots__ = ("x", "y", "z", "hash_value")
+
     def __init__(self, x, y=None, z=None):
         """ init function support two init method"""
         # will take single input as a coordinate
@@ -20,7 +24,7 @@ class vector3d():
             self.x = x
             self.y = y
             self.z = z
-        self.tpl=(x,y,z)
+        self.hash_value = None
             
     def __str__(self):
         """ override print function output """
@@ -35,6 +39,7 @@ class vector3d():
         override setitem function 
         can set value by vector3d[index]=value
         """
+        self.hash_value = None
         if index==0:
             self.x=value
         elif index==1:
@@ -89,7 +94,9 @@ class vector3d():
         Note: This assumes that you DON'T CHANGE THE VECTOR or it will
         break things.
         """
-        return hash(self.tpl)
+        if self.hash_value == None:
+            self.hash_value = hash((self.x, self.y, self.z))
+        return self.hash_value
 
 
     def __rsub__(self, other):
@@ -121,7 +128,7 @@ class vector3d():
     def __eq__(self, other):
         """Override the default Equals behavior"""
         if isinstance(other, self.__class__):
-            return self.__dict__ == other.__dict__
+            return self.x == other.x and self.y == other.y and self.z == other.z
         return False
 
     def __ne__(self, other):
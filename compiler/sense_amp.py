@@ -20,6 +20,7 @@ class sense_amp(design.design):
 
         self.width = sense_amp.chars["width"]
         self.height = sense_amp.chars["height"]
+        self.add_library_pins(sense_amp.chars, sense_amp.pins)
 
     def delay(self, slew, load=0.0):
         from tech import spice
@@ -10,6 +10,13 @@ class sense_amp_array(design.design):
     Dynamically generated sense amp array for all bitlines.
     """
 
+    # Made by the module factory and kept in the disk cache between runs
+    persistent = True
+
+    # Moved by offset_all_coordinates
+    coordinate_attributes = ["amp_positions", "vdd_positions", "gnd_positions", "SCLK_positions",
+                             "Data_out_positions"]
+
     def __init__(self, word_size, words_per_row):
         design.design.__init__(self, "sense_amp_array")
         debug.info(1, "Creating {0}".format(self.name))
@@ -65,42 +72,23 @@ class sense_amp_array(design.design):
         self.add_mod(self.amp)
 
     def add_sense_amp(self):
-        for i in range(self.word_size):
-            name = "sa_d{0}".format(i)
-            index = i * self.words_per_row
-            amp_position = vector(self.amp.width * index, 0)
-            BL_offset = amp_position + vector(self.sense_amp_chars["BL"][0], 0) 
-            BR_offset = amp_position + vector(self.sense_amp_chars["BR"][0], 0)
-
-            self.add_inst(name=name,
-                          mod=self.amp,
-                          offset=amp_position)
-            self.amp_positions.append(amp_position)
-            if (self.words_per_row == 1):
-                self.add_label(text="bl[{0}]".format(i),
-                               layer="metal2",
-                               offset=BL_offset)
-                self.add_label(text="br[{0}]".format(i),
-                               layer="metal2",
-                               offset=BR_offset)
-                self.connect_inst(["bl[{0}]".format(i),"br[{0}]".format(i), 
-                                   "data_out[{0}]".format(i), 
-                                   "sclk", "vdd", "gnd"])
-            else:
-                self.add_label(text="bl_out[{0}]".format(index),
-                               layer="metal2",
-                               offset=BL_offset)
-                self.add_label(text="br_out[{0}]".format(index),
-                               layer="metal2",
-                               offset=BR_offset)
-                self.connect_inst(["bl_out[{0}]".format(index), "br_out[{0}]".format(index), 
-                                   "data_out[{0}]".format(i), 
-                                   "sclk", "vdd", "gnd"])
-
-            self.add_label(text="data_out[{0}]".format(i),
-                           layer="metal2",
-                           offset=amp_position + self.sense_amp_chars["Dout"])
-            self.Data_out_positions.append(amp_position + self.sense_amp_chars["Dout"])
+        if (self.words_per_row == 1):
+            bitlines = ["bl[{1}]", "br[{1}]"]
+        else:
+            bitlines = ["bl_out[{1}]", "br_out[{1}]"]
+        data_out = vector(self.sense_amp_chars["Dout"])
+        (offsets, positions) = self.add_cell_array(name="sa_d{0}",
+                                                   mod=self.amp,
+                                                   count=self.word_size,
+                                                   pitch=[self.amp.width * self.words_per_row, 0],
+                                                   conns=bitlines + ["data_out[{0}]", "sclk", "vdd", "gnd"],
+                                                   indices=[range(self.word_size),
+                                                            range(0, self.word_size * self.words_per_row, self.words_per_row)],
+                                                   labels=[(bitlines[0], "metal2", vector(self.sense_amp_chars["BL"][0], 0)),
+                                                           (bitlines[1], "metal2", vector(self.sense_amp_chars["BR"][0], 0)),
+                                                           ("data_out[{0}]", "metal2", data_out)])
+        self.amp_positions = offsets
+        self.Data_out_positions = positions[2]
 
     def connect_rails(self):
         base_offset = vector(0, - 0.5 * drc["minwidth_metal1"])
@@ -31,8 +31,8 @@ class single_level_column_mux(design.design):
     def create_layout(self):
 
         # This is not instantiated and used for calculations only.
-        self.m1m2_via = contact(layer_stack=("metal1", "via1", "metal2"))
-        self.pwell_contact = contact(layer_stack=("active", "contact", "metal1"))
+        self.m1m2_via = design.factory.get(contact, layer_stack=("metal1", "via1", "metal2"))
+        self.pwell_contact = design.factory.get(contact, layer_stack=("active", "contact", "metal1"))
 
         self.create_ptx()
         self.add_ptx()
@@ -44,13 +44,13 @@ class single_level_column_mux(design.design):
 
     def create_ptx(self):
         """Initializes the nmos1 and nmos2 transistors"""
-        self.nmos1 = ptx(width=self.ptx_width,
-                         mults=1,
-                         tx_type="nmos")
+        self.nmos1 = design.factory.get(ptx, width=self.ptx_width,
+                                             mults=1,
+                                             tx_type="nmos")
         self.add_mod(self.nmos1)
-        self.nmos2 = ptx(width=self.ptx_width,
-                         mults=1,
-                         tx_type="nmos")
+        self.nmos2 = design.factory.get(ptx, width=self.ptx_width,
+                                             mults=1,
+                                             tx_type="nmos")
         self.nmos2 = self.nmos2        
         self.add_mod(self.nmos2)
 
@@ -14,6 +14,13 @@ class single_level_column_mux_array(design.design):
     Array of column mux to read the bitlines through the 6T.
     """
 
+    # Made by the module factory and kept in the disk cache between runs
+    persistent = True
+
+    # Moved by offset_all_coordinates
+    coordinate_attributes = ["addr_line_positions", "gnd_positions", "BL_positions",
+                             "BR_positions", "BL_out_positions", "BR_out_positions"]
+
     def __init__(self, rows, columns, word_size):
         design.design.__init__(self, "columnmux_array")
         debug.info(1, "Creating {0}".format(self.name))
@@ -51,7 +58,7 @@ class single_level_column_mux_array(design.design):
         self.add_mod(self.mux)
 
         # This is not instantiated and used for calculations only.
-        self.m1m2_via = contact(layer_stack=("metal1", "via1", "metal2"))
+        self.m1m2_via = design.factory.get(contact, layer_stack=("metal1", "via1", "metal2"))
 
 
     def setup_layout_constants(self):
@@ -71,46 +78,31 @@ class single_level_column_mux_array(design.design):
             self.height = self.height + (self.words_per_row + 1) * spacing
 
     def create_array(self):
-        for i in range(self.columns):
-            name = "XMUX{0}".format(i)
-            x_off = vector(i * self.mux.width, 0)
-            self.add_inst(name=name,
-                          mod=self.mux,
-                          offset=x_off)
-
-            """ draw a vertical m2 rail to extend BL BR & gnd on top of the cell """
-            # FIXME: These are just min metal squares, are they needed?
-            self.add_rect(layer="metal2",
-                          offset=x_off + self.mux.BL_position,
-                          width=drc['minwidth_metal2'],
-                          height=drc['minwidth_metal2'])
-            self.add_rect(layer="metal2",
-                          offset=x_off + self.mux.BR_position,
-                          width=drc['minwidth_metal2'],
-                          height=drc['minwidth_metal2'])
-            self.add_rect(layer="metal2",
-                          offset=x_off + self.mux.gnd_position,
-                          width=drc['minwidth_metal2'],
-                          height=drc['minwidth_metal2'])
-
-            """ add labels for the column_mux array """
-            BL = self.mux.BL_position + vector(i * self.mux.width, 0)
-            self.BL_positions.append(BL)
-            self.add_label(text="bl[{0}]".format(i),
-                           layer="metal2",
-                           offset=BL)
-
-            BR = self.mux.BR_position + vector(i * self.mux.width, 0)
-            self.BR_positions.append(BR)
-            self.add_label(text="br[{0}]".format(i),
-                           layer="metal2",
-                           offset=BR)
-
-            gnd = self.mux.gnd_position + vector(i * self.mux.width, 0)
-            self.gnd_positions.append(gnd)
-            self.add_label(text="gnd",
-                           layer="metal2",
-                           offset=gnd)
+        """ draw a min m2 square to extend BL BR & gnd on top of each cell """
+        # FIXME: These are just min metal squares, are they needed?
+        for position in [self.mux.BL_position, self.mux.BR_position, self.mux.gnd_position]:
+            self.add_bus(layer="metal2",
+                         offset=position,
+                         bits=self.columns,
+                         pitch=[self.mux.width, 0],
+                         width=drc['minwidth_metal2'],
+                         height=drc['minwidth_metal2'])
+
+        # each mux connects a column to the output of its word
+        columns = range(self.columns)
+        (offsets, positions) = self.add_cell_array(name="XMUX{0}",
+                                                   mod=self.mux,
+                                                   count=self.columns,
+                                                   pitch=[self.mux.width, 0],
+                                                   conns=["bl[{0}]", "br[{0}]", "bl_out[{1}]", "br_out[{1}]",
+                                                          "sel[{2}]", "gnd"],
+                                                   indices=[columns,
+                                                            [col - col % self.words_per_row for col in columns],
+                                                            [col % self.words_per_row for col in columns]],
+                                                   labels=[("bl[{0}]", "metal2", self.mux.BL_position),
+                                                           ("br[{0}]", "metal2", self.mux.BR_position),
+                                                           ("gnd", "metal2", self.mux.gnd_position)])
+        (self.BL_positions, self.BR_positions, self.gnd_positions) = positions
 
         for i in range(self.word_size):
             base =vector(i * self.words_per_row * self.mux.width, 0)
@@ -125,53 +117,6 @@ class single_level_column_mux_array(design.design):
             self.BL_out_positions.append(BL_out)
             self.BR_out_positions.append(BR_out)
 
-        if(self.words_per_row == 2):
-            for i in range(self.columns / 2):
-                # This will not check that the inst connections match.
-                self.connect_inst(args=["bl[{0}]".format(2 * i),
-                                        "br[{0}]".format(2 * i),
-                                        "bl_out[{0}]".format(2 * i),
-                                        "br_out[{0}]".format(2 * i),
-                                        "sel[{0}]".format(0), "gnd"],
-                                  check=False)
-                # This will not check that the inst connections match.
-                self.connect_inst(args=["bl[{0}]".format(2 * i + 1),
-                                        "br[{0}]".format(2 * i + 1),
-                                        "bl_out[{0}]".format(2 * i),
-                                        "br_out[{0}]".format(2 * i),
-                                        "sel[{0}]".format(1), "gnd"],
-                                  check=False)
-        if(self.words_per_row == 4):
-            for i in range(self.columns / 4):
-                # This will not check that the inst connections match.
-                self.connect_inst(args=["bl[{0}]".format(4 * i),
-                                        "br[{0}]".format(4 * i),
-                                        "bl_out[{0}]".format(4 * i),
-                                        "br_out[{0}]".format(4 * i),
-                                        "sel[{0}]".format(0), "gnd"],
-                                  check=False)
-                # This will not check that the inst connections match.
-                self.connect_inst(args=["bl[{0}]".format(4 * i + 1),
-                                        "br[{0}]".format(4 * i + 1),
-                                        "bl_out[{0}]".format(4 * i),
-                                        "br_out[{0}]".format(4 * i),
-                                        "sel[{0}]".format(1), "gnd"],
-                                  check=False)
-                # This will not check that the inst connections match.
-                self.connect_inst(args=["bl[{0}]".format(4 * i + 2),
-                                        "br[{0}]".format(4 * i + 2),
-                                        "bl_out[{0}]".format(4 * i),
-                                        "br_out[{0}]".format(4 * i),
-                                        "sel[{0}]".format(2), "gnd"],
-                                  check=False)
-                # This will not check that the inst connections match.
-                self.connect_inst(args=["bl[{0}]".format(4 * i + 3),
-                                        "br[{0}]".format(4 * i + 3),
-                                        "bl_out[{0}]".format(4 * i),
-                                        "br_out[{0}]".format(4 * i),
-                                        "sel[{0}]".format(3), "gnd"],
-                                  check=False)
-
     def add_routing(self):
         self.add_horizontal_input_rail()
         self.add_vertical_poly_rail()
@@ -203,7 +148,7 @@ class single_level_column_mux_array(design.design):
                           height= height -self.m1m2_via.width)
 
             # This is not instantiated and used for calculations only.
-            poly_contact = contact(layer_stack=("metal1", "contact", "poly"))
+            poly_contact = design.factory.get(contact, layer_stack=("metal1", "contact", "poly"))
             offset = offset.scale(1, 0) + vector(0, height - poly_contact.width)
             self.add_contact(layers=("metal1", "contact", "poly"),
                              offset=offset,
@@ -28,7 +28,7 @@ class sram(design.design):
         # reset the static duplicate name checker for unit tests
         # in case we create more than one SRAM
         import design
-        design.design.name_map=[]
+        design.design.name_map=set()
 
         self.ms_flop_chars = self.mod_ms_flop.chars
         self.bitcell_chars = self.mod_bitcell.chars
@@ -167,8 +167,8 @@ class sram(design.design):
             self.create_multibank_modules()
 
         # These aren't for instantiating, but we use them to get the dimensions
-        self.m1m2_via = contact(layer_stack=("metal1", "via1", "metal2"))
-        self.m2m3_via = contact(layer_stack=("metal2", "via2", "metal3"))
+        self.m1m2_via = design.factory.get(contact, layer_stack=("metal1", "via1", "metal2"))
+        self.m2m3_via = design.factory.get(contact, layer_stack=("metal2", "via2", "metal3"))
 
         self.bank_count = 0
 
@@ -328,24 +328,21 @@ class sram(design.design):
         line_width = drc[minwidth]
         line_gap = 2*drc[m2m]
 
-        line_positions = []
-        bus_width = bits*(line_width + line_gap)
+        line_pitch = line_width + line_gap
         if(rotate == 0):
-            for i in range(bits):
-                line_offset = offset + vector(i*(line_width + line_gap),0)
-                self.add_rect(layer=layer,
-                              offset=line_offset,
-                              width=line_width,
-                              height=height)
-                line_positions.append(line_offset)
+            line_positions = self.add_bus(layer=layer,
+                                          offset=offset,
+                                          bits=bits,
+                                          pitch=vector(line_pitch, 0),
+                                          width=line_width,
+                                          height=height)
         elif(rotate == 270):
-            for i in range(bits):
-                line_offset = offset - vector(0, (i+1)*line_width + i*line_gap)
-                self.add_rect(layer=layer,
-                              offset=line_offset,  
-                              width=height,
-                              height=line_width)
-                line_positions.append(line_offset)
+            line_positions = self.add_bus(layer=layer,
+                                          offset=offset - vector(0, line_width),
+                                          bits=bits,
+                                          pitch=vector(0, -line_pitch),
+                                          width=height,
+                                          height=line_width)
         else:
             debug.error("Unimplemented rotation for create_bus")
 
@@ -370,6 +367,11 @@ class sram(design.design):
                 "tri_en_bar", "clk_bar", "clk", "vdd", "gnd"]
         self.connect_inst(temp)
 
+        # the control pins placed like the control logic
+        control_inst = self.inst_map["control"]
+        for pin in ["CSb", "OEb", "WEb", "clk"]:
+            setattr(self, pin + "_position", control_inst.get_pin(pin).ll())
+
     def add_singlebank_modules(self):
         """ This adds the moduels for a single bank SRAM with control
         logic. """
@@ -382,15 +384,6 @@ class sram(design.design):
 
         self.width = self.bank.width + self.control.height + 2*drc["minwidth_metal3"]
         self.height = self.bank.height
-        self.control.CSb_position.rotate_scale(-1,1)
-        self.CSb_position = (self.control.CSb_position.rotate_scale(-1,1)
-                                +self.control_position)
-        self.OEb_position = (self.control.OEb_position.rotate_scale(-1,1)
-                                +self.control_position)
-        self.WEb_position = (self.control.WEb_position.rotate_scale(-1,1)
-                                +self.control_position)
-        self.clk_position = (self.control.clk_position.rotate_scale(-1,1)
-                                +self.control_position)
         for i in range(0, self.word_size):
             self.add_label(text="DATA[{0}]".format(i),
                            layer="metal3",
@@ -466,10 +459,6 @@ class sram(design.design):
                                                   + self.ms_flop_chars["width"])
             self.add_control_logic(self.control_position, "R0")
 
-            self.CSb_position = self.control_position + self.control.CSb_position
-            self.OEb_position = self.control_position + self.control.OEb_position
-            self.WEb_position = self.control_position + self.control.WEb_position
-            self.clk_position = self.control_position + self.control.clk_position
             # Max point
             self.max_point = self.control_position.y + self.ms_flop_chars["width"]
 
@@ -576,11 +565,6 @@ class sram(design.design):
         self.control_position = vector(0, self.msb_decoder_position.y
                                               + self.msb_decoder.height)
         self.add_control_logic(self.control_position, "R0")
-                                         
-        self.CSb_position = self.control_position + self.control.CSb_position
-        self.OEb_position = self.control_position + self.control.OEb_position
-        self.WEb_position = self.control_position + self.control.WEb_position
-        self.clk_position = self.control_position + self.control.clk_position
 
         # Max point
         self.max_point = self.msb_decoder_position.y + self.msb_decoder.height
@@ -1168,9 +1152,7 @@ class sram(design.design):
         sp.write("* User: {0}\n".format(getpass.getuser()))
         sp.write(".global {0} {1}\n".format(spice["vdd_name"], 
                                             spice["gnd_name"]))
-        usedMODS = list()
-        self.sp_write_file(sp, usedMODS)
-        del usedMODS
+        self.sp_write_file(sp, set())
         sp.close()
 
     def analytical_model(self,slews,loads):
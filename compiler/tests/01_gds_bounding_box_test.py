@@ -0,0 +1,88 @@
+#!/usr/bin/env python2.7
+"""
+Check that the memoized hierarchical bounding boxes are the same as the
+boxes of the flattened boundaries, and that they follow layout changes.
+"""
+
+import unittest
+from testutils import header
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+import debug
+import time
+
+OPTS = globals.OPTS
+
+#@unittest.skip("SKIPPING 01_gds_bounding_box_test")
+
+
+class gds_bounding_box_test(unittest.TestCase):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = False
+
+        import bitcell_array
+        import gdsMill
+        from tech import GDS
+
+        a = bitcell_array.bitcell_array(name="bitcell_array", cols=16, rows=16)
+        tempgds = OPTS.openram_temp + "temp.gds"
+        a.gds_write(tempgds)
+
+        OPTS.check_lvsdrc = True
+
+        layout = gdsMill.VlsiLayout(units=GDS["unit"])
+        gdsMill.Gds2reader(layout).loadFromFile(tempgds)
+        start = time.time()
+        flat_boundary = self.flat_boundary(layout)
+        flat_time = time.time() - start
+        start = time.time()
+        boundary = layout.measureBoundary(a.name)
+        memo_time = time.time() - start
+        debug.info(1, "{0} cells: flattened {1:.4f}s memoized {2:.4f}s".format(len(layout.xyTree),
+                                                                              flat_time,
+                                                                              memo_time))
+        self.assertEqual(boundary, flat_boundary)
+        # one box for each structure and orientation it is placed in
+        self.assertTrue(len(layout.boundingBoxes) <= 8 * len(layout.structures))
+        # measuring does not change the root or the xyTree
+        self.assertEqual(layout.rootStructureName, a.name)
+        self.assertEqual(len(layout.xyTree), 1 + 16 * 16)
+
+        # a structure placed in every orientation
+        cell = gdsMill.VlsiLayout(units=GDS["unit"])
+        gdsMill.Gds2reader(cell).loadFromFile(OPTS.openram_tech + "gds_lib/cell_6t.gds")
+        top = gdsMill.VlsiLayout(name="top", units=GDS["unit"])
+        orientations = [(None, None), ("R90", None), ("R180", None), ("R270", None),
+                        ("MX", None), ("MY", None), ("XY", None), ("MX", 90.0)]
+        for (i, (mirror, rotate)) in enumerate(orientations):
+            top.addInstance(cell, offsetInMicrons=(5.0 * i, 1.5 * i), mirror=mirror, rotate=rotate)
+        top.initialize()
+        self.assertEqual(top.measureBoundary("top"), self.flat_boundary(top))
+
+        # the boxes are measured again after the layout changes
+        top.addBox(layerNumber=1, offsetInMicrons=(-100.0, -100.0), width=1.0, height=1.0)
+        top.populateCoordinateMap()
+        self.assertEqual(top.measureBoundary("top")[0], [-100.0, -100.0])
+        self.assertEqual(top.measureBoundary("top"), self.flat_boundary(top))
+
+        os.remove(tempgds)
+        globals.end_openram()
+
+    def flat_boundary(self, layout):
+        """ The boundary of every rectangle in the xyTree """
+        cellBoundary = [None, None, None, None]
+        for TreeUnit in layout.xyTree:
+            cellBoundary = layout.measureSizeInStructure(TreeUnit, cellBoundary)
+        return [[layout.units[0] * cellBoundary[0], layout.units[0] * cellBoundary[1]],
+                [layout.units[0] * cellBoundary[2], layout.units[0] * cellBoundary[3]]]
+
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python2.7
+"""
+Check that a layout read into columnar structures has the same elements
+as one read into element lists, and that both write the same GDS.
+"""
+
+import unittest
+from testutils import header
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+import debug
+import filecmp
+
+OPTS = globals.OPTS
+
+#@unittest.skip("SKIPPING 01_gds_columns_test")
+
+
+class gds_columns_test(unittest.TestCase):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = False
+
+        import bitcell_array
+        import gdsMill
+        from tech import GDS
+
+        a = bitcell_array.bitcell_array(name="bitcell_array", cols=8, rows=8)
+        tempgds = OPTS.openram_temp + "temp.gds"
+        a.gds_write(tempgds)
+
+        OPTS.check_lvsdrc = True
+
+        layout = self.read(tempgds, columnar=False)
+        columnar_layout = self.read(tempgds, columnar=True)
+        self.assertEqual(layout.structures.keys(), columnar_layout.structures.keys())
+        for name in layout.structures:
+            structure = layout.structures[name]
+            columnar_structure = columnar_layout.structures[name]
+            self.assertFalse(structure.isColumnar())
+            self.assertTrue(columnar_structure.isColumnar())
+            for elements in ["boundaries", "paths", "texts"]:
+                self.assertEqual([e.__dict__ for e in getattr(structure, elements)],
+                                 [e.__dict__ for e in getattr(columnar_structure, elements)])
+            self.assertEqual(list(structure.boundaryCorners()), list(columnar_structure.boundaryCorners()))
+            # the elements read from a file fit in the arrays
+            self.assertEqual(columnar_structure.boundaries.extras, {})
+        self.assertEqual(layout.measureBoundary(a.name), columnar_layout.measureBoundary(a.name))
+
+        # both forms write the same file
+        listgds = OPTS.openram_temp + "list.gds"
+        columnargds = OPTS.openram_temp + "columnar.gds"
+        gdsMill.Gds2writer(layout).writeToFile(listgds)
+        gdsMill.Gds2writer(columnar_layout).writeToFile(columnargds)
+        self.assertTrue(filecmp.cmp(listgds, columnargds, shallow=False))
+
+        # added elements are stored in the arrays unless they have values that do not fit
+        new_layout = gdsMill.VlsiLayout(name="columns", units=GDS["unit"], columnar=True)
+        new_layout.addBox(layerNumber=1, offsetInMicrons=(0.5, 1.0), width=2.0, height=3.0)
+        unusual = gdsMill.GdsBoundary()
+        unusual.drawingLayer = 2
+        unusual.elementFlags = 1
+        unusual.dataType = 0
+        unusual.coordinates = [(0, 0), (10, 0), (10, 10), (0, 10), (0, 0)]
+        boundaries = new_layout.structures["columns"].boundaries
+        boundaries.append(unusual)
+        self.assertEqual(len(boundaries), 2)
+        self.assertEqual(boundaries.extras, {1: {"elementFlags": 1}})
+        self.assertEqual(boundaries[-1].__dict__, unusual.__dict__)
+        self.assertEqual(boundaries[0].coordinates[2], (round(2.5 / GDS["unit"][0]), round(4.0 / GDS["unit"][0])))
+        self.assertEqual([layer.layer for layer in boundaries.layers], [(1, None), (2, None)])
+        newgds = OPTS.openram_temp + "columns.gds"
+        gdsMill.Gds2writer(new_layout).writeToFile(newgds)
+        self.assertEqual([e.__dict__ for e in self.read(newgds, columnar=False).structures["columns"].boundaries],
+                         [e.__dict__ for e in boundaries])
+
+        os.remove(newgds)
+        os.remove(listgds)
+        os.remove(columnargds)
+        os.remove(tempgds)
+        globals.end_openram()
+
+    def read(self, gds_name, columnar):
+        import gdsMill
+        from tech import GDS
+        layout = gdsMill.VlsiLayout(units=GDS["unit"], columnar=columnar)
+        gdsMill.Gds2reader(layout).loadFromFile(gds_name)
+        return layout
+
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python2.7
+"""
+Check that the structure digests only depend on the geometry and that
+comparing two layouts finds the structures that changed.
+"""
+
+import unittest
+from testutils import header
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+import debug
+
+OPTS = globals.OPTS
+
+#@unittest.skip("SKIPPING 01_gds_digest_test")
+
+
+class gds_digest_test(unittest.TestCase):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = False
+
+        import bitcell_array
+        import gdsMill
+        from tech import GDS, layer
+
+        a = bitcell_array.bitcell_array(name="bitcell_array", cols=4, rows=4)
+        tempgds = OPTS.openram_temp + "temp.gds"
+        a.gds_write(tempgds)
+
+        OPTS.check_lvsdrc = True
+
+        layout = self.read(tempgds, columnar=False)
+        columnar_layout = self.read(tempgds, columnar=True)
+        self.assertEqual(layout.structureDigest(), columnar_layout.structureDigest())
+        self.assertEqual(gdsMill.compareLayouts(layout, columnar_layout), [])
+
+        # the dates and the order of the elements do not matter
+        for structure in columnar_layout.structures.values():
+            structure.createDate = (2000, 1, 1, 0, 0, 0)
+            structure.modDate = (2000, 1, 1, 0, 0, 0)
+            structure.srefs.reverse()
+        reordered = self.read(self.write(columnar_layout, "reordered.gds"), columnar=False)
+        for structure in reordered.structures.values():
+            structure.boundaries.reverse()
+            for boundary in structure.boundaries:
+                boundary.coordinates = boundary.coordinates[2:-1] + boundary.coordinates[:3]
+        self.assertEqual(gdsMill.compareFiles(tempgds, OPTS.openram_temp + "reordered.gds"), [])
+        self.assertEqual(layout.structureDigest(), reordered.structureDigest())
+
+        # a shape added to a cell changes the digests of the cell and the array
+        cell = layout.referencedStructureNames(a.name)[0]
+        array_digest = layout.structureDigest(a.name)
+        cell_digest = layout.structureDigest(cell)
+        local_digest = layout.structureDigest(a.name, local=True)
+        box = gdsMill.GdsBoundary()
+        box.drawingLayer = layer["metal1"]
+        box.dataType = 0
+        box.coordinates = [(0, 0), (10, 0), (10, 10), (0, 10), (0, 0)]
+        layout.structures[cell].boundaries.append(box)
+        layout.invalidateStructureDigest(cell)
+        self.assertNotEqual(layout.structureDigest(cell), cell_digest)
+        self.assertNotEqual(layout.structureDigest(a.name), array_digest)
+        self.assertEqual(layout.structureDigest(a.name, local=True), local_digest)
+        self.assertEqual(gdsMill.compareLayouts(layout, reordered), [(a.name, "references"), (cell, "changed")])
+
+        # a shape added through the layout changes the root
+        reordered.addBox(layerNumber=layer["metal1"], offsetInMicrons=(0, 0), width=1.0, height=1.0)
+        self.assertNotEqual(reordered.structureDigest(a.name, local=True), local_digest)
+        self.assertEqual(gdsMill.compareLayouts(layout, reordered)[0], (a.name, "changed"))
+
+        os.remove(OPTS.openram_temp + "reordered.gds")
+        os.remove(tempgds)
+        globals.end_openram()
+
+    def read(self, gds_name, columnar):
+        import gdsMill
+        from tech import GDS
+        layout = gdsMill.VlsiLayout(units=GDS["unit"], columnar=columnar)
+        gdsMill.Gds2reader(layout).loadFromFile(gds_name)
+        return layout
+
+    def write(self, layout, name):
+        import gdsMill
+        gds_name = OPTS.openram_temp + name
+        gdsMill.Gds2writer(layout).writeToFile(gds_name)
+        return gds_name
+
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python2.7
+"""
+Check that the rasterized area fill places a block at every site that keeps
+its spacing from the existing shapes, and that a target density only fills
+each window as much as it needs.
+"""
+
+import unittest
+from testutils import header
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+import debug
+import time
+
+OPTS = globals.OPTS
+
+#@unittest.skip("SKIPPING 01_gds_fill_test")
+
+
+class gds_fill_test(unittest.TestCase):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = False
+
+        import bitcell_array
+        import gdsMill
+        from tech import GDS, layer
+
+        a = bitcell_array.bitcell_array(name="bitcell_array", cols=4, rows=4)
+        tempgds = OPTS.openram_temp + "temp.gds"
+        a.gds_write(tempgds)
+
+        OPTS.check_lvsdrc = True
+
+        array_layout = gdsMill.VlsiLayout(units=GDS["unit"])
+        gdsMill.Gds2reader(array_layout).loadFromFile(tempgds)
+        (block, spacing) = (0.5, 0.3)
+        offset = (-5.0, -5.0)
+        size = (a.width + 10.0, a.height + 10.0)
+
+        # fill every site that fits
+        filled = self.fill_layout(array_layout, "filled")
+        start = time.time()
+        placed = filled.fillAreaDensity(layerToFill=layer["metal1"], offsetInMicrons=offset,
+                                        coverageWidth=size[0], coverageHeight=size[1],
+                                        minSpacing=spacing, blockSize=block)
+        debug.info(1, "placed {0} blocks in {1:.4f}s".format(placed, time.time() - start))
+        shapes = self.metal_shapes(array_layout, layer["metal1"])
+        expected = []
+        pitch = filled.userUnits(block + spacing)
+        for row in range(int(size[1] / (block + spacing))):
+            for column in range(int(size[0] / (block + spacing))):
+                x = filled.userUnits(offset[0]) + column * pitch
+                y = filled.userUnits(offset[1]) + row * pitch
+                site = [x - filled.userUnits(spacing), y - filled.userUnits(spacing),
+                        x + filled.userUnits(block + spacing), y + filled.userUnits(block + spacing)]
+                if not any(self.overlap(site, shape) for shape in shapes):
+                    expected.append((x, y))
+        blocks = self.fill_blocks(filled)
+        self.assertEqual(placed, len(expected))
+        self.assertEqual(sorted(blocks), sorted(expected))
+        # the blocks are array references of one fill structure
+        fill_names = [name for name in filled.structures if name.startswith("fill_")]
+        self.assertEqual(len(fill_names), 1)
+        self.assertTrue(len(filled.structures["filled"].arefs) < placed)
+
+        # an empty area is one array reference
+        empty = gdsMill.VlsiLayout(name="empty", units=GDS["unit"])
+        placed = empty.fillAreaDensity(layerToFill=layer["metal1"], coverageWidth=10.0, coverageHeight=10.0,
+                                       minSpacing=spacing, blockSize=block)
+        self.assertEqual(placed, 12 * 12)
+        self.assertEqual(len(empty.structures["empty"].arefs), 1)
+
+        # a target density fills each window up to the target
+        target = self.fill_layout(array_layout, "target")
+        placed = target.fillAreaDensity(layerToFill=layer["metal1"], offsetInMicrons=offset,
+                                        coverageWidth=size[0], coverageHeight=size[1],
+                                        minSpacing=spacing, blockSize=block,
+                                        targetDensity=0.3, windowSize=size[0] / 2)
+        self.assertTrue(0 < placed < len(expected))
+        for block_origin in self.fill_blocks(target):
+            self.assertTrue(block_origin in expected)
+        from gdsMill.areaFill import AreaFill
+        fill = AreaFill(target, layer["metal1"])
+        (density, cells) = fill.windowDensity((target.userUnits(offset[0]), target.userUnits(offset[1])),
+                                              target.userUnits(size[0]), target.userUnits(size[1]),
+                                              target.userUnits(size[0] / 2), target.userUnits(spacing))
+        debug.info(1, "window densities {0}".format(density.round(3).tolist()))
+        self.assertTrue((density > 0.25).all())
+
+        # the filled layout is written and read back
+        gdsMill.Gds2writer(filled).writeToFile(tempgds)
+        filled_read = gdsMill.VlsiLayout(units=GDS["unit"])
+        gdsMill.Gds2reader(filled_read).loadFromFile(tempgds)
+        self.assertEqual(sorted(self.fill_blocks(filled_read)), sorted(expected))
+
+        os.remove(tempgds)
+        globals.end_openram()
+
+    def fill_layout(self, layout, name):
+        import gdsMill
+        from tech import GDS
+        top = gdsMill.VlsiLayout(name=name, units=GDS["unit"])
+        top.addInstance(layout, offsetInMicrons=(0, 0))
+        return top
+
+    def metal_shapes(self, layout, metal):
+        """ Every flattened rectangle on a layer """
+        shapes = []
+        for TreeUnit in layout.xyTree:
+            for (shape_layer, shape) in layout.getShapesInStructure(TreeUnit):
+                if shape_layer == metal:
+                    shapes.append(shape)
+        return shapes
+
+    def fill_blocks(self, layout):
+        """ The origin of every fill block """
+        root = layout.structures[layout.rootStructureName]
+        return [tuple(sref.coordinates) for aref in root.arefs for sref in aref.expandSrefs()
+                if aref.aName.startswith("fill_")]
+
+    def overlap(self, a, b):
+        return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
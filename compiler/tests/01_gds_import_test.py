@@ -0,0 +1,76 @@
+#!/usr/bin/env python2.7
+"""
+Check that importing gdsMill and starting OpenRAM do not import the
+PDF drawing libraries, and report how long each takes.
+"""
+
+import unittest
+from testutils import header
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+import debug
+import subprocess
+
+OPTS = globals.OPTS
+
+#@unittest.skip("SKIPPING 01_gds_import_test")
+
+# time the statements in a new interpreter and list the drawing modules it imported
+timer = """
+import sys,time
+start = time.time()
+{0}
+elapsed = time.time() - start
+drawing = sorted(set([m.split(".")[0] for m in sys.modules if m.split(".")[0] in ("pyx", "mpmath")]))
+sys.stdout.write("\\n{{0}} {{1}}\\n".format(elapsed, ",".join(drawing)))
+{1}
+"""
+
+startup = """
+import globals
+(OPTS, args) = globals.parse_args()
+globals.init_openram("config_20_{0}")
+import calibre
+import sram
+"""
+
+
+class gds_import_test(unittest.TestCase):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+
+        (gdsmill_time, drawing) = self.time_statements("import gdsMill")
+        self.assertEqual(drawing, "")
+        # everything openram.py imports before it builds the SRAM
+        (startup_time, drawing) = self.time_statements(startup.format(OPTS.tech_name), "globals.end_openram()")
+        self.assertEqual(drawing, "")
+        debug.info(1, "import gdsMill {0:.3f}s, OpenRAM startup {1:.3f}s".format(gdsmill_time, startup_time))
+
+        # the PDF view still imports them when it is used
+        import gdsMill
+        pdf = gdsMill.pdfLayout(gdsMill.VlsiLayout(name="pdf"))
+        self.assertTrue("pyx" in sys.modules)
+
+        globals.end_openram()
+
+    def time_statements(self, statements, cleanup=""):
+        """ Return the seconds the statements took and the drawing modules they imported """
+        openram_home = os.path.abspath(os.environ.get("OPENRAM_HOME"))
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join([openram_home, openram_home + "/gdsMill"])
+        process = subprocess.Popen([sys.executable, "-c", timer.format(statements, cleanup), "-t", OPTS.tech_name],
+                                   stdout=subprocess.PIPE, env=env)
+        (output, errors) = process.communicate()
+        self.assertEqual(process.returncode, 0)
+        fields = [line for line in output.splitlines() if line != ""][-1].split(" ")
+        return (float(fields[0]), fields[1])
+
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
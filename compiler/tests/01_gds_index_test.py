@@ -0,0 +1,113 @@
+#!/usr/bin/env python2.7
+"""
+Check that reading the structures of an indexed GDS file on demand
+builds the same layout as reading every structure, and that the
+index is persisted and invalidated with the file.
+"""
+
+import unittest
+from testutils import header
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+import debug
+import shutil
+import time
+
+OPTS = globals.OPTS
+
+#@unittest.skip("SKIPPING 01_gds_index_test")
+
+
+class gds_index_test(unittest.TestCase):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = False
+
+        import bitcell_array
+        import gdsMill
+        from tech import GDS
+
+        a = bitcell_array.bitcell_array(name="bitcell_array", cols=8, rows=8)
+        tempgds = OPTS.openram_temp + "temp.gds"
+        a.gds_write(tempgds)
+
+        OPTS.check_lvsdrc = True
+
+        (layout, load_time) = self.read(tempgds, lazy=False)
+        (lazy_layout, lazy_time) = self.read(tempgds, lazy=True)
+        # loading reads no structure, and looking one up reads only that one
+        for name in lazy_layout.structures:
+            self.assertFalse(lazy_layout.structures.isLoaded(name))
+        lazy_layout.structures[a.cell.name]
+        for name in lazy_layout.structures:
+            self.assertEqual(lazy_layout.structures.isLoaded(name), name == a.cell.name)
+        self.assertEqual(layout.rootStructureName, lazy_layout.rootStructureName)
+        self.assertEqual(layout.layerNumbersInUse, lazy_layout.layerNumbersInUse)
+        self.assertEqual(layout.structures.keys(), lazy_layout.structures.keys())
+        self.assertEqual(len(layout.xyTree), len(lazy_layout.xyTree))
+        for name in layout.structures:
+            self.assertEqual([e.__dict__ for e in layout.structures[name].boundaries],
+                             [e.__dict__ for e in lazy_layout.structures[name].boundaries])
+            self.assertEqual([e.__dict__ for e in layout.structures[name].texts],
+                             [e.__dict__ for e in lazy_layout.structures[name].texts])
+
+        # the persisted index lets the next load skip the structures
+        self.assertEqual(gdsMill.loadStructureIndex(tempgds), None)
+        self.read(tempgds, lazy=True, persistIndex=True)
+        self.assertTrue(os.path.isfile(tempgds + ".index"))
+        self.assertNotEqual(gdsMill.loadStructureIndex(tempgds), None)
+        (indexed_layout, indexed_time) = self.read(tempgds, lazy=True, persistIndex=True)
+        self.assertEqual(len(layout.xyTree), len(indexed_layout.xyTree))
+        debug.info(1, "full read {0:.4f}s on demand {1:.4f}s persisted index {2:.4f}s".format(load_time,
+                                                                                              lazy_time,
+                                                                                              indexed_time))
+        # and is not used once the file changes, nor are the offsets
+        # of a layout that was loaded before
+        (stale_layout, stale_time) = self.read(tempgds, lazy=True)
+        stat = os.stat(tempgds)
+        os.utime(tempgds, (stat.st_atime, stat.st_mtime + 10))
+        self.assertEqual(gdsMill.loadStructureIndex(tempgds), None)
+        self.assertRaises(IOError, lambda: stale_layout.structures[a.cell.name])
+
+        # finding a structure or a label only reads that structure
+        find_layout = gdsMill.VlsiLayout(units=GDS["unit"])
+        reader = gdsMill.Gds2reader(find_layout)
+        found = reader.findStruct(tempgds, a.cell.name)
+        self.assertEqual(found[0], 0)
+        self.assertEqual(len(found[1]), len(layout.structures[a.cell.name].boundaries))
+        self.assertEqual(find_layout.structures.keys(), [a.cell.name])
+        self.assertEqual(reader.findStruct(tempgds, "no_such_structure"), "\x04\x00")
+
+        cell_gds = OPTS.openram_tech + "gds_lib/cell_6t.gds"
+        tempcell = OPTS.openram_temp + "cell_6t.gds"
+        shutil.copy(cell_gds, tempcell)
+        find_layout = gdsMill.VlsiLayout(units=GDS["unit"])
+        found = gdsMill.Gds2reader(find_layout).findLabel(tempcell, "gnd")
+        self.assertEqual(found[0], 0)
+        self.assertTrue(len(found[1]) > 1)
+        for text in found[1][1:]:
+            self.assertEqual(text.textString[0:3], "gnd")
+
+        os.remove(tempcell)
+        os.remove(tempgds + ".index")
+        os.remove(tempgds)
+        globals.end_openram()
+
+    def read(self, gds_name, lazy, persistIndex=False):
+        import gdsMill
+        from tech import GDS
+        layout = gdsMill.VlsiLayout(units=GDS["unit"])
+        reader = gdsMill.Gds2reader(layout)
+        start = time.time()
+        reader.loadFromFile(gds_name, lazy=lazy, persistIndex=persistIndex)
+        return (layout, time.time() - start)
+
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python2.7
+"""
+Check that the layout preview draws the whole layout once per cell
+orientation and leaves out the shapes that are smaller than a pixel.
+"""
+
+import unittest
+from testutils import header
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+import debug
+import struct
+import time
+
+OPTS = globals.OPTS
+
+#@unittest.skip("SKIPPING 01_gds_preview_test")
+
+
+class gds_preview_test(unittest.TestCase):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = False
+
+        import bitcell_array
+        from gdsMill.layoutPreview import LayoutPreview
+
+        a = bitcell_array.bitcell_array(name="bitcell_array", cols=16, rows=16)
+        OPTS.check_lvsdrc = True
+
+        tempgds = OPTS.openram_temp + "temp.gds"
+        a.gds_write(tempgds)
+        temppng = OPTS.openram_temp + "temp.png"
+        start = time.time()
+        preview = a.preview_write(temppng, width=512)
+        debug.info(1, "{0} preview in {1:.3f}s".format(a.name, time.time() - start))
+
+        # the picture covers the layout, give or take the pixels each instance is rounded to,
+        # and each cell is only drawn once per orientation
+        pixels = preview.render()
+        (rows, columns) = pixels.shape
+        box = [value * preview.scale for value in a.gds.structureBoundary(a.name)]
+        (painted_rows, painted_columns) = pixels.nonzero()
+        self.assertEqual((painted_rows.min(), painted_columns.min()), (0, 0))
+        self.assertTrue(abs(painted_columns.max() + 1 - (box[2] - box[0])) <= 2)
+        self.assertTrue(abs(painted_rows.max() + 1 - (box[3] - box[1])) <= 2)
+        self.assertTrue(len(preview.tiles) < 16 * 16)
+
+        f = open(temppng, "rb")
+        data = f.read()
+        f.close()
+        self.assertEqual(data[0:8], "\x89PNG\r\n\x1a\n")
+        self.assertEqual(struct.unpack(">II", data[16:24]), (columns, rows))
+
+        # shapes under a pixel are not drawn in a small picture
+        small = LayoutPreview(a.gds, width=16)
+        self.assertTrue(small.culledShapes == 0)
+        small.render()
+        self.assertTrue(small.culledShapes > 0)
+        self.assertTrue(abs(small.render().shape[1] - 16) <= 2)
+
+        tempsvg = OPTS.openram_temp + "temp.svg"
+        small.writeToFile(tempsvg)
+        f = open(tempsvg, "r")
+        self.assertTrue("data:image/png;base64," in f.read())
+        f.close()
+
+        os.remove(tempsvg)
+        os.remove(temppng)
+        os.remove(tempgds)
+        globals.end_openram()
+
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
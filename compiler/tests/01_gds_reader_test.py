@@ -0,0 +1,89 @@
+#!/usr/bin/env python2.7
+"""
+Check that the buffered GDS reader builds the same layout as the
+record-by-record reader on the library cells and a generated array.
+"""
+
+import unittest
+from testutils import header
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+import debug
+import re
+import time
+
+OPTS = globals.OPTS
+
+#@unittest.skip("SKIPPING 01_gds_reader_test")
+
+
+class gds_reader_test(unittest.TestCase):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = False
+
+        import bitcell_array
+
+        gds_dir = OPTS.openram_tech + "/gds_lib"
+        nametest = re.compile("\.gds$", re.IGNORECASE)
+        gds_files = ["{0}/{1}".format(gds_dir, f) for f in filter(nametest.search, os.listdir(gds_dir))]
+
+        a = bitcell_array.bitcell_array(name="bitcell_array", cols=8, rows=8)
+        tempgds = OPTS.openram_temp + "temp.gds"
+        a.gds_write(tempgds)
+        gds_files.append(tempgds)
+
+        OPTS.check_lvsdrc = True
+
+        for gds_name in gds_files:
+            (old_layout, old_time) = self.read(gds_name, buffered=False)
+            (new_layout, new_time) = self.read(gds_name, buffered=True)
+            debug.info(1, "{0}: record reader {1:.4f}s buffered reader {2:.4f}s".format(os.path.basename(gds_name),
+                                                                                       old_time,
+                                                                                       new_time))
+            self.compare(old_layout, new_layout)
+
+        os.remove(tempgds)
+        globals.end_openram()
+
+    def read(self, gds_name, buffered):
+        import gdsMill
+        from tech import GDS
+        layout = gdsMill.VlsiLayout(units=GDS["unit"])
+        reader = gdsMill.Gds2reader(layout, buffered=buffered)
+        start = time.time()
+        reader.loadFromFile(gds_name)
+        return (layout, time.time() - start)
+
+    def compare(self, old_layout, new_layout):
+        # the database units in the header info are not decoded, so only compare the user units
+        for key in old_layout.info:
+            if key == "units":
+                self.assertEqual(old_layout.info[key][0], new_layout.info[key][0])
+            else:
+                self.assertEqual(old_layout.info[key], new_layout.info[key])
+        self.assertEqual(old_layout.units, new_layout.units)
+        self.assertEqual(old_layout.rootStructureName, new_layout.rootStructureName)
+        self.assertEqual(old_layout.layerNumbersInUse, new_layout.layerNumbersInUse)
+        self.assertEqual(sorted(old_layout.structures.keys()),
+                         sorted(new_layout.structures.keys()))
+        for name in old_layout.structures:
+            old_struct = old_layout.structures[name]
+            new_struct = new_layout.structures[name]
+            self.assertEqual(old_struct.name, new_struct.name)
+            self.assertEqual(old_struct.createDate, new_struct.createDate)
+            self.assertEqual(old_struct.modDate, new_struct.modDate)
+            for elements in ["boundaries", "paths", "srefs", "arefs", "texts", "nodes", "boxes"]:
+                old_elements = [e.__dict__ for e in getattr(old_struct, elements)]
+                new_elements = [e.__dict__ for e in getattr(new_struct, elements)]
+                self.assertEqual(old_elements, new_elements)
+
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python2.7
+"""
+Check that the spatial index of the flattened shapes finds the same
+pin shapes as scanning every structure in the layout.
+"""
+
+import unittest
+from testutils import header
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+import debug
+import time
+
+OPTS = globals.OPTS
+
+#@unittest.skip("SKIPPING 01_gds_shape_index_test")
+
+
+class gds_shape_index_test(unittest.TestCase):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = False
+
+        import bitcell_array
+        import gdsMill
+        from tech import GDS
+
+        a = bitcell_array.bitcell_array(name="bitcell_array", cols=8, rows=8)
+        tempgds = OPTS.openram_temp + "temp.gds"
+        a.gds_write(tempgds)
+
+        OPTS.check_lvsdrc = True
+
+        layout = gdsMill.VlsiLayout(units=GDS["unit"])
+        reader = gdsMill.Gds2reader(layout)
+        reader.loadFromFile(tempgds)
+        # the index is only built by the first query
+        self.assertEqual(layout.shapeIndex, None)
+
+        # query at the corners and center of some of the shapes
+        shapes = []
+        for tree_unit in layout.xyTree:
+            shapes += layout.getShapesInStructure(tree_unit)
+        queries = []
+        for (layer, shape) in shapes[::len(shapes) // 100]:
+            queries.append(([shape[0], shape[1]], layer))
+            queries.append(([shape[2], shape[3]], layer))
+            queries.append(([(shape[0] + shape[2]) // 2, (shape[1] + shape[3]) // 2], layer))
+
+        start = time.time()
+        scanned = [self.scan(layout, shapes, coordinate, layer) for (coordinate, layer) in queries]
+        scan_time = time.time() - start
+        start = time.time()
+        indexed = [layout.getAllPinShapesInStructureList(coordinate, layer) for (coordinate, layer) in queries]
+        index_time = time.time() - start
+        debug.info(1, "{0} point queries: scan {1:.4f}s index {2:.4f}s".format(len(queries), scan_time, index_time))
+        self.assertEqual(scanned, indexed)
+
+        # rectangle queries find every shape that overlaps
+        for (layer, shape) in shapes[::len(shapes) // 100]:
+            window = [shape[0] - 100, shape[1] - 100, shape[2] + 100, shape[3] + 100]
+            expected = [s for (l, s) in shapes if l == layer and self.overlaps(s, window)]
+            self.assertEqual(sorted(expected), sorted(layout.getAllShapesInRectangle(window, layer)))
+
+        # adding geometry drops the index
+        (layer, shape) = shapes[0]
+        corner = [shape[2] * layout.units[0] + 10.0, shape[3] * layout.units[0] + 10.0]
+        layout.addBox(layerNumber=layer, offsetInMicrons=corner, width=1.0, height=1.0)
+        self.assertEqual(layout.shapeIndex, None)
+        layout.prepareForWrite()
+        found = layout.getAllPinShapesByLocLayer([corner[0] + 0.5, corner[1] + 0.5], layer)[2]
+        self.assertEqual(len(found), 1)
+
+        os.remove(tempgds)
+        globals.end_openram()
+
+    def scan(self, layout, shapes, coordinate, layer):
+        """ Find the shapes by testing every flattened shape. """
+        return [s for (l, s) in shapes if l == layer and layout.labelInRectangle(coordinate, s)]
+
+    def overlaps(self, a, b):
+        return a[0] <= b[2] and a[2] >= b[0] and a[1] <= b[3] and a[3] >= b[1]
+
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
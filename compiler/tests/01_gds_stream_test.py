@@ -0,0 +1,88 @@
+#!/usr/bin/env python2.7
+"""
+Check that streaming the records and elements of a GDS file gives the
+same elements as loading it, and that streamed elements can be written back.
+"""
+
+import unittest
+from testutils import header
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+import debug
+import filecmp
+
+OPTS = globals.OPTS
+
+#@unittest.skip("SKIPPING 01_gds_stream_test")
+
+
+class gds_stream_test(unittest.TestCase):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = False
+
+        import bitcell_array
+        import gdsMill
+        from tech import GDS, layer
+
+        a = bitcell_array.bitcell_array(name="bitcell_array", cols=8, rows=8)
+        tempgds = OPTS.openram_temp + "temp.gds"
+        a.gds_write(tempgds)
+
+        OPTS.check_lvsdrc = True
+
+        loaded = gdsMill.VlsiLayout(units=GDS["unit"])
+        gdsMill.Gds2reader(loaded).loadFromFile(tempgds)
+
+        # the records cover the whole file
+        reader = gdsMill.Gds2reader(gdsMill.VlsiLayout(units=GDS["unit"]))
+        records = list(reader.iterRecords(tempgds))
+        self.assertEqual(records[0][0], 0x0002)
+        self.assertEqual(records[-1][0], 0x0400)
+        self.assertEqual(sum(4 + len(data) for (recordType, data) in records), os.path.getsize(tempgds))
+
+        # the streamed elements are the loaded ones
+        streamed = {}
+        for (name, element) in reader.iterElements(tempgds):
+            streamed.setdefault(name, []).append(element.__dict__)
+        self.assertEqual(sorted(streamed.keys()), sorted(loaded.structures.keys()))
+        for name in loaded.structures:
+            structure = loaded.structures[name]
+            elements = []
+            for kind in ["boundaries", "paths", "srefs", "arefs", "texts", "nodes", "boxes"]:
+                elements += [e.__dict__ for e in getattr(structure, kind)]
+            self.assertEqual(sorted(streamed[name]), sorted(elements))
+
+        # filters keep the named structures and the layer, and every reference
+        metal1 = layer["metal1"]
+        filtered = list(reader.iterElements(tempgds, structureFilter=[a.name], layerFilter=[metal1]))
+        self.assertTrue(len(filtered) > 0)
+        for (name, element) in filtered:
+            self.assertEqual(name, a.name)
+            self.assertTrue(isinstance(element, (gdsMill.GdsSref, gdsMill.GdsAref)) or element.drawingLayer == metal1)
+        self.assertEqual(len([e for (name, e) in filtered if isinstance(e, gdsMill.GdsSref)]),
+                         len(loaded.structures[a.name].srefs))
+
+        # piping the structures into the writer makes the same library
+        streamgds = OPTS.openram_temp + "stream.gds"
+        for buffered in [True, False]:
+            writer = gdsMill.Gds2writer(reader.layoutObject, buffered=buffered)
+            writer.writeStream(streamgds, reader.iterStructures(tempgds))
+            self.assertEqual(sorted(reader.iterRecords(streamgds)), sorted(records))
+            rewritten = gdsMill.VlsiLayout(units=GDS["unit"])
+            gdsMill.Gds2reader(rewritten).loadFromFile(streamgds)
+            self.assertEqual(rewritten.xyTree, loaded.xyTree)
+
+        os.remove(streamgds)
+        os.remove(tempgds)
+        globals.end_openram()
+
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
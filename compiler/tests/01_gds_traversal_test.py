@@ -0,0 +1,143 @@
+#!/usr/bin/env python2.7
+"""
+Check that the integer transforms used to traverse a GDS hierarchy
+place every structure the same as the mpmath matrix transforms they
+replaced, for every reference orientation and an arbitrary angle.
+"""
+
+import unittest
+from testutils import header
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+import debug
+import math
+import time
+
+OPTS = globals.OPTS
+
+#@unittest.skip("SKIPPING 01_gds_traversal_test")
+
+
+class gds_traversal_test(unittest.TestCase):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = False
+
+        import bitcell_array
+        import gdsMill
+        from tech import GDS
+
+        a = bitcell_array.bitcell_array(name="bitcell_array", cols=16, rows=16)
+        tempgds = OPTS.openram_temp + "temp.gds"
+        a.gds_write(tempgds)
+
+        OPTS.check_lvsdrc = True
+
+        # a generated array of mirrored rows
+        layout = gdsMill.VlsiLayout(units=GDS["unit"])
+        reader = gdsMill.Gds2reader(layout)
+        start = time.time()
+        reader.loadFromFile(tempgds)
+        new_time = time.time() - start
+        start = time.time()
+        reference = self.reference_tree(layout)
+        old_time = time.time() - start
+        debug.info(1, "{0} cells: mpmath traversal {1:.4f}s integer traversal {2:.4f}s".format(len(layout.xyTree),
+                                                                                                old_time,
+                                                                                                new_time))
+        self.compare(layout.xyTree, reference)
+        # the Manhattan transforms are kept exact
+        for (name, origin, uVector, vVector) in layout.xyTree:
+            for value in origin + uVector + vVector:
+                self.assertTrue(isinstance(value, (int, long)))
+
+        # every orientation at two levels of hierarchy
+        cell = gdsMill.VlsiLayout(units=GDS["unit"])
+        gdsMill.Gds2reader(cell).loadFromFile(OPTS.openram_tech + "gds_lib/cell_6t.gds")
+        middle = gdsMill.VlsiLayout(name="middle", units=GDS["unit"])
+        top = gdsMill.VlsiLayout(name="top", units=GDS["unit"])
+        orientations = [(None, None), ("R90", None), ("R180", None), ("R270", None),
+                        ("MX", None), ("MY", None), ("XY", None), ("MX", 90.0), (None, 45.0)]
+        for (i, (mirror, rotate)) in enumerate(orientations):
+            middle.addInstance(cell, offsetInMicrons=(3.0 * i, 1.5), mirror=mirror, rotate=rotate)
+        for (i, (mirror, rotate)) in enumerate(orientations):
+            top.addInstance(middle, offsetInMicrons=(0.5, 40.0 * i), mirror=mirror, rotate=rotate)
+        top.initialize()
+        self.assertEqual(len(top.xyTree), 1 + len(orientations) * (1 + len(orientations)))
+        self.compare(top.xyTree, self.reference_tree(top))
+
+        # the bounding box is unchanged by the new rectangle transform
+        boundary = top.measureBoundary("top")
+        reference_boundary = self.reference_boundary(top)
+        for (point, reference_point) in zip(boundary, reference_boundary):
+            for (value, reference_value) in zip(point, reference_point):
+                self.assertAlmostEqual(float(value), float(reference_value), places=6)
+
+        os.remove(tempgds)
+        globals.end_openram()
+
+    def reference_tree(self, layout):
+        """ Compute the coordinate space of every structure with mpmath matrices. """
+        import mpmath
+        tree = []
+
+        def add_to_tree(name, transform_path):
+            origin = mpmath.matrix([0.0, 0.0, 1.0])
+            u = mpmath.matrix([1.0, 0.0, 0.0])
+            v = mpmath.matrix([0.0, 1.0, 0.0])
+            for (rotate, scale, translate) in reversed(transform_path):
+                origin = translate * (scale * (rotate * origin))
+                u = scale * (rotate * u)
+                v = scale * (rotate * v)
+            tree.append((name, origin, u, v))
+
+        def traverse(name, transform_path, sref=None):
+            angle = 0
+            (mirror, coordinates) = (False, (0, 0))
+            if sref != None:
+                if sref.rotateAngle not in [None, ""]:
+                    angle = math.radians(float(sref.rotateAngle))
+                (mirror, coordinates) = (sref.transFlags[0], sref.coordinates)
+            rotate = mpmath.matrix([[math.cos(angle), -math.sin(angle), 0.0],
+                                    [math.sin(angle), math.cos(angle), 0.0],
+                                    [0.0, 0.0, 1.0]])
+            scale = mpmath.matrix([[1.0, 0.0, 0.0], [0.0, -1.0 if mirror else 1.0, 0.0], [0.0, 0.0, 1.0]])
+            translate = mpmath.matrix([[1.0, 0.0, float(coordinates[0])],
+                                       [0.0, 1.0, float(coordinates[1])],
+                                       [0.0, 0.0, 1.0]])
+            transform_path.append((rotate, scale, translate))
+            add_to_tree(name, transform_path)
+            for child in layout.structures[name].allSrefs():
+                traverse(child.sName, transform_path, child)
+            transform_path.pop()
+
+        traverse(layout.rootStructureName, [])
+        return tree
+
+    def reference_boundary(self, layout):
+        """ Measure the boundary of a structure from the mpmath coordinate spaces. """
+        points = []
+        for (structure, origin, u, v) in self.reference_tree(layout):
+            for boundary in layout.structures[structure].boundaries:
+                for (x, y) in [boundary.coordinates[0], boundary.coordinates[2]]:
+                    points.append((x * u[0] + y * u[1] + origin[0], y * v[1] + x * v[0] + origin[1]))
+        return [[layout.units[0] * min(p[0] for p in points), layout.units[0] * min(p[1] for p in points)],
+                [layout.units[0] * max(p[0] for p in points), layout.units[0] * max(p[1] for p in points)]]
+
+    def compare(self, tree, reference):
+        self.assertEqual(len(tree), len(reference))
+        for (entry, reference_entry) in zip(tree, reference):
+            self.assertEqual(entry[0], reference_entry[0])
+            for (vector, reference_vector) in zip(entry[1:], reference_entry[1:]):
+                for (value, reference_value) in zip(vector, reference_vector):
+                    self.assertAlmostEqual(float(value), float(reference_value), places=6)
+
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python2.7
+"""
+Check that the buffered GDS writer writes the same bytes as the
+record-by-record writer on a gate and a generated array.
+"""
+
+import unittest
+from testutils import header
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+import debug
+import filecmp
+import time
+
+OPTS = globals.OPTS
+
+#@unittest.skip("SKIPPING 01_gds_writer_test")
+
+
+class gds_writer_test(unittest.TestCase):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = False
+
+        import bitcell_array
+        import pinv
+
+        designs = [pinv.pinv(nmos_width=2, beta=3),
+                   bitcell_array.bitcell_array(name="bitcell_array", cols=16, rows=16)]
+
+        OPTS.check_lvsdrc = True
+
+        oldgds = OPTS.openram_temp + "temp_record.gds"
+        newgds = OPTS.openram_temp + "temp_buffered.gds"
+        for d in designs:
+            # build the layout the same way as gds_write
+            d.clear_visited()
+            d.gds_write_file(d.gds)
+            old_time = self.write(d.gds, oldgds, buffered=False)
+            new_time = self.write(d.gds, newgds, buffered=True)
+            debug.info(1, "{0}: record writer {1:.4f}s buffered writer {2:.4f}s".format(d.name,
+                                                                                       old_time,
+                                                                                       new_time))
+            self.assertTrue(filecmp.cmp(oldgds, newgds, shallow=False))
+
+        os.remove(oldgds)
+        os.remove(newgds)
+        globals.end_openram()
+
+    def write(self, layout, gds_name, buffered):
+        import gdsMill
+        writer = gdsMill.Gds2writer(layout, buffered=buffered)
+        start = time.time()
+        writer.writeToFile(gds_name)
+        return time.time() - start
+
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python2.7
+"""
+Check that the library cell GDS and spice files are parsed once and
+shared, and that a changed file is parsed again.
+"""
+
+import unittest
+from testutils import header
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+import debug
+import shutil
+
+OPTS = globals.OPTS
+
+#@unittest.skip("SKIPPING 02_library_cache_test")
+
+
+class library_cache_test(unittest.TestCase):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = False
+
+        import ms_flop
+        import hierarchy_layout
+        import hierarchy_spice
+        import library_cache
+
+        gds_misses = hierarchy_layout.gds_cache.misses
+        sp_misses = hierarchy_spice.sp_cache.misses
+
+        # the same library cell shares the parsed files
+        a = ms_flop.ms_flop("ms_flop")
+        b = ms_flop.ms_flop("ms_flop")
+        self.assertTrue(a.gds is b.gds)
+        self.assertTrue(a.spice is b.spice)
+        self.assertEqual(a.pins, b.pins)
+        # but each module owns its pin list
+        self.assertFalse(a.pins is b.pins)
+        self.assertTrue(hierarchy_layout.gds_cache.misses <= gds_misses + 1)
+        self.assertTrue(hierarchy_spice.sp_cache.misses <= sp_misses + 1)
+        self.assertTrue(hierarchy_layout.gds_cache.hits >= 1)
+        self.assertTrue(hierarchy_spice.sp_cache.hits >= 1)
+        debug.info(1, str(hierarchy_layout.gds_cache))
+        debug.info(1, str(hierarchy_spice.sp_cache))
+
+        # a changed file is parsed again
+        tempspice = OPTS.openram_temp + "ms_flop.sp"
+        shutil.copy(a.sp_file, tempspice)
+        cache = library_cache.library_cache("test", hierarchy_spice.read_sp_library)
+        (spice, pins) = cache.get(tempspice)
+        self.assertEqual(cache.get(tempspice)[0], spice)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(list(pins), a.pins)
+        f = open(tempspice, "a")
+        f.write("* changed\n")
+        f.close()
+        self.assertEqual(cache.get(tempspice)[0][-1], "* changed")
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+        OPTS.check_lvsdrc = True
+        os.remove(tempspice)
+        globals.end_openram()
+
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python2.7
+"""
+Check that the parsed library cells and their measurements are saved
+between runs and that a changed library file is parsed again.
+"""
+
+import unittest
+from testutils import header
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+import debug
+import shutil
+
+OPTS = globals.OPTS
+
+#@unittest.skip("SKIPPING 02_library_disk_cache_test")
+
+
+class library_disk_cache_test(unittest.TestCase):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = False
+        cache_path = OPTS.cache_path
+        OPTS.cache_path = OPTS.openram_temp + "cache"
+
+        import ms_flop
+        import hierarchy_layout
+        import utils
+        from tech import GDS, layer
+
+        # the parsed layout is saved by the first read and loaded by the next
+        gds_file = OPTS.openram_tech + "gds_lib/ms_flop.gds"
+        misses = hierarchy_layout.gds_disk_cache.misses
+        hits = hierarchy_layout.gds_disk_cache.hits
+        parsed = hierarchy_layout.read_gds_library(gds_file)
+        loaded = hierarchy_layout.read_gds_library(gds_file)
+        self.assertEqual(hierarchy_layout.gds_disk_cache.misses, misses + 1)
+        self.assertEqual(hierarchy_layout.gds_disk_cache.hits, hits + 1)
+        self.assertFalse(parsed is loaded)
+        self.assertEqual(parsed.rootStructureName, loaded.rootStructureName)
+        self.assertEqual(parsed.xyTree, loaded.xyTree)
+        self.assertEqual(sorted(parsed.structures.keys()), sorted(loaded.structures.keys()))
+        for name in parsed.structures:
+            for elements in ["boundaries", "paths", "srefs", "texts"]:
+                self.assertEqual([e.__dict__ for e in getattr(parsed.structures[name], elements)],
+                                 [e.__dict__ for e in getattr(loaded.structures[name], elements)])
+
+        # the measured cell is saved too
+        pins = ["din", "dout", "dout_bar", "clk", "vdd", "gnd"]
+        chars = utils.auto_measure_libcell(pins, "ms_flop", GDS["unit"], layer["boundary"])
+        hits = utils.chars_cache.hits
+        self.assertEqual(utils.auto_measure_libcell(pins, "ms_flop", GDS["unit"], layer["boundary"]), chars)
+        self.assertEqual(utils.chars_cache.hits, hits + 1)
+
+        # a library file with different contents does not use the saved layout
+        tempgds = OPTS.openram_temp + "ms_flop.gds"
+        shutil.copy(gds_file, tempgds)
+        self.assertEqual(hierarchy_layout.gds_disk_cache.key(tempgds, GDS["unit"]),
+                         hierarchy_layout.gds_disk_cache.key(gds_file, GDS["unit"]))
+        f = open(tempgds, "ab")
+        f.write("\x00\x00")
+        f.close()
+        self.assertNotEqual(hierarchy_layout.gds_disk_cache.key(tempgds, GDS["unit"]),
+                            hierarchy_layout.gds_disk_cache.key(gds_file, GDS["unit"]))
+        misses = hierarchy_layout.gds_disk_cache.misses
+        hierarchy_layout.read_gds_library(tempgds)
+        self.assertEqual(hierarchy_layout.gds_disk_cache.misses, misses + 1)
+        debug.info(1, str(hierarchy_layout.gds_disk_cache))
+        debug.info(1, str(utils.chars_cache))
+
+        OPTS.cache_path = cache_path
+        OPTS.check_lvsdrc = True
+        globals.end_openram()
+
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python2.7
+"""
+Check that a module made by the factory is saved between runs, that a
+later run loads the same module instead of making it, and that other
+parameters or options make a new one. A hierarchical bitcell array is
+saved as well, and a result that cannot be pickled is skipped.
+"""
+
+import unittest
+from testutils import header
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+import debug
+
+OPTS = globals.OPTS
+
+#@unittest.skip("SKIPPING 02_module_disk_cache_test")
+
+
+class module_disk_cache_test(unittest.TestCase):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = False
+        cache_path = OPTS.cache_path
+        OPTS.cache_path = OPTS.openram_temp + "cache"
+
+        import design
+        import precharge_array
+        import bitcell_array
+        from tech import drc
+
+        factory = design.factory
+        made = factory.get(precharge_array.precharge_array, name="precharge_array",
+                           columns=8, ptx_width=drc["minwidth_tx"])
+        self.assertEqual(factory.reused, 0)
+        made_sp = "".join(made.sp_chunks())
+        made_gds = self.structures(made)
+
+        # a new run loads the module rather than making it
+        self.new_run()
+        loaded = factory.get(precharge_array.precharge_array, name="precharge_array",
+                             columns=8, ptx_width=drc["minwidth_tx"])
+        self.assertEqual(factory.reused, 1)
+        self.assertFalse(loaded is made)
+        self.assertTrue("precharge_array" in design.design.name_map)
+        self.assertEqual([loaded.width, loaded.height], [made.width, made.height])
+        self.assertEqual(loaded.pins, made.pins)
+        self.assertEqual(loaded.BL_positions, made.BL_positions)
+        self.assertEqual("".join(loaded.sp_chunks()), made_sp)
+        self.assertEqual(self.structures(loaded), made_gds)
+
+        # but not with other parameters or options
+        self.new_run()
+        factory.get(precharge_array.precharge_array, name="precharge_array",
+                    columns=16, ptx_width=drc["minwidth_tx"])
+        self.new_run()
+        OPTS.trim_noncritical = True
+        factory.get(precharge_array.precharge_array, name="precharge_array",
+                    columns=8, ptx_width=drc["minwidth_tx"])
+        OPTS.trim_noncritical = False
+        self.assertEqual(factory.reused, 0)
+
+        # a hierarchical bitcell array is kept as well, with its rows
+        self.new_run()
+        made = factory.get(bitcell_array.bitcell_array, name="bitcell_array",
+                           cols=8, rows=8, hierarchical=True)
+        made_sp = "".join(made.sp_chunks())
+        made_gds = self.structures(made)
+        self.new_run()
+        loaded = factory.get(bitcell_array.bitcell_array, name="bitcell_array",
+                             cols=8, rows=8, hierarchical=True)
+        self.assertEqual(factory.reused, 1)
+        self.assertTrue(loaded.row.cell is loaded.cell)
+        self.assertEqual("".join(loaded.sp_chunks()), made_sp)
+        self.assertEqual(self.structures(loaded), made_gds)
+
+        # a result that cannot be pickled is skipped
+        factory.disk_cache.store("unpicklable", lambda: None)
+        self.assertEqual(factory.disk_cache.load("unpicklable"), None)
+        self.assertEqual([f for f in os.listdir(OPTS.cache_path) if "unpicklable" in f], [])
+        debug.info(1, str(factory))
+        debug.info(1, str(factory.disk_cache))
+
+        OPTS.cache_path = cache_path
+        OPTS.check_lvsdrc = True
+        globals.end_openram()
+
+    def new_run(self):
+        """ Forget the modules made so far, as a new process would """
+        import design
+        design.design.name_map = set()
+        design.factory.clear()
+        design.factory.reused = 0
+
+    def structures(self, mod):
+        """ The sorted geometry of each GDS structure written for a module """
+        from gdsMill import gdsDigest
+        mod.clear_visited()
+        mod.gds_write_file(mod.gds)
+        return sorted((name, gdsDigest.structureKeys(structure))
+                      for (name, structure) in mod.gds.structures.items())
+
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
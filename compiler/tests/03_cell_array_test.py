@@ -0,0 +1,88 @@
+#!/usr/bin/env python2.7
+"""
+Check that a row of cells added at once is placed, mirrored, labeled
+and connected from its templates, as separate instances or as one
+instance array.
+"""
+
+import unittest
+from testutils import header
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+import debug
+import time
+
+OPTS = globals.OPTS
+
+#@unittest.skip("SKIPPING 03_cell_array_test")
+
+
+class cell_array_test(unittest.TestCase):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = False
+
+        import bitcell
+        import design
+        from vector import vector
+
+        def rounded(offsets):
+            """ Compare to the grid, the instances snap their offsets """
+            return [[round(offset.x, 3), round(offset.y, 3)] for offset in offsets]
+
+        cell = bitcell.bitcell()
+        (w, h) = (cell.width, cell.height)
+        BL = vector(cell.chars["BL"][0], 0)
+
+        # every other cell is mirrored and moved to cover its own column
+        row = design.design("cell_array_test_row")
+        (offsets, positions) = row.add_cell_array(name="cell{0}",
+                                                  mod=cell,
+                                                  count=4,
+                                                  pitch=[w, 0],
+                                                  conns=["bl[{1}]", "br[{1}]", "wl[{0}]", "vdd", "gnd"],
+                                                  mirrors=["R0", "MY"],
+                                                  indices=[range(4), range(0, 8, 2)],
+                                                  labels=[("bl[{1}]", "metal2", BL)])
+        self.assertEqual([inst.name for inst in row.insts], ["cell0", "cell1", "cell2", "cell3"])
+        self.assertEqual([inst.mirror for inst in row.insts], ["R0", "MY", "R0", "MY"])
+        self.assertEqual(rounded(offsets), rounded([vector(0, 0), vector(2 * w, 0), vector(2 * w, 0), vector(4 * w, 0)]))
+        self.assertEqual(rounded(positions[0]), rounded([BL, vector(2 * w - BL.x, 0), vector(2 * w + BL.x, 0),
+                                                         vector(4 * w - BL.x, 0)]))
+        self.assertEqual([label.text for label in row.objs], ["bl[0]", "bl[2]", "bl[4]", "bl[6]"])
+        self.assertEqual(row.get_conns(3), ["bl[6]", "br[6]", "wl[3]", "vdd", "gnd"])
+        self.assertEqual(row.get_fanout("vdd"), 4)
+
+        # a column with every other cell mirrored is one instance array
+        # with the same instances and connections
+        column = design.design("cell_array_test_column")
+        conns = ["bl", "br", "wl[{0}]", "vdd", "gnd"]
+        (offsets, positions) = column.add_cell_array(name="bit", mod=cell, count=6, pitch=[0, h],
+                                                     conns=conns, mirrors=["R0", "MX"], aref=True)
+        self.assertEqual(len(column.insts), 1)
+        elements = list(column.insts[0].elements())
+        self.assertEqual(rounded([element.offset for element in elements]), rounded(offsets))
+        self.assertEqual([element.mirror for element in elements], ["R0", "MX"] * 3)
+        self.assertEqual(column.get_conns(0), [[name.format(row) for name in conns] for row in range(6)])
+
+        # a long row is placed at once
+        cols = 1024
+        start = time.time()
+        wide = design.design("cell_array_test_wide")
+        wide.add_cell_array(name="bit", mod=cell, count=cols, pitch=[w, 0],
+                            conns=["bl[{0}]", "br[{0}]", "wl", "vdd", "gnd"], aref=True)
+        debug.info(1, "{0} cells added in {1:.4f}s".format(cols, time.time() - start))
+        self.assertEqual(len(wide.conns[0]), 5 * cols)
+
+        OPTS.check_lvsdrc = True
+        globals.end_openram()
+
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python2.7
+"""
+Check the slotted vectors and shapes, and report how long building
+the shapes and a bank takes and how much memory each rectangle uses.
+"""
+
+import unittest
+from testutils import header
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+import debug
+import time
+
+OPTS = globals.OPTS
+
+#@unittest.skip("SKIPPING 03_geometry_test")
+
+
+class geometry_test(unittest.TestCase):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = False
+
+        import bank
+        import geometry
+        from vector import vector
+        from vector3d import vector3d
+        import tech
+
+        # the shapes have no attribute dictionaries
+        grid = tech.drc["grid"]
+        rect = geometry.rectangle(1, [3.3 * grid, 0], 10.6 * grid, 2 * grid)
+        self.assertFalse(hasattr(rect, "__dict__"))
+        self.assertFalse(hasattr(rect.offset, "__dict__"))
+        self.assertEqual(rect.offset, vector(3 * grid, 0))
+        self.assertEqual((rect.width, rect.height), (11 * grid, 2 * grid))
+        self.assertEqual(rect.name, "rect")
+        self.assertEqual(vector(1.5, 2).snap_to_grid().x, vector(1.5, 2).snap_offset_to_grid(1.5))
+
+        # vectors compare and hash by their coordinates
+        self.assertEqual(len(set([vector(1, 2), vector([1, 2]), vector(2, 1)])), 2)
+        point = vector3d(1, 2, 3)
+        self.assertEqual(point, vector3d([1, 2, 3]))
+        self.assertEqual(hash(point), hash(vector3d([1, 2, 3])))
+        grid_map = {point: True}
+        self.assertTrue(point + vector3d(0, 0, 0) in grid_map)
+        point[2] = 4
+        self.assertEqual(hash(point), hash(vector3d(1, 2, 4)))
+
+        # micro-benchmark: the shapes and a bank
+        start = time.time()
+        rects = [geometry.rectangle(1, [i * grid, 0], 10 * grid, 2 * grid) for i in range(20000)]
+        rect_time = time.time() - start
+        rect_bytes = sys.getsizeof(rect) + sys.getsizeof(rect.offset) + sys.getsizeof(rect.size)
+        start = time.time()
+        b = bank.bank(word_size=16, num_words=64, words_per_row=2, num_banks=1, name="geometry_bank")
+        bank_time = time.time() - start
+        debug.info(1, "20000 rectangles {0:.3f}s, {1} bytes each without coordinates, bank {2:.3f}s".format(rect_time,
+                                                                                                            rect_bytes,
+                                                                                                            bank_time))
+
+        OPTS.check_lvsdrc = True
+        globals.end_openram()
+
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
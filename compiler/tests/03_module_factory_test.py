@@ -0,0 +1,69 @@
+#!/usr/bin/env python2.7
+"""
+Check that contacts, transistors and gates with the same parameters
+are made once and shared, and that different parameters give
+different modules.
+"""
+
+import unittest
+from testutils import header
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+import debug
+
+OPTS = globals.OPTS
+
+#@unittest.skip("SKIPPING 03_module_factory_test")
+
+
+class module_factory_test(unittest.TestCase):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = False
+
+        import pinv
+        import contact
+        import ptx
+        import design
+        import tech
+
+        factory = design.factory
+        misses = factory.misses
+
+        # positional, keyword and default arguments give the same key
+        layer_stack = ("metal1", "via1", "metal2")
+        via = factory.get(contact.contact, layer_stack, (1, 1))
+        self.assertTrue(factory.get(contact.contact, layer_stack=list(layer_stack)) is via)
+        self.assertTrue(factory.get(contact.contact, layer_stack, dimensions=[1, 1]) is via)
+        self.assertFalse(factory.get(contact.contact, layer_stack, (1, 2)) is via)
+        self.assertEqual(factory.misses, misses + 2)
+
+        # a gate shares its transistors and connects their fingers once
+        fet = factory.get(ptx.ptx, width=tech.drc["minwidth_tx"], mults=3, tx_type="nmos")
+        inv = factory.get(pinv.pinv, nmos_width=tech.drc["minwidth_tx"], beta=tech.parameter["pinv_beta"])
+        self.assertTrue(factory.get(pinv.pinv, tech.drc["minwidth_tx"], tech.parameter["pinv_beta"]) is inv)
+        objs = len(inv.nmos.objs)
+        insts = len(inv.nmos.insts)
+        inv.nmos.connect_fingered_poly()
+        inv.nmos.connect_fingered_active()
+        self.assertEqual((len(inv.nmos.objs), len(inv.nmos.insts)), (objs, insts))
+        self.assertFalse(factory.get(pinv.pinv, nmos_width=2 * tech.drc["minwidth_tx"]) is inv)
+
+        # the names are checked in a set
+        self.assertTrue(isinstance(design.design.name_map, set))
+        self.assertTrue(fet.name in design.design.name_map)
+        debug.info(1, str(factory))
+
+        OPTS.check_lvsdrc = True
+        globals.end_openram()
+        self.assertEqual(len(factory.modules), 0)
+
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
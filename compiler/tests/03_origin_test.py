@@ -0,0 +1,80 @@
+#!/usr/bin/env python2.7
+"""
+Check that offset_all_coordinates moves the registered coordinate
+attributes right away and the shapes and instances when they are next
+used, and that a contact is written the same either way.
+"""
+
+import unittest
+from testutils import header
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+import debug
+
+OPTS = globals.OPTS
+
+#@unittest.skip("SKIPPING 03_origin_test")
+
+
+class origin_test(unittest.TestCase):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = False
+
+        import contact
+        import design
+        from vector import vector
+
+        class shifted(design.design):
+            coordinate_attributes = ["pin_position", "pin_positions", "corner"]
+
+            def __init__(self):
+                design.design.__init__(self, "origin_test_shifted")
+                self.pin_position = vector(-3, -6)
+                self.pin_positions = [vector(0, 0), [3, 3]]
+                self.corner = [-3, -6]
+                self.size = [3, 4]
+                self.add_rect(layer="metal1", offset=vector(-3, -6), width=3, height=3)
+                self.add_rect(layer="metal1", offset=vector(6, 9), width=3, height=3)
+                self.offset_all_coordinates()
+
+        def rounded(values):
+            """ Compare to a tenth, the numbers are multiples of both grids """
+            return [[round(v[0], 1), round(v[1], 1)] for v in values]
+
+        a = shifted()
+        self.assertEqual(rounded([a.origin]), [[-3, -6]])
+        self.assertEqual(rounded([a.pin_position]), [[0, 0]])
+        self.assertEqual(rounded(a.pin_positions), [[3, 6], [6, 9]])
+        self.assertTrue(isinstance(a.corner, vector))
+        self.assertEqual(rounded([a.corner]), [[0, 0]])
+        # only the registered attributes are moved
+        self.assertEqual(a.size, [3, 4])
+        # the shapes are moved when they are next used
+        self.assertEqual(rounded([a.objs[0].offset]), [[-3, -6]])
+        self.assertEqual(rounded([a.find_lowest_coords()]), [[0, 0]])
+        self.assertEqual(a.origin, vector(0, 0))
+        self.assertEqual(rounded([obj.offset for obj in a.objs]), [[0, 0], [9, 15]])
+        a.offset_all_coordinates()
+        a.add_rect(layer="metal1", offset=vector(3, 3), width=3, height=3)
+        self.assertEqual(rounded([obj.offset for obj in a.objs]), [[0, 0], [9, 15], [3, 3]])
+
+        # a contact is measured from its moved shapes
+        c = contact.contact(("poly", "contact", "metal1"), (1, 1))
+        self.assertEqual(c.origin, vector(0, 0))
+        self.assertEqual(c.find_lowest_coords(), vector(0, 0))
+        self.assertEqual(c.width, max(obj.offset.x + obj.width for obj in c.objs))
+        self.assertEqual(c.height, max(obj.offset.y + obj.height for obj in c.objs))
+
+        OPTS.check_lvsdrc = True
+        globals.end_openram()
+
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
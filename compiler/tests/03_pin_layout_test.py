@@ -0,0 +1,80 @@
+#!/usr/bin/env python2.7
+"""
+Check that a module keeps its pin shapes in its own coordinates and
+that an instance places them with its offset, mirror and rotation.
+"""
+
+import unittest
+from testutils import header
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+import debug
+
+OPTS = globals.OPTS
+
+#@unittest.skip("SKIPPING 03_pin_layout_test")
+
+
+class pin_layout_test(unittest.TestCase):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = False
+
+        import bitcell
+        import design
+        from vector import vector
+
+        def rounded(pin):
+            """ Compare to a tenth, the numbers are multiples of both grids """
+            return [[round(pin.ll().x, 1), round(pin.ll().y, 1)],
+                    [round(pin.ur().x, 1), round(pin.ur().y, 1)]]
+
+        # the pins move with the shapes to the origin
+        cell = design.design("pin_layout_test_cell")
+        cell.add_layout_pin(text="A", layer="metal1", offset=vector(-3, -6), width=3, height=9)
+        cell.add_label(text="B", layer="metal2", offset=vector(6, 3))
+        cell.add_label(text="B", layer="metal2", offset=vector(6, 9))
+        cell.offset_all_coordinates()
+        self.assertEqual(rounded(cell.get_pin("A")), [[0, 0], [3, 9]])
+        self.assertEqual(cell.get_pin("A").layer, "metal1")
+        self.assertEqual([rounded(pin) for pin in cell.get_pins("B")], [[[9, 9], [9, 9]], [[9, 15], [9, 15]]])
+        self.assertEqual(cell.get_pins("C"), [])
+
+        top = design.design("pin_layout_test_top")
+        placements = [("R0", 0, [[30, 60], [33, 69]]),
+                      ("MX", 0, [[30, 51], [33, 60]]),
+                      ("MY", 0, [[27, 60], [30, 69]]),
+                      ("XY", 0, [[27, 51], [30, 60]]),
+                      ("R0", 90, [[21, 60], [30, 63]])]
+        for (i, (mirror, rotate, expected)) in enumerate(placements):
+            top.add_inst(name="cell{0}".format(i), mod=cell, offset=vector(30, 60),
+                         mirror=mirror, rotate=rotate)
+            inst = top.inst_map["cell{0}".format(i)]
+            self.assertEqual(rounded(inst.get_pin("A")), expected)
+
+        # the placed pins are kept until the instance moves
+        inst = top.inst_map["cell0"]
+        pins = inst.get_pins("B")
+        self.assertTrue(inst.get_pins("B") is pins)
+        top.offset_all_coordinates()
+        self.assertEqual(rounded(top.get_layout_pins(inst)["A"][0]), [[0, 0], [3, 9]])
+        self.assertFalse(inst.get_pins("B") is pins)
+
+        # the measured pins of a library cell are points
+        cell_6t = bitcell.bitcell()
+        self.assertEqual(sorted(cell_6t.pin_map.keys()), sorted(bitcell.bitcell.pins))
+        center = cell_6t.get_pin("WL").center()
+        self.assertEqual([center.x, center.y], list(bitcell.bitcell.chars["WL"]))
+
+        OPTS.check_lvsdrc = True
+        globals.end_openram()
+
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
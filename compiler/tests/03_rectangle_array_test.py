@@ -0,0 +1,74 @@
+#!/usr/bin/env python2.7
+"""
+Check that a bus and a list of rectangles added at once are moved,
+measured and written the same as the rectangles added one at a time.
+"""
+
+import unittest
+from testutils import header
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+import debug
+import time
+
+OPTS = globals.OPTS
+
+#@unittest.skip("SKIPPING 03_rectangle_array_test")
+
+
+class rectangle_array_test(unittest.TestCase):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = False
+
+        import design
+        from vector import vector
+
+        bits = 256
+        offsets = [vector(3 * i - 3, -6) for i in range(bits)]
+        widths = [3 * (i % 4 + 1) for i in range(bits)]
+
+        one_at_a_time = design.design("rectangle_array_test_rects")
+        for offset in offsets:
+            one_at_a_time.add_rect(layer="metal2", offset=offset, width=3, height=30)
+        for (offset, width) in zip(offsets, widths):
+            one_at_a_time.add_rect(layer="metal1", offset=offset + vector(0, 30), width=width, height=3)
+        one_at_a_time.offset_all_coordinates()
+
+        at_once = design.design("rectangle_array_test_bus")
+        start = time.time()
+        positions = at_once.add_bus(layer="metal2", offset=vector(-3, -6), bits=bits,
+                                    pitch=vector(3, 0), width=3, height=30)
+        debug.info(1, "{0} bit bus added in {1:.6f}s".format(bits, time.time() - start))
+        at_once.add_rects(layer="metal1", offsets=[offset + vector(0, 30) for offset in offsets],
+                          width=widths, height=3)
+        self.assertEqual(len(at_once.objs), 2)
+        self.assertEqual(len(at_once.objs[0]), bits)
+        self.assertEqual(positions, offsets)
+        at_once.offset_all_coordinates()
+
+        self.assertEqual(at_once.find_lowest_coords(), vector(0, 0))
+        self.assertEqual(self.boxes(at_once), self.boxes(one_at_a_time))
+        # the rectangles of the array are the ones added one at a time
+        self.assertEqual([str(rect) for rect in at_once.objs[0].rectangles()],
+                         [str(rect) for rect in one_at_a_time.objs[:bits]])
+
+        OPTS.check_lvsdrc = True
+        globals.end_openram()
+
+    def boxes(self, layout):
+        """ The layer and points of the boundaries written to GDS """
+        layout.clear_visited()
+        layout.gds_write_file(layout.gds)
+        structure = layout.gds.structures[layout.gds.rootStructureName]
+        return [(boundary.drawingLayer, boundary.coordinates) for boundary in structure.boundaries]
+
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
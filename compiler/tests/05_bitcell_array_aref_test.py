@@ -0,0 +1,75 @@
+#!/usr/bin/env python2.7
+"""
+Check that the bitcell array is written as GDS array references and
+that they expand to the same cells as individual instances.
+"""
+
+import unittest
+from testutils import header
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+import debug
+
+OPTS = globals.OPTS
+
+#@unittest.skip("SKIPPING 05_bitcell_array_aref_test")
+
+
+class bitcell_array_aref_test(unittest.TestCase):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = False
+
+        import bitcell_array
+        import gdsMill
+        from tech import GDS
+
+        debug.info(2, "Testing 5x3 array references for 6t_cell")
+        a = bitcell_array.bitcell_array(name="bitcell_array", cols=3, rows=5)
+
+        OPTS.check_lvsdrc = True
+
+        tempspice = OPTS.openram_temp + "temp.sp"
+        tempgds = OPTS.openram_temp + "temp.gds"
+        a.sp_write(tempspice)
+        a.gds_write(tempgds)
+
+        layout = gdsMill.VlsiLayout(units=GDS["unit"])
+        reader = gdsMill.Gds2reader(layout)
+        reader.loadFromFile(tempgds)
+
+        # one array for the even rows and a mirrored one for the odd rows
+        arefs = layout.structures[layout.rootStructureName].arefs
+        self.assertEqual(len(arefs), 2)
+        self.assertEqual([(x.columns, x.rows) for x in arefs], [(3, 3), (3, 2)])
+        self.assertEqual([x.transFlags[0] for x in arefs], [False, True])
+
+        # the expanded references match the instance positions
+        cell_height = layout.userUnits(a.cell.height)
+        cell_width = layout.userUnits(a.cell.width)
+        positions = sorted(sref.coordinates for aref in arefs for sref in aref.expandSrefs())
+        expected = sorted((col * cell_width, (row + (row % 2)) * cell_height)
+                          for col in range(3) for row in range(5))
+        self.assertEqual(positions, expected)
+
+        # the traversal visits every cell
+        cells = [x for x in layout.xyTree if x[0] == a.cell.name]
+        self.assertEqual(len(cells), 15)
+
+        # and the netlist still has every cell
+        bits = [x for x in open(tempspice).readlines() if x.startswith("Xbit_r")]
+        self.assertEqual(len(bits), 15)
+
+        os.remove(tempspice)
+        os.remove(tempgds)
+        globals.end_openram()
+
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python2.7
+"""
+Check that a bitcell array built from row modules, and from blocks of
+rows, has the same flattened cells and geometry as the flat array with
+far fewer instances.
+"""
+
+import unittest
+from testutils import header
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+import debug
+
+OPTS = globals.OPTS
+
+#@unittest.skip("SKIPPING 05_bitcell_array_hier_test")
+
+
+class bitcell_array_hier_test(unittest.TestCase):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = False
+
+        import design
+        import bitcell_array
+
+        # made by the module factory, as bank.py makes them
+        (cols, rows) = (8, 12)
+        flat = design.factory.get(bitcell_array.bitcell_array, name="bitcell_array_flat",
+                                  cols=cols, rows=rows)
+        hier = design.factory.get(bitcell_array.bitcell_array, name="bitcell_array_hier",
+                                  cols=cols, rows=rows, hierarchical=True)
+        block = design.factory.get(bitcell_array.bitcell_array, name="bitcell_array_block",
+                                   cols=cols, rows=rows, hierarchical=True, block_rows=4)
+
+        # the rows and blocks place the cell of their array and do not
+        # load the bitcell class again
+        self.assertTrue(hier.row.cell is hier.cell)
+        self.assertTrue(block.block.cell is block.cell)
+        self.assertTrue(block.block.row.cell is block.cell)
+        for a in [hier, block]:
+            self.assertTrue(a.cell.__class__ is a.mod_bitcell)
+        self.assertTrue(block.block.mod_bitcell is block.mod_bitcell)
+
+        # the pins and label positions that bank.py wires to are kept
+        for a in [hier, block]:
+            self.assertEqual(a.pins, flat.pins)
+            self.assertEqual([a.width, a.height], [flat.width, flat.height])
+            for positions in ["BL_positions", "BR_positions", "WL_positions",
+                              "vdd_positions", "gnd_positions"]:
+                self.assertEqual(getattr(a, positions), getattr(flat, positions))
+
+        # one instance per row and one per column instead of one per bit
+        self.assertEqual(len(flat.insts[0]), cols * rows)
+        self.assertEqual(len(hier.insts[0]), rows)
+        self.assertEqual(len(hier.row.insts[0]), cols)
+        self.assertEqual(len(block.insts[0]), rows / 4)
+        self.assertEqual(len(block.block.insts[0]), 4)
+
+        # the same cells are connected to the same nets
+        cells = self.flatten(flat, flat.pins)
+        self.assertEqual(len(cells), cols * rows)
+        self.assertEqual(self.flatten(hier, hier.pins), cells)
+        self.assertEqual(self.flatten(block, block.pins), cells)
+
+        # and the layout has the same shapes
+        shapes = self.shapes(flat)
+        self.assertEqual(self.shapes(hier), shapes)
+        self.assertEqual(self.shapes(block), shapes)
+
+        OPTS.check_lvsdrc = True
+        globals.end_openram()
+
+    def flatten(self, mod, nets):
+        """ The sorted nets of the library cells below a module """
+        import geometry
+        if mod.spice:
+            return [tuple(nets)]
+        net_map = dict(zip(mod.pins, nets))
+        cells = []
+        for (index, inst) in enumerate(mod.insts):
+            conns = mod.get_conns(index)
+            if not isinstance(inst, geometry.instance_array):
+                conns = [conns]
+            for element_conns in conns:
+                cells += self.flatten(inst.mod, [net_map[net] for net in element_conns])
+        return sorted(cells)
+
+    def shapes(self, mod):
+        """ The sorted flattened boundaries of the GDS of a module """
+        import gdsMill
+        from tech import GDS
+        tempgds = OPTS.openram_temp + "temp.gds"
+        mod.gds_write(tempgds)
+        layout = gdsMill.VlsiLayout(units=GDS["unit"])
+        reader = gdsMill.Gds2reader(layout)
+        reader.loadFromFile(tempgds)
+        shapes = []
+        for tree_unit in layout.xyTree:
+            shapes += layout.getShapesInStructure(tree_unit)
+        os.remove(tempgds)
+        return sorted(shapes)
+
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
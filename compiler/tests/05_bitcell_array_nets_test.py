@@ -0,0 +1,58 @@
+#!/usr/bin/env python2.7
+"""
+Check the net IDs of the bitcell array: the cells are connected to one
+net for each bit line and word line, and the nets can be looked up
+from their names without formatting the connections again.
+"""
+
+import unittest
+from testutils import header
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+import debug
+
+OPTS = globals.OPTS
+
+#@unittest.skip("SKIPPING 05_bitcell_array_nets_test")
+
+
+class bitcell_array_nets_test(unittest.TestCase):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = False
+
+        import bitcell_array
+
+        a = bitcell_array.bitcell_array(name="bitcell_array_nets", cols=4, rows=6)
+
+        # each net is made once and the cells share its ID
+        self.assertEqual(sorted(a.net_names), sorted(a.pins))
+        self.assertEqual(a.add_net("bl[2]"), a.net_ids["bl[2]"])
+        self.assertEqual(len(a.conns[0]), 4 * 6 * len(a.cell.pins))
+
+        # the connections read back as names, column by column
+        conns = a.get_conns(0)
+        self.assertEqual(len(conns), 4 * 6)
+        self.assertEqual(conns[1 * 6 + 3], ["bl[1]", "br[1]", "wl[3]", "vdd", "gnd"])
+
+        # a bit line connects a column and a word line a row, on the
+        # first and third pins of the cells
+        self.assertEqual(sorted(a.get_net_connections("bl[1]")),
+                         sorted(("bit_r{0}_c1".format(row), a.cell.pins[0]) for row in range(6)))
+        self.assertEqual(sorted(a.get_net_connections("wl[3]")),
+                         sorted(("bit_r3_c{0}".format(col), a.cell.pins[2]) for col in range(4)))
+        self.assertEqual(a.get_fanout("vdd"), 4 * 6)
+        self.assertEqual(a.get_fanout("no_such_net"), 0)
+
+        OPTS.check_lvsdrc = True
+        globals.end_openram()
+
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python2.7
+"""
+Benchmark the spice writer of a 4 bank SRAM against the recursive
+writer that looked the written modules up in a list, and check that
+both write the same netlist.
+"""
+
+import unittest
+from testutils import header
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+import debug
+import time
+
+OPTS = globals.OPTS
+
+#@unittest.skip("SKIPPING 20_sram_sp_write_test")
+
+
+class sram_sp_write_test(unittest.TestCase):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = False
+
+        import sram
+
+        a = sram.sram(word_size=16, num_words=512, num_banks=4, name="sp_write_sram")
+
+        old_sp = OPTS.openram_temp + "old.sp"
+        new_sp = OPTS.openram_temp + "new.sp"
+        start = time.time()
+        sp = open(old_sp, "w")
+        self.old_sp_write_file(a, sp, list())
+        sp.close()
+        old_time = time.time() - start
+        start = time.time()
+        sp = open(new_sp, "w")
+        a.sp_write_file(sp, set())
+        sp.close()
+        new_time = time.time() - start
+        debug.info(1, "sram sp_write: recursive list writer {0:.4f}s streaming writer {1:.4f}s".format(old_time,
+                                                                                                   new_time))
+
+        self.assertEqual(open(old_sp).read(), open(new_sp).read())
+        # the hierarchy is written without recursion
+        self.assertEqual("".join(a.sp_chunks(set())), open(new_sp).read())
+
+        os.remove(old_sp)
+        os.remove(new_sp)
+        OPTS.check_lvsdrc = True
+        globals.end_openram()
+
+    def old_sp_write_file(self, mod, sp, usedMODS):
+        """ The writer this replaced: recursive, with a linear search of
+        the written modules and a write call for every line """
+        import geometry
+        if mod.spice:
+            sp.write("\n".join(mod.spice))
+            sp.write("\n")
+            return
+        for i in mod.mods:
+            if [x for x in usedMODS if x.name == i.name]:
+                continue
+            usedMODS.append(i)
+            self.old_sp_write_file(i, sp, usedMODS)
+        if len(mod.insts) == 0 or mod.pins == []:
+            return
+        sp.write("\n.SUBCKT {0} {1}\n".format(mod.name, " ".join(mod.pins)))
+        for (index, inst) in enumerate(mod.insts):
+            conns = mod.get_conns(index)
+            if conns == []:
+                continue
+            if isinstance(inst, geometry.instance_array):
+                for (element, element_conns) in zip(inst.elements(), conns):
+                    sp.write("X{0} {1} {2}\n".format(element.name, " ".join(element_conns), element.mod.name))
+                continue
+            sp.write("X{0} {1} {2}\n".format(inst.name, " ".join(conns), inst.mod.name))
+        sp.write(".ENDS {0}\n".format(mod.name))
+
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
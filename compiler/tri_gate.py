@@ -20,6 +20,7 @@ class tri_gate(design.design):
 
         self.width = tri_gate.chars["width"]
         self.height = tri_gate.chars["height"]
+        self.add_library_pins(tri_gate.chars, tri_gate.pins)
 
     def delay(self, slew, load=0.0):
         from tech import spice
@@ -9,6 +9,9 @@ class tri_gate_array(design.design):
     Dynamically generated tri gate array of all bitlines.  words_per_row
     """
 
+    # Made by the module factory and kept in the disk cache between runs
+    persistent = True
+
     def __init__(self, columns, word_size):
         """Intial function of tri gate array """
         design.design.__init__(self, "tri_gate_array")
@@ -28,9 +31,8 @@ class tri_gate_array(design.design):
         self.add_modules()
         self.setup_layout_constants()
         self.add_pins()
-        self.create_write_array()
         self.add_metal_rails()
-        self.add_labels()
+        self.create_write_array()
 
     def add_pins(self):
         """create the name of pins depend on the word size"""
@@ -58,26 +60,26 @@ class tri_gate_array(design.design):
         self.add_mod(self.tri)
 
     def create_write_array(self):
-        """add tri gate to the array """
-        for i in range(self.word_size):
-            mirror = "R0"
-            if (i % 2 == 0):
-                name = "Xtri_gate{0}".format(i)
-                x_off = i * self.tri.width * self.words_per_row
-            else:
-                name = "Xtri_gate{0}".format(i)
-                if (self.words_per_row == 1):
-                    x_off = (i + 1) * self.tri.width * self.words_per_row
-                    mirror = "MY"
-                else:
-                    x_off = i * self.tri.width * self.words_per_row
-            self.add_inst(name=name,
-                          mod=self.tri,
-                          offset=[x_off, 0],
-                          mirror = mirror)
-            self.connect_inst(["in[{0}]".format(i),
-                               "out[{0}]".format(i),
-                               "en", "en_bar", "vdd", "gnd"])
+        """add tri gate to the array, every other one mirrored when they abut """
+        if (self.words_per_row == 1):
+            mirrors = ["R0", "MY"]
+        else:
+            mirrors = ["R0"]
+        labels = []
+        for pin in ["en", "en_bar", "vdd"]:
+            labels.append((pin, "metal1", self.tri_gate_chars[pin]))
+        labels.append(("gnd", "metal2", self.tri_gate_chars["gnd"]))
+        labels.append(("in[{0}]", "metal2", self.tri_gate_chars["in"]))
+        labels.append(("out[{0}]", "metal2", self.tri_gate_chars["out"]))
+        (offsets, positions) = self.add_cell_array(name="Xtri_gate{0}",
+                                                   mod=self.tri,
+                                                   count=self.word_size,
+                                                   pitch=[self.tri.width * self.words_per_row, 0],
+                                                   conns=["in[{0}]", "out[{0}]", "en", "en_bar", "vdd", "gnd"],
+                                                   mirrors=mirrors,
+                                                   labels=labels)
+        self.tri_gate_positions = offsets
+        (self.vdd_positions, self.gnd_positions, self.in_positions, self.out_positions) = positions[2:]
 
     def add_metal_rails(self):
         """Connect en en_bar and vdd together """
@@ -97,39 +99,6 @@ class tri_gate_array(design.design):
                       width=width,
                       height=drc['minwidth_metal1'])
 
-    def add_labels(self):
-        """add label for pins"""
-        for i in range(self.word_size):
-            if (i % 2 == 0 or self.words_per_row > 1):
-                x_off = i * self.tri.width * self.words_per_row
-                dir_vector = vector(1,1)
-            else:
-                x_off = (i + 1) * self.tri.width * self.words_per_row
-                dir_vector = vector(-1,1)
-
-            pin_offset={}
-            for pin in ["en", "en_bar", "vdd", "gnd", "in", "out"]:
-                pin_offset[pin] = vector(x_off, 0) + dir_vector.scale(self.tri_gate_chars[pin])
-
-            for pin in ["en", "en_bar", "vdd"]:
-                self.add_label(text=pin,
-                               layer="metal1",
-                               offset=pin_offset[pin])
-            self.add_label(text="gnd",
-                           layer="metal2",
-                           offset=pin_offset["gnd"])
-            self.add_label(text="in[{0}]".format(i),
-                           layer="metal2",
-                           offset=pin_offset["in"])
-            self.add_label(text="out[{0}]".format(i),
-                           layer="metal2",
-                           offset=pin_offset["out"])
-
-            self.vdd_positions.append(pin_offset["vdd"])
-            self.gnd_positions.append(pin_offset["gnd"])
-            self.in_positions.append(pin_offset["in"])
-            self.out_positions.append(pin_offset["out"])
-
     def delay(self, slew, load=0.0):
         result = self.tri.delay(slew = slew, load = load)
         return result
@@ -2,6 +2,7 @@ import os
 import gdsMill
 import tech 
 import globals
+import library_cache
 
 OPTS = globals.OPTS
 
@@ -34,6 +35,11 @@ def auto_measure_libcell(pin_list, name, units, layer):
     Return these as a set of properties including the cell width/height too.
     """
     cell_gds = OPTS.openram_tech + "gds_lib/" + str(name) + ".gds"
+    key = chars_cache.key(cell_gds, (pin_list, units, layer))
+    cell = chars_cache.load(key)
+    if cell != None:
+        return cell
+
     cell_vlsi = gdsMill.VlsiLayout(units=units)
     reader = gdsMill.Gds2reader(cell_vlsi)
     reader.loadFromFile(cell_gds)
@@ -46,8 +52,12 @@ def auto_measure_libcell(pin_list, name, units, layer):
 
     for pin in pin_list:
         cell[str(pin)] = gds_pin_center(cell_vlsi.getPinShapeByLabel(str(pin)))
+    chars_cache.store(key, cell)
     return cell
 
+# The measured library cells are kept between runs
+chars_cache = library_cache.disk_cache("chars")
+
 
 
 
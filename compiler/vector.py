@@ -2,7 +2,7 @@ import debug
 import math
 import tech
 
-class vector():
+class vector(object):
     """
     This is the vector class to represent the coordinate
     vector. It makes the coordinate operations easy and short
@@ -10,7 +10,11 @@ class vector():
     It needs to override several operators to support
     concise vector operations, output, and other more complex
     data structures like lists.
+    Vectors are created for every shape, so they only have slots
+    for the coordinates and no attribute dictionary.
     """
+    __slots__ = ("x", "y")
+
     def __init__(self, x, y=None):
         """ init function support two init method"""
         # will take single input as a coordinate
@@ -85,8 +89,10 @@ class vector():
         return vector(other[0]- self.x, other[1] - self.y)
 
     def snap_to_grid(self):
-        self.x = self.snap_offset_to_grid(self.x)
-        self.y = self.snap_offset_to_grid(self.y)
+        # the same rounding as snap_offset_to_grid, without the calls
+        grid = tech.drc["grid"]
+        self.x = int(round(round(self.x / grid, 2))) * grid
+        self.y = int(round(round(self.y / grid, 2))) * grid
         return self
 
     def snap_offset_to_grid(self, offset):
@@ -139,13 +145,21 @@ class vector():
     def __eq__(self, other):
         """Override the default Equals behavior"""
         if isinstance(other, self.__class__):
-            return self.__dict__ == other.__dict__
+            return self.x == other.x and self.y == other.y
         return False
 
     def __ne__(self, other):
         """Override the default non-equality behavior"""
         return not self.__eq__(other)
 
+    def __hash__(self):
+        """
+        Override - function (hash)
+        Vectors are changed in place, so the hash is not kept and
+        a vector must not change while it is in a set or a dict.
+        """
+        return hash((self.x, self.y))
+
     def max(self, other):
         """ Max of both values """
         return vector(max(self.x,other.x),max(self.y,other.y))
@@ -20,4 +20,5 @@ class write_driver(design.design):
 
         self.width = write_driver.chars["width"]
         self.height = write_driver.chars["height"]
+        self.add_library_pins(write_driver.chars, write_driver.pins)
 
@@ -11,6 +11,14 @@ class write_driver_array(design.design):
     Dynamically generated write driver array of all bitlines.
     """
 
+    # Made by the module factory and kept in the disk cache between runs
+    persistent = True
+
+    # Moved by offset_all_coordinates
+    coordinate_attributes = ["driver_positions", "wen_positions", "vdd_positions",
+                             "gnd_positions", "Data_in_positions", "BL_out_positions",
+                             "BR_out_positions"]
+
     def __init__(self, columns, word_size):
         design.design.__init__(self, "write_driver_array")
         debug.info(1, "Creating {0}".format(self.name))
@@ -45,8 +53,8 @@ class write_driver_array(design.design):
     def create_layout(self):
         self.add_write_driver_module()
         self.setup_layout_constants()
-        self.create_write_array()
         self.add_metal_rails()
+        self.create_write_array()
         self.add_labels()
         self.offset_all_coordinates()
 
@@ -66,23 +74,22 @@ class write_driver_array(design.design):
         self.Data_in_positions = []
 
     def create_write_array(self):
-        for i in range(self.word_size):
-            name = "Xwrite_driver%d" % i
-            x_off = (i* self.driver.width * self.words_per_row)
-            self.driver_positions.append(vector(x_off, 0))
-            self.add_inst(name=name,
-                          mod=self.driver,
-                          offset=[x_off, 0])
-            if (self.words_per_row == 1):
-                self.connect_inst(["data_in[{0}]".format(i),
-                                   "bl[{0}]".format(i),
-                                   "br[{0}]".format(i),
-                                   "wen", "vdd", "gnd"])
-            else:
-                self.connect_inst(["data_in[{0}]".format(i),
-                                   "bl_out[{0}]".format(i * self.words_per_row),
-                                   "br_out[{0}]".format(i * self.words_per_row),
-                                   "wen", "vdd", "gnd"])
+        if (self.words_per_row == 1):
+            bitlines = ["bl[{1}]", "br[{1}]"]
+        else:
+            bitlines = ["bl_out[{1}]", "br_out[{1}]"]
+        (offsets, positions) = self.add_cell_array(name="Xwrite_driver{0}",
+                                                   mod=self.driver,
+                                                   count=self.word_size,
+                                                   pitch=[self.driver.width * self.words_per_row, 0],
+                                                   conns=["data_in[{0}]"] + bitlines + ["wen", "vdd", "gnd"],
+                                                   indices=[range(self.word_size),
+                                                            range(0, self.word_size * self.words_per_row, self.words_per_row)],
+                                                   labels=[("data_in[{0}]", "metal2", self.write_driver_chars["din"]),
+                                                           (bitlines[0], "metal2", self.write_driver_chars["BL"]),
+                                                           (bitlines[1], "metal2", self.write_driver_chars["BR"])])
+        self.driver_positions = offsets
+        (self.Data_in_positions, self.BL_out_positions, self.BR_out_positions) = positions
 
     def add_metal_rails(self):
         base = vector(0, - 0.5*drc["minwidth_metal1"])
@@ -100,32 +107,6 @@ class write_driver_array(design.design):
                       height=drc['minwidth_metal1'])
 
     def add_labels(self):
-        for i in range(self.word_size):
-            base = vector(i * self.driver.width * self.words_per_row, 0)
-            BL_offset = base + self.write_driver_chars["BL"]
-            BR_offset = base + self.write_driver_chars["BR"]
-
-            self.add_label(text="data_in[{0}]".format(i),
-                           layer="metal2",
-                           offset=base + self.write_driver_chars["din"])
-            if (self.words_per_row == 1):
-                self.add_label(text="bl[{0}]".format(i),
-                               layer="metal2",
-                               offset=BL_offset)
-                self.add_label(text="br[{0}]".format(i),
-                               layer="metal2",
-                               offset=BR_offset)
-            else:
-                self.add_label(text="bl_out[{0}]".format(i*self.words_per_row),
-                               layer="metal2",
-                               offset=BL_offset)
-                self.add_label(text="br_out[{0}]".format(i*self.words_per_row),
-                               layer="metal2",
-                               offset=BR_offset)
-            self.BL_out_positions.append(BL_offset)
-            self.BR_out_positions.append(BR_offset)
-            self.Data_in_positions.append(base + self.write_driver_chars["din"])
-
         base = vector(0, - 0.5 * drc["minwidth_metal1"])
         self.add_label(text="wen",
                        layer="metal1",